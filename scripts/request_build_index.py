@@ -1,5 +1,6 @@
 import urllib3
 import json
+import time
 
 container_prefix='bhopkinson'
 http = urllib3.PoolManager()
@@ -15,4 +16,18 @@ response = http.request('POST',
                         f'http://localhost:{app_port}/build_index', 
                         headers={'Content-Type': 'application/json'},
                         body=index_data)
+result = json.loads(response.data)
+if response.status != 200:
+    raise SystemExit(result['error'])
+job_id = result['job_id']
+print(f'started index job {job_id}')
+
+while True:
+    job = json.loads(http.request('GET', f'http://localhost:{app_port}/jobs/{job_id}').data)
+    print(job['status'], job['phase'], f"{job['files_parsed']}/{job['files_total']} files",
+          f"{job['documents_embedded']} documents embedded",
+          f"({job['documents_per_second']:.1f} documents/s)")
+    if job['status'] not in ('pending', 'running'):
+        break
+    time.sleep(5)
 print('done')
\ No newline at end of file
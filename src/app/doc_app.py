@@ -2,31 +2,75 @@ import os
 import sys
 from pathlib import Path
 import json
+import time
+import asyncio
+import weakref
+import itertools
+import threading
+from typing import Dict, List, Tuple, Optional, Mapping, Sequence, Iterator, AsyncIterator
 
 from loguru import logger
-from fastapi import FastAPI, Response, UploadFile, File, Form
-from pydantic import BaseModel
+from fastapi import FastAPI, Request, Response, UploadFile, File, Form, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, root_validator
+from starlette.routing import Match
 import uvicorn
-from elasticsearch import Elasticsearch
 
 main_repo_path = str(Path(os.path.abspath(__file__)).parents[1]).replace('\\', '/')
 if main_repo_path not in sys.path:
     sys.path.append(main_repo_path)
 
-from pipelines import pipeline_factory
-from indexer.build_indices import build_index as _build_index
-from util import connect_to_docstore
-from util.vars import CONTEXT, FRAGMENT_TO_CONTEXT, ES_INDEX
+#haystack, the models and elasticsearch are imported on first use so the server starts
+#listening, and answers health checks, before they are loaded
+from pipelines.query_batcher import QueryBatcher
+from extractor.context_store import ContextStore, convert_json_context
+from indexer.jobs import IndexJob, JobManager, JobConflictError
+from util.cache import TTLCache
+from util.concurrency import BoundedExecutor, QueueFullError
+from util.metrics import MetricsRegistry, Metric, Counter, Gauge
+from util.timing import instrument_methods
+from util.vars import CONTEXT, CONTEXT_STORE, FRAGMENT_TO_CONTEXT, NEXT_DOCUMENT, ES_INDEX, \
+    RESULT_CACHE_SIZE, RESULT_CACHE_TTL, SEARCH_CONCURRENCY, SEARCH_QUEUE_DEPTH, \
+    QUERY_BATCH_SIZE, QUERY_BATCH_WAIT_MS, INDEX_JOB_WORKERS, INDEX_JOB_HISTORY, \
+    PIPELINE_CACHE_SIZE, INDEX_CHUNK_SIZE, EMBEDDING_BATCH_SIZE, EMBEDDING_PRECISION, \
+    FAISS_INDEX_TYPE, FAISS_NLIST, FAISS_TRAIN_SIZE, WARMUP_PIPELINES, PDF_BACKEND, \
+    SENTENCE_SPLITTER
 
 #FastAPI Pydantic datamodels
 class SearchData(BaseModel):
     """ Data model for single query search
         query: search query
         n_retrieve: number of document fragments to retrieve
-        n_rank: number of documents to retain after ranking """
+        n_rank: number of documents to retain after ranking 
+        latency_budget_ms: optional ranking time budget, the cross-encoder is cut short to meet it
+        summary_min_length, summary_max_length, num_beams: optional generation settings of the local summarizer
+        max_input_tokens: optional token budget of the text passed to the local summarizer
+        retriever, enricher, summarizer, document: optional pipeline configuration, 
+            unset fields default to the configuration last built with /build_pipeline """
     query: str
     n_retrieve: int = 10
     n_rank: int = 5
+    latency_budget_ms: Optional[float] = None
+    summary_min_length: Optional[int] = None
+    summary_max_length: Optional[int] = None
+    num_beams: Optional[int] = None
+    max_input_tokens: Optional[int] = None
+    retriever: Optional[str] = None
+    enricher: Optional[str] = None
+    summarizer: Optional[str] = None
+    document: Optional[str] = None
+
+    @root_validator(skip_on_failure=True)
+    def check_summary_lengths(cls, values: Dict) -> Dict:
+        """reject summary lengths generation cannot satisfy, answered with a 422"""
+        min_length, max_length = values.get('summary_min_length'), values.get('summary_max_length')
+        if min_length is not None and min_length < 0:
+            raise ValueError('summary_min_length must not be negative')
+        if max_length is not None and max_length < 1:
+            raise ValueError('summary_max_length must be at least 1')
+        if min_length is not None and max_length is not None and min_length > max_length:
+            raise ValueError(f'summary_min_length {min_length} is larger than summary_max_length {max_length}')
+        return values
 
 class PipelineParams(BaseModel):
     """ Data model for search pipeline
@@ -48,17 +92,81 @@ class IndexParams(BaseModel):
         ds_path: document store path - where file-based document stores will be saved
         retriever: retriever type, approach to finding relevant document sections
         docstore_type: type of document store (~document database)
+        n_workers: number of worker processes used to parse files
+        incremental: only re-index files that changed since the last build
+        chunk_size: number of fragments parsed, embedded and written together, bounds memory use
+        embedding_batch_size: number of documents encoded at once
+        embedding_precision: fp32, fp16 (gpu), int8 (cpu) or auto
+        faiss_index_type: faiss index type, Flat, HNSW, IVF, IVFPQ or HNSWPQ
+        faiss_nlist: number of IVF centroids, chosen from the training sample size if None
+        faiss_train_size: number of documents used to train IVF and PQ faiss indexes
+        pdf_backend: local to parse pdfs with pypdf, tika to use the tika server
+        sentence_splitter: period to split fragments at every period, aware to keep abbreviations,
+            decimal numbers and initials within sentences
     """
     doc_name: str = 'document', 
     data_path: str = '/tmp/data', 
     ds_path: str = '/tmp/data', 
     retriever: str ='Embedding', 
     docstore_type: str = 'elasticsearch'
+    n_workers: int = 1
+    incremental: bool = False
+    chunk_size: int = INDEX_CHUNK_SIZE
+    embedding_batch_size: int = EMBEDDING_BATCH_SIZE
+    embedding_precision: str = EMBEDDING_PRECISION
+    faiss_index_type: str = FAISS_INDEX_TYPE
+    faiss_nlist: Optional[int] = FAISS_NLIST
+    faiss_train_size: int = FAISS_TRAIN_SIZE
+    pdf_backend: str = PDF_BACKEND
+    sentence_splitter: str = SENTENCE_SPLITTER
+
+def close_pipeline(key: tuple, entry: Dict) -> None:
+    """stop the query batcher of a pipeline dropped from the pipeline cache"""
+    entry['batcher'].close()
 
 #FastAPI app creation
 def create_app() -> FastAPI:
     app = FastAPI()
-    app.pipelines = {}
+    #fully built pipelines with their query batchers, keyed by pipeline_key
+    app.pipelines = TTLCache(maxsize=PIPELINE_CACHE_SIZE, on_evict=close_pipeline)
+    #configuration used for searches that do not specify one, set by /build_pipeline
+    app.default_params = {}
+    #context files and document stores shared by all pipelines searching a document
+    app.document_contexts = TTLCache(maxsize=PIPELINE_CACHE_SIZE)
+    app.document_stores = TTLCache(maxsize=PIPELINE_CACHE_SIZE)
+    #serializes pipeline builds, cached pipelines are used without locking
+    app.pipeline_lock = threading.Lock()
+    #build generation of each pipeline, part of the result cache key
+    app.pipeline_counter = itertools.count()
+    #incremented whenever a document index is rebuilt to invalidate cached results
+    app.index_versions = {}
+    app.result_cache = TTLCache(maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL)
+    app.search_executor = BoundedExecutor(max_workers=SEARCH_CONCURRENCY, 
+                                          max_queue=SEARCH_QUEUE_DEPTH,
+                                          name='search')
+    app.jobs = JobManager(max_workers=INDEX_JOB_WORKERS, max_finished=INDEX_JOB_HISTORY)
+    #pipeline types built in the background at startup, see warm_up
+    app.warmup = {'status': 'idle', 'pipelines': {}}
+
+    #prometheus metrics served by /metrics, values kept elsewhere are read by collect_metrics
+    app.metrics = MetricsRegistry()
+    app.request_seconds = app.metrics.histogram('docapp_request_seconds', 
+                                                'time to handle http requests, until the response starts',
+                                                ['method', 'route', 'status'])
+    app.requests_in_progress = app.metrics.gauge('docapp_requests_in_progress', 
+                                                 'http requests being handled', ['method', 'route'])
+    app.search_results = app.metrics.counter('docapp_search_results_total', 
+                                             'search results returned by source, cache or pipeline',
+                                             ['pipeline', 'source'])
+    #components are shared between pipelines through the model registry, so nodes are
+    #timed per component rather than per pipeline, see instrument_components
+    app.node_seconds = app.metrics.histogram('docapp_node_seconds', 
+                                             'time spent in search pipeline nodes, per run call',
+                                             ['node', 'component'])
+    app.timed_components = weakref.WeakSet()
+    app.docstore_seconds = app.metrics.histogram('docapp_docstore_seconds', 
+                                                 'time of document store calls made by search pipelines',
+                                                 ['document', 'method'])
 
     #setup logger
     logger.remove()
@@ -68,6 +176,174 @@ def create_app() -> FastAPI:
 
 app = create_app()
 
+#document store methods timed in docapp_docstore_seconds
+DOCSTORE_METHODS = ('query', 'query_batch', 'query_by_embedding', 'query_by_embedding_batch',
+                    'get_documents_by_id', 'get_document_by_id', 'get_all_documents')
+
+@app.middleware('http')
+async def record_request_metrics(request: Request, call_next) -> Response:
+    """time requests by route template, so paths with parameters share a label value
+
+    streamed responses are timed until their headers are sent, not until the stream ends
+    """
+    route = 'unmatched'
+    for candidate in app.router.routes:
+        if candidate.matches(request.scope)[0] == Match.FULL:
+            route = candidate.path
+            break
+    status = 500
+    t_start = time.perf_counter()
+    try:
+        with app.requests_in_progress.track_inprogress(method=request.method, route=route):
+            response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        app.request_seconds.observe(time.perf_counter() - t_start, 
+                                    method=request.method, route=route, status=status)
+
+def load_document_context(document: str) -> Tuple[Sequence, Mapping, Dict]:
+    """open the context written when the document was indexed
+
+    the memory-mapped context store is used, it is converted from the 
+    json context files once for documents indexed before it existed
+    returns:
+        context_list: sequence of context text by context index
+        sentence_context_dict: mapping of fragment uuid to context index
+        next_document_map: dict of document to following document ids, None if not built
+    """
+    context_store_loc = CONTEXT_STORE.format(document=document)
+    if not Path(context_store_loc).exists():
+        app.logger.info(f'converting json context of {document} to a context store')
+        convert_json_context(CONTEXT.format(document=document),
+                             FRAGMENT_TO_CONTEXT.format(document=document),
+                             context_store_loc)
+    context_store = ContextStore(context_store_loc)
+
+    next_document_map = None
+    if Path(NEXT_DOCUMENT.format(document=document)).exists():
+        with open(NEXT_DOCUMENT.format(document=document)) as f:
+            next_document_map = json.load(f)
+    return context_store.contexts, context_store.fragment_to_context, next_document_map
+
+def pipeline_key(pipeline: str, params: PipelineParams) -> tuple:
+    """key of a built pipeline in app.pipelines, the document comes first"""
+    return (params.document, pipeline, params.retriever, params.enricher, params.summarizer)
+
+def resolve_params(pipeline: str, data: SearchData) -> PipelineParams:
+    """pipeline configuration of a search, unset fields of data use the default configuration"""
+    params = app.default_params.get(pipeline, PipelineParams(document=ES_INDEX))
+    overrides = {k: getattr(data, k) for k in PipelineParams.__fields__ if getattr(data, k) is not None}
+    return params.copy(update=overrides)
+
+def instrument_components(search_pipeline) -> None:
+    """time the nodes of a search pipeline in app.node_seconds
+
+    components shared with pipelines built before are already timed and left as they are
+    """
+    for name in search_pipeline.graph.nodes:
+        component = search_pipeline.get_node(name)
+        if component is None or name == search_pipeline.root_node or component in app.timed_components:
+            continue
+        labels = {'node': name, 'component': type(component).__name__}
+        instrument_methods(component, ('run', 'run_batch'), 
+                           lambda method, seconds, labels=labels: app.node_seconds.observe(seconds, **labels))
+        app.timed_components.add(component)
+
+def build_pipeline_entry(pipeline: str, params: PipelineParams) -> Dict:
+    """build a search pipeline and its query batcher
+
+    context files and document store connections are reused from other 
+    pipelines on the same document, models are shared through the model registry
+    """
+    context = app.document_contexts.get(params.document)
+    if context is None:
+        context = load_document_context(params.document)
+        app.document_contexts.set(params.document, context)
+    context_list, sentence_context_dict, next_document_map = context
+
+    from pipelines.pipeline_factory import pipeline_factory
+    from util.util_funcs import connect_to_docstore
+
+    document_store = app.document_stores.get((params.document, params.retriever))
+    if document_store is None:
+        document_store = connect_to_docstore(retriever=params.retriever,
+                                             index=params.document)
+        instrument_methods(document_store, DOCSTORE_METHODS, 
+                           lambda method, seconds: app.docstore_seconds.observe(seconds, 
+                                                                               document=params.document,
+                                                                               method=method))
+        app.document_stores.set((params.document, params.retriever), document_store)
+
+    search_pipeline = pipeline_factory(pipeline_type = pipeline,
+                                        document_store = document_store, 
+                                        summarizer=params.summarizer,
+                                        retriever=params.retriever,
+                                        enricher=params.enricher, 
+                                        sentence_context_connector=sentence_context_dict,
+                                        context_store=context_list,
+                                        next_document_map=next_document_map,)
+    instrument_components(search_pipeline.pipeline)
+    batcher = QueryBatcher(search_pipeline, 
+                           max_batch_size=QUERY_BATCH_SIZE, 
+                           max_wait_ms=QUERY_BATCH_WAIT_MS)
+    return {
+        'pipeline': search_pipeline,
+        'batcher': batcher,
+        'params': params,
+        'generation': next(app.pipeline_counter),
+    }
+
+def get_pipeline(pipeline: str, params: PipelineParams) -> Dict:
+    """return the cached pipeline for a configuration, building it on a cache miss
+
+    parameters:
+        pipeline: type of search pipeline. currently summarization or qa
+        params: PipelineParams parmaterizing the search pipeline
+    returns: dict with the pipeline, its batcher, params and build generation
+    """
+    key = pipeline_key(pipeline, params)
+    entry = app.pipelines.get(key)
+    if entry is not None:
+        return entry
+    with app.pipeline_lock:
+        #another request may have built the pipeline while waiting for the lock
+        if key in app.pipelines:
+            return app.pipelines.get(key)
+        app.logger.info(f'building {pipeline} pipeline: {params.dict()}')
+        entry = build_pipeline_entry(pipeline, params)
+        app.pipelines.set(key, entry)
+    return entry
+
+def search_params(entry: Dict, data: SearchData) -> Dict:
+    """node parameters of a search, parameters of nodes the pipeline does not have are left out"""
+    params = {
+        "Retriever": {"top_k": data.n_retrieve},
+        "Ranker": {"top_k": data.n_rank, "latency_budget_ms": data.latency_budget_ms},
+        "PassageSelector": {"max_tokens": data.max_input_tokens},
+        "Summarizer": {"min_length": data.summary_min_length, 
+                       "max_length": data.summary_max_length, 
+                       "num_beams": data.num_beams},
+    }
+    pipeline = entry['pipeline'].pipeline
+    return {node: {k: v for k, v in node_params.items() if v is not None} 
+            for node, node_params in params.items() if pipeline.get_node(node) is not None}
+
+def result_cache_key(pipeline: str, entry: Dict, data: SearchData) -> tuple:
+    """key identifying a search result
+
+    includes the pipeline configuration, build generation and the version of the searched 
+    index so results computed before a pipeline or index rebuild are never returned
+    """
+    params = entry['params']
+    return (params.document,
+            pipeline, 
+            data.query, 
+            json.dumps(search_params(entry, data), sort_keys=True),
+            tuple(sorted(params.dict().items())),
+            app.index_versions.get(params.document, 0),
+            entry['generation'])
+
 #FastAPI routes
 @app.get('/')
 async def root() -> Response:
@@ -81,6 +357,8 @@ async def documents() -> Response:
 
     app.logger.info(f'getting available documents')
     if docstore_type == 'elasticsearch':
+        from elasticsearch import Elasticsearch
+
         try:
             container_prefix = os.environ['CONTAINER_PREFIX']
         except KeyError:
@@ -97,94 +375,417 @@ async def documents() -> Response:
 
     return res
 
+def _run_search(pipeline: str, data: SearchData) -> Dict:
+    """run a search pipeline, building the pipeline if it is not cached
+
+    blocking - executed in app.search_executor worker threads
+    """
+    entry = get_pipeline(pipeline, resolve_params(pipeline, data))
+    params = search_params(entry, data)
+    pipeline_type, result = entry['batcher'].run(data.query, params=params)
+    response = entry['pipeline'].prepare_response(result)
+    app.result_cache.set(result_cache_key(pipeline, entry, data), response)
+    app.search_results.inc(pipeline=pipeline, source='pipeline')
+    return response
+
 @app.post('/search/{pipeline}')
 async def search(pipeline: str, data: SearchData) -> Response:
     """search a document using the selected pipeline type:
-    
+
+    pipelines run in a bounded pool of worker threads so the event loop stays
+    responsive, a 503 is returned when too many searches are already waiting
     params:
         pipeline: type of search pipeline. currently summarization or qa
         data: SearchData parmaterizing the search
     """
-    params={
-        "Retriever": {"top_k": data.n_retrieve},
-        "Ranker": {"top_k": data.n_rank}
-    }
     app.logger.info(f'searching with query: {data.query} and pipeline: {pipeline}')
 
+    entry = app.pipelines.get(pipeline_key(pipeline, resolve_params(pipeline, data)))
+    if entry is not None:
+        response = app.result_cache.get(result_cache_key(pipeline, entry, data))
+        if response is not None:
+            app.logger.info(f'returning cached result for query: {data.query}')
+            app.search_results.inc(pipeline=pipeline, source='cache')
+            return response
+
     try:
-        app.pipelines[pipeline]
-    except KeyError:
-        default_retriever = 'Embedding'
-        default_enricher = 'next_document'
-        default_summarizer = 'local'
-
-        f = open(CONTEXT.format(document=ES_INDEX))
-        context_list = json.load(f)
-        f = open(FRAGMENT_TO_CONTEXT.format(document=ES_INDEX))
-        sentence_context_dict = json.load(f)
-        sentence_context_dict = {int(k):v for k,v in sentence_context_dict.items()}
-        document_store = connect_to_docstore(retriever=default_retriever,
-                                             index=ES_INDEX)
-        app.pipelines[pipeline] = pipeline_factory(pipeline_type = pipeline,
-                                            document_store = document_store, 
-                                            summarizer = default_summarizer, 
-                                            retriever=default_retriever,
-                                            enricher=default_enricher,
-                                            sentence_context_connector=sentence_context_dict,
-                                            context_store=context_list,)
-
-    pipeline_type, result = app.pipelines[pipeline].run(data.query, params=params)
-    response = app.pipelines[pipeline].prepare_response(result)
-    return response
+        return await app.search_executor.run(_run_search, pipeline, data)
+    except QueueFullError as e:
+        app.logger.warning(f'rejecting search, {e}')
+        raise HTTPException(status_code=503, detail='search queue is full, try again later')
   
+def sse_event(event: str, data) -> str:
+    """a server-sent event with json encoded data"""
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+def _run_retrieval(pipeline: str, data: SearchData) -> Tuple[Dict, Dict, list, list]:
+    """retrieve the relevant documents of a streamed search
+
+    blocking - executed in app.search_executor worker threads
+    returns: pipeline entry, node parameters, documents and the relevant documents response
+    """
+    entry = get_pipeline(pipeline, resolve_params(pipeline, data))
+    params = search_params(entry, data)
+    documents = entry['pipeline'].retrieve(data.query, params=params)
+    relevant_docs = entry['pipeline'].prepare_documents(documents)
+    return entry, params, documents, relevant_docs
+
+def _generate_summary(search_pipeline, 
+                      query: str, 
+                      documents: list, 
+                      params: Dict,
+                      send, 
+                      stop: threading.Event) -> None:
+    """generate a streamed summary, passing ('summary', piece), then ('done', None) or ('error', e) to send
+
+    blocking - executed in app.search_executor worker threads so streamed generation 
+    counts against the search concurrency limit. generation stops once stop is set
+    """
+    stream = search_pipeline.stream_summary(query, documents, params=params, stop=stop)
+    try:
+        for piece in stream:
+            if stop.is_set():
+                return
+            send(('summary', piece))
+        send(('done', None))
+    except Exception as e:
+        send(('error', e))
+    finally:
+        stream.close()
+
+async def stream_search_events(request: Request,
+                               pipeline: str, 
+                               data: SearchData, 
+                               entry: Dict, 
+                               relevant_docs: list,
+                               pieces: asyncio.Queue,
+                               stop: threading.Event) -> AsyncIterator[str]:
+    """relevant documents, then the summary as _generate_summary produces it, then the complete response
+
+    generation is stopped when the client disconnects or the response is cancelled.
+    the complete response is stored in the result cache once the summary is done
+    """
+    try:
+        yield sse_event('documents', relevant_docs)
+        summary = []
+        while True:
+            try:
+                kind, value = await asyncio.wait_for(pieces.get(), timeout=1.0)
+            except asyncio.TimeoutError:
+                kind = None
+            if await request.is_disconnected():
+                app.logger.info(f'client disconnected, stopping summary of query: {data.query}')
+                return
+            if kind == 'summary':
+                summary.append(value)
+                yield sse_event('summary', {'text': value})
+            elif kind == 'error':
+                app.logger.opt(exception=value).error(f'summary stream failed for query: {data.query}')
+                yield sse_event('error', {'success': False, 'error': str(value)})
+                return
+            elif kind == 'done':
+                break
+        response = {'summary': ''.join(summary), 'relevant_docs': relevant_docs}
+        app.result_cache.set(result_cache_key(pipeline, entry, data), response)
+        app.search_results.inc(pipeline=pipeline, source='pipeline')
+        yield sse_event('done', response)
+    finally:
+        stop.set()
+
+def cached_search_events(response: Dict) -> Iterator[str]:
+    """events of a cached search result, the summary is sent as a single piece"""
+    yield sse_event('documents', response['relevant_docs'])
+    yield sse_event('summary', {'text': response['summary']})
+    yield sse_event('done', response)
+
+@app.post('/search_stream/{pipeline}')
+async def search_stream(pipeline: str, data: SearchData, request: Request) -> Response:
+    """search a document, streaming the result as server-sent events
+
+    events, each with json data:
+        documents: relevant documents with their extended_content, sent as soon as they are ranked
+        summary: {'text': ...} piece of the summary, sent as it is generated
+        done: complete response, as returned by /search
+        error: {'success': False, 'error': ...} if the summary could not be generated
+    the local summarizer streams with greedy decoding, num_beams is ignored. 
+    the openai summarizer sends the summary as a single piece.
+    retrieval and generation each take a search_executor worker, a 503 is returned 
+    when the search queue is full. generation stops when the client disconnects
+    params:
+        pipeline: type of search pipeline. currently summarization
+        data: SearchData parmaterizing the search
+    """
+    app.logger.info(f'streaming search with query: {data.query} and pipeline: {pipeline}')
+    if pipeline != 'summarization':
+        return JSONResponse(status_code=400, 
+                            content={'success': False, 
+                                     'error': f'{pipeline} pipeline does not support streaming'})
+
+    entry = app.pipelines.get(pipeline_key(pipeline, resolve_params(pipeline, data)))
+    if entry is not None:
+        response = app.result_cache.get(result_cache_key(pipeline, entry, data))
+        if response is not None:
+            app.logger.info(f'returning cached result for query: {data.query}')
+            app.search_results.inc(pipeline=pipeline, source='cache')
+            return StreamingResponse(cached_search_events(response), media_type='text/event-stream')
+
+    try:
+        entry, params, documents, relevant_docs = await app.search_executor.run(_run_retrieval, pipeline, data)
+        loop = asyncio.get_running_loop()
+        pieces = asyncio.Queue()
+        stop = threading.Event()
+        app.search_executor.submit(_generate_summary, entry['pipeline'], data.query, documents, params,
+                                   lambda item: loop.call_soon_threadsafe(pieces.put_nowait, item), stop)
+    except QueueFullError as e:
+        app.logger.warning(f'rejecting search, {e}')
+        raise HTTPException(status_code=503, detail='search queue is full, try again later')
+    return StreamingResponse(stream_search_events(request, pipeline, data, entry, relevant_docs, pieces, stop), 
+                             media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.post('/build_pipeline/{pipeline}')
-async def build_pipeline(pipeline: str, params: PipelineParams) -> Response:
-    """build a search pipeline
-    
+def build_pipeline(pipeline: str, params: PipelineParams) -> Response:
+    """build a search pipeline and make it the default for searches of this pipeline type
+
+    pipelines are cached by configuration, switching back to a recently used 
+    configuration does not rebuild it
     params:
         pipeline: type of search pipeline. currently summarization or qa
         data: PipelineParams parmaterizing the search pipeline
     """
-    app.logger.info(f'rebuidling the {pipeline} pipeline for document: {params.document}, summarizer {params.summarizer}')
+    app.logger.info(f'setting the {pipeline} pipeline for document: {params.document}, summarizer {params.summarizer}')
     
-    f = open(CONTEXT.format(document=params.document))
-    context_list = json.load(f)
-    f = open(FRAGMENT_TO_CONTEXT.format(document=params.document))
-    sentence_context_dict = json.load(f)
-    sentence_context_dict = {int(k):v for k,v in sentence_context_dict.items()}
-    document_store = connect_to_docstore(retriever=params.retriever,
-                                         index=params.document)
-    app.pipelines[pipeline] = pipeline_factory(pipeline_type = pipeline,
-                                        document_store = document_store, 
-                                        summarizer=params.summarizer,
-                                        retriever=params.retriever,
-                                        enricher=params.enricher, 
-                                        sentence_context_connector=sentence_context_dict,
-                                        context_store=context_list,)
-    return {'success': True}
+    cached = pipeline_key(pipeline, params) in app.pipelines
+    get_pipeline(pipeline, params)
+    app.default_params[pipeline] = params
+    return {'success': True, 'cached': cached}
+
+@app.get('/pipelines')
+async def pipelines() -> Response:
+    """configurations of the cached pipelines, least recently used first,
+    with the ranking statistics of each pipeline"""
+    return [{**dict(zip(['document', 'pipeline', 'retriever', 'enricher', 'summarizer'], key)),
+             'ranker': entry['pipeline'].ranker.stats}
+            for key, entry in app.pipelines.items()]
+
+def index_job_done(job: IndexJob) -> None:
+    """drop pipelines searching the rebuilt document and invalidate cached search results
+
+    pipelines hold the context files and, for faiss, the index loaded when they were built,
+    they are rebuilt on the next search
+    """
+    app.logger.info(f'index job {job.id} finished with status {job.status}: {job.params}')
+    #a failed or cancelled build may still have modified the index
+    app.index_versions[job.doc_name] = app.index_versions.get(job.doc_name, 0) + 1
+    #under the build lock so a pipeline being built from the old index is dropped as well
+    with app.pipeline_lock:
+        app.pipelines.invalidate(lambda key: key[0] == job.doc_name)
+        app.document_contexts.pop(job.doc_name)
+        app.document_stores.invalidate(lambda key: key[0] == job.doc_name)
+    app.result_cache.invalidate(lambda key: key[0] == job.doc_name)
+
+def _build_index(**kwargs) -> None:
+    """build_index imported on first use, it loads haystack and the extractors"""
+    from indexer.build_indices import build_index
+    build_index(**kwargs)
 
 @app.post('/build_index')
 async def build_index(index_params: IndexParams) -> Response:
-    """build a search index on a document or set of documents
+    """start building a search index on a document or set of documents
 
-    WARNING: this can be a time consuming step depending on document size
-    and retriever type selected
+    the index is built in a background job, progress is reported by /jobs/{job_id}
     params:
         data: IndexParams parmaterizing the index to be built
+    returns: job id of the background job
     """
     app.logger.info(f'building index: {index_params.dict()}')
     try:
-        _build_index(doc_name = index_params.doc_name, 
-                    data_path = index_params.data_path, 
-                    ds_path = index_params.ds_path, 
-                    retriever = index_params.retriever, 
-                    docstore_type = index_params.docstore_type)
-        
-        app.logger.info(f'successfully built index: {index_params.dict()}')
-        return {'success': True}
-    except Exception as e:
-        return {'success': False,
-                'error': str(e)}
+        job = app.jobs.submit(index_params.doc_name,
+                              _build_index,
+                              on_done=index_job_done,
+                              doc_name = index_params.doc_name, 
+                              data_path = index_params.data_path, 
+                              ds_path = index_params.ds_path, 
+                              retriever = index_params.retriever, 
+                              docstore_type = index_params.docstore_type,
+                              n_workers = index_params.n_workers,
+                              incremental = index_params.incremental,
+                              chunk_size = index_params.chunk_size,
+                              embedding_batch_size = index_params.embedding_batch_size,
+                              embedding_precision = index_params.embedding_precision,
+                              faiss_index_type = index_params.faiss_index_type,
+                              faiss_nlist = index_params.faiss_nlist,
+                              faiss_train_size = index_params.faiss_train_size,
+                              pdf_backend = index_params.pdf_backend,
+                              sentence_splitter = index_params.sentence_splitter)
+    except JobConflictError as e:
+        return JSONResponse(status_code=409,
+                            content={'success': False,
+                                     'error': str(e)})
+    return {'success': True, 'job_id': job.id}
+
+@app.get('/jobs')
+async def list_jobs() -> Response:
+    """list index build jobs, most recent first"""
+    return [job.to_dict() for job in app.jobs.list()]
+
+@app.get('/jobs/{job_id}')
+async def get_job(job_id: str) -> Response:
+    """status and progress of an index build job"""
+    job = app.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f'unknown job: {job_id}')
+    return job.to_dict()
+
+@app.delete('/jobs/{job_id}')
+async def cancel_job(job_id: str) -> Response:
+    """request cancellation of an index build job"""
+    job = app.jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f'unknown job: {job_id}')
+    return job.to_dict()
+
+@app.get('/cache')
+async def cache_stats() -> Response:
+    """hit/miss statistics of the search result and pipeline caches"""
+    return {'results': app.result_cache.stats(),
+            'pipelines': app.pipelines.stats()}
+
+@app.get('/models')
+async def models() -> Response:
+    """models loaded in the shared model registry and their memory usage"""
+    from pipelines.model_registry import model_registry
+    return {'models': model_registry.describe(), 
+            'memory_bytes': model_registry.memory_usage()}
+
+@app.delete('/models')
+def evict_idle_models(max_idle: float) -> Response:
+    """evict models that no pipeline uses and that were released more than max_idle seconds ago"""
+    from pipelines.model_registry import model_registry
+    evicted = model_registry.evict_idle(max_idle)
+    return {'success': True, 'evicted': [list(key) for key in evicted]}
+
+@app.get('/search_queue')
+async def search_queue() -> Response:
+    """number of searches running and waiting for a worker"""
+    return app.search_executor.stats()
+
+def collect_metrics() -> List[Metric]:
+    """metrics read from the caches, the search queue and the rankers when /metrics is requested
+
+    caches and rankers shared by several pipelines are counted once
+    """
+    cache_hits = Counter('docapp_cache_hits_total', 'cache hits', ['cache'])
+    cache_misses = Counter('docapp_cache_misses_total', 'cache misses', ['cache'])
+    cache_size = Gauge('docapp_cache_size', 'entries held by caches', ['cache'])
+    cache_hit_ratio = Gauge('docapp_cache_hit_ratio', 'share of cache lookups that were hits', ['cache'])
+    search_queue = Gauge('docapp_search_queue', 'searches running and waiting for a worker', ['state'])
+    pipelines_built = Gauge('docapp_pipelines', 'search pipelines held in the pipeline cache')
+    ranker_queries = Counter('docapp_ranker_queries_total', 'queries ranked by adaptive rankers')
+    ranker_exits = Counter('docapp_ranker_early_exits_total', 
+                           'queries answered before the second ranking pass, by reason', ['reason'])
+    ranker_seconds = Counter('docapp_ranker_seconds_total', 'time spent in each ranking pass', ['stage'])
+
+    caches = {'results': [app.result_cache], 'pipelines': [app.pipelines], 
+              'query_embeddings': [], 'enricher_documents': []}
+    rankers = []
+    seen = set()
+    for _, entry in app.pipelines.items():
+        search_pipeline = entry['pipeline'].pipeline
+        for name in search_pipeline.graph.nodes:
+            component = search_pipeline.get_node(name)
+            #the dense retriever of a hybrid retriever holds the query embedding cache
+            for c in (component, getattr(component, 'dense_retriever', None)):
+                if c is None or id(c) in seen:
+                    continue
+                seen.add(id(c))
+                if hasattr(c, 'query_cache'):
+                    caches['query_embeddings'].append(c.query_cache)
+                if hasattr(c, 'document_cache'):
+                    caches['enricher_documents'].append(c.document_cache)
+                if isinstance(getattr(c, 'stats', None), dict) and 'first_pass_exits' in c.stats:
+                    rankers.append(c.stats)
+
+    for cache, instances in caches.items():
+        stats = [instance.stats() for instance in instances]
+        hits = sum(s['hits'] for s in stats)
+        misses = sum(s['misses'] for s in stats)
+        cache_hits.set(hits, cache=cache)
+        cache_misses.set(misses, cache=cache)
+        cache_size.set(sum(s['size'] for s in stats), cache=cache)
+        cache_hit_ratio.set(hits / (hits + misses) if hits + misses else 0.0, cache=cache)
+
+    queue = app.search_executor.stats()
+    search_queue.set(queue['running'], state='running')
+    search_queue.set(queue['queued'], state='queued')
+    pipelines_built.set(len(app.pipelines))
+
+    ranker_queries.set(sum(stats['queries'] for stats in rankers))
+    for reason in ('retriever', 'first_pass'):
+        ranker_exits.set(sum(stats[f'{reason}_exits'] for stats in rankers), reason=reason)
+    ranker_exits.set(sum(stats['budget_cuts'] for stats in rankers), reason='budget')
+    for stage in ('first_pass', 'second_pass'):
+        ranker_seconds.set(sum(stats[f'{stage}_ms'] for stats in rankers) / 1000, stage=stage)
+    return [cache_hits, cache_misses, cache_size, cache_hit_ratio, search_queue, pipelines_built,
+            ranker_queries, ranker_exits, ranker_seconds]
+
+app.metrics.add_collector(collect_metrics)
+
+@app.get('/metrics')
+async def metrics() -> Response:
+    """metrics in the prometheus text exposition format
+
+    request and node latency histograms, document store call times,
+    cache hit ratios, search queue depth and adaptive ranker early exits
+    """
+    return Response(app.metrics.render(), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+def warm_up(pipelines: Sequence[str]) -> None:
+    """build pipelines with their default configuration so the first searches do not load models
+
+    blocking - run in a background thread started after the server starts listening
+    parameters:
+        pipelines: pipeline types to build, e.g. summarization or qa
+    """
+    app.warmup['status'] = 'running'
+    for pipeline in pipelines:
+        app.warmup['pipelines'][pipeline] = 'building'
+        params = app.default_params.get(pipeline, PipelineParams(document=ES_INDEX))
+        try:
+            get_pipeline(pipeline, params)
+            app.warmup['pipelines'][pipeline] = 'ready'
+        except Exception as e:
+            #searches build the pipeline again and report the error
+            app.logger.exception(f'warm-up of {pipeline} pipeline failed')
+            app.warmup['pipelines'][pipeline] = f'failed: {e}'
+    app.warmup['status'] = 'done'
+    app.logger.info(f"warm-up done: {app.warmup['pipelines']}")
+
+@app.on_event('startup')
+def start_warm_up() -> None:
+    """start building the pipelines listed in WARMUP_PIPELINES in the background"""
+    pipelines = [p.strip() for p in os.environ.get('WARMUP_PIPELINES', WARMUP_PIPELINES).split(',') if p.strip()]
+    if not pipelines:
+        return
+    app.logger.info(f'warming up pipelines: {pipelines}')
+    app.warmup['status'] = 'pending'
+    threading.Thread(target=warm_up, args=(pipelines,), name='warm-up', daemon=True).start()
+
+@app.get('/ready')
+async def ready() -> Response:
+    """readiness check, 503 until the pipelines listed in WARMUP_PIPELINES are built
+
+    the root route answers as soon as the server listens, searches made before 
+    warm-up is done are served but may have to load models first
+    """
+    if app.warmup['status'] in ('pending', 'running'):
+        return JSONResponse(status_code=503, content={'ready': False, **app.warmup})
+    return {'ready': True, **app.warmup}
+
+@app.on_event('shutdown')
+def shutdown() -> None:
+    app.search_executor.shutdown(wait=False)
+    app.jobs.shutdown(wait=False)
     
 @app.post("/upload")
 async def create_upload_file(document: str = Form(...),
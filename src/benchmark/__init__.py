@@ -0,0 +1,31 @@
+import os
+import sys
+import importlib
+from pathlib import Path
+main_repo_path = str(Path(os.path.abspath(__file__)).parents[1]).replace('\\', '/')
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+#exported name -> module defining it, imported by __getattr__ on first use
+_exports = {
+    'SyntheticText': 'benchmark.corpus',
+    'write_html_corpus': 'benchmark.corpus',
+    'write_docx_corpus': 'benchmark.corpus',
+    'synthetic_queries': 'benchmark.corpus',
+    'index_corpus': 'benchmark.corpus',
+    'register_stub_models': 'benchmark.stubs',
+    'run_search_benchmark': 'benchmark.search_benchmark',
+    'format_report': 'benchmark.search_benchmark',
+    'run_index_benchmark': 'benchmark.index_benchmark',
+}
+
+def __getattr__(name: str):
+    """import exported names on first use so importing the package stays cheap"""
+    if name not in _exports:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(_exports[name]), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted({*globals(), *_exports})
@@ -0,0 +1,153 @@
+import os
+import sys
+import random
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from haystack.document_stores import BaseDocumentStore
+from haystack.schema import Document
+
+main_repo_path = str(Path(os.path.abspath(__file__)).parents[1]).replace('\\', '/')
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from extractor import DOCExtractorDefault, ContextStore
+from indexer import DOCIndexer
+from nodes import build_next_document_map
+
+_syllables = ['ac', 'al', 'an', 'ar', 'ba', 'be', 'ci', 'con', 'de', 'di', 'em', 'en', 'er', 'fa',
+              'ge', 'in', 'io', 'la', 'li', 'ma', 'mi', 'na', 'ne', 'no', 'or', 'pa', 'per', 'pro',
+              'ra', 're', 'ri', 'sa', 'se', 'si', 'ta', 'te', 'ti', 'to', 'tra', 'un', 've', 'vi']
+
+
+class SyntheticText:
+    """deterministic english-like text for benchmarks
+
+    words are drawn from a fixed vocabulary with zipf-like frequencies,
+    so some words are common to many paragraphs and others are rare as in real documents
+    """
+
+    def __init__(self, seed: int = 0, n_words: int = 5000) -> None:
+        """constructor
+
+        parameters:
+            seed: random seed, the same seed gives the same text
+            n_words: vocabulary size
+        """
+        self.rng = random.Random(seed)
+        vocabulary = set()
+        while len(vocabulary) < n_words:
+            vocabulary.add(''.join(self.rng.choices(_syllables, k=self.rng.randint(1, 4))))
+        self.vocabulary = sorted(vocabulary)
+        self.rng.shuffle(self.vocabulary)
+        self.weights = [1 / rank for rank in range(1, n_words + 1)]
+
+    def sentence(self, min_words: int = 6, max_words: int = 24) -> str:
+        n = self.rng.randint(min_words, max_words)
+        sentence = ' '.join(self.rng.choices(self.vocabulary, weights=self.weights, k=n))
+        return sentence.capitalize() + '.'
+
+    def paragraph(self, min_sentences: int = 2, max_sentences: int = 8) -> str:
+        return ' '.join(self.sentence() for _ in range(self.rng.randint(min_sentences, max_sentences)))
+
+    def query(self, paragraph: str, n_words: int = 5) -> str:
+        """query made of words of paragraph, so it has relevant documents"""
+        paragraph_words = [w.strip('.').lower() for w in paragraph.split()]
+        return ' '.join(self.rng.sample(paragraph_words, min(n_words, len(paragraph_words))))
+
+
+def write_html_corpus(path: str,
+                      n_files: int = 20,
+                      paragraphs_per_file: int = 50,
+                      seed: int = 0) -> Tuple[List[Path], List[str]]:
+    """write html files of synthetic paragraphs, in the layout the html parser extracts
+
+    parameters:
+        path: directory the files are written to, created if missing
+        n_files: number of files
+        paragraphs_per_file: number of <p> elements per file
+        seed: random seed
+    returns: written files and all paragraphs, e.g. to draw queries from
+    """
+    text = SyntheticText(seed)
+    path = Path(path)
+    path.mkdir(exist_ok=True, parents=True)
+    files = []
+    paragraphs = []
+    for i in range(n_files):
+        file_paragraphs = [text.paragraph() for _ in range(paragraphs_per_file)]
+        body = '\n'.join(f'<p>{p}</p>' for p in file_paragraphs)
+        file = path / f'section_{i:05d}.html'
+        file.write_text(f'<html><body><h1>Section {i}</h1>\n{body}\n</body></html>\n')
+        files.append(file)
+        paragraphs.extend(file_paragraphs)
+    return files, paragraphs
+
+def write_docx_corpus(path: str,
+                      n_files: int = 20,
+                      paragraphs_per_file: int = 50,
+                      seed: int = 0) -> Tuple[List[Path], List[str]]:
+    """write docx files of synthetic paragraphs, the same text write_html_corpus writes for a seed
+
+    parameters: see write_html_corpus
+    returns: written files and all paragraphs
+    """
+    from docx import Document as DocxDocument
+
+    text = SyntheticText(seed)
+    path = Path(path)
+    path.mkdir(exist_ok=True, parents=True)
+    files = []
+    paragraphs = []
+    for i in range(n_files):
+        file_paragraphs = [text.paragraph() for _ in range(paragraphs_per_file)]
+        doc = DocxDocument()
+        doc.add_heading(f'Section {i}', level=1)
+        for paragraph in file_paragraphs:
+            doc.add_paragraph(paragraph)
+        file = path / f'section_{i:05d}.docx'
+        doc.save(str(file))
+        files.append(file)
+        paragraphs.extend(file_paragraphs)
+    return files, paragraphs
+
+#corpus writers by file type
+CORPUS_WRITERS = {
+    'html': write_html_corpus,
+    'docx': write_docx_corpus,
+}
+
+def synthetic_queries(paragraphs: Sequence[str], n_queries: int = 100, seed: int = 0) -> List[str]:
+    """queries drawn from the words of random paragraphs"""
+    text = SyntheticText(seed)
+    return [text.query(text.rng.choice(paragraphs)) for _ in range(n_queries)]
+
+def index_corpus(corpus_path: str,
+                 name: str,
+                 document_store: BaseDocumentStore,
+                 embed: Callable[[List[Document]], Sequence] = None) -> Tuple[Sequence, Dict, Dict]:
+    """extract and index a corpus the way build_index does, with the context files in corpus_path
+
+    parameters:
+        corpus_path: directory of the corpus files
+        name: document name
+        document_store: document store the documents are written to
+        embed: optional function returning the embeddings of a list of documents
+    returns: contexts, fragment to context map and next document map, as used by the pipelines
+    """
+    context_dir = Path(corpus_path) / 'context'
+    extractor = DOCExtractorDefault(name=name,
+                                    context_loc=str(context_dir / 'context_{document}.json'),
+                                    fragment_to_context_loc=str(context_dir / 'fragment_context_{document}.json'),
+                                    context_store_loc=str(context_dir / 'context_{document}.bin'))
+    fragments = [f for _, file_fragments in extractor.iter_fragments(corpus_path) for f in file_fragments]
+    indexer = DOCIndexer(document_store)
+    documents = indexer.prepare(fragments)
+    if embed is not None:
+        for doc, embedding in zip(documents, embed(documents)):
+            doc.embedding = embedding
+    indexer.write(documents)
+
+    context_store = ContextStore(extractor.context_store_loc)
+    next_document_map = build_next_document_map(document_store.get_all_documents_generator(return_embedding=False))
+    return context_store.contexts, context_store.fragment_to_context, next_document_map
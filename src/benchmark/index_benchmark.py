@@ -0,0 +1,224 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Dict
+
+main_repo_path = str(Path(os.path.abspath(__file__)).parents[1]).replace('\\', '/')
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from benchmark.corpus import CORPUS_WRITERS
+from benchmark.stubs import StubEmbeddingRetriever, STUB_EMBEDDING_DIM
+from benchmark.search_benchmark import DOCSTORE_RETRIEVERS, create_benchmark_store
+from extractor import DOCExtractorDefault, preprocessing_pipeline
+from extractor.sentence_splitter import get_sentence_splitter
+from indexer import DOCIndexer
+from util.timing import StageProfiler
+
+BENCHMARK_DOCUMENT = 'benchmark'
+#stages of the extractor and indexer, in the order build_index runs them
+STAGES = ('parse', 'paragraphs_to_fragments', 'fragment_to_context_connector', 'write_context',
+          'preprocessing_pipeline', 'fragments_to_documents', 'preprocessor_split', 'embedding',
+          'write_documents')
+EMBEDDERS = ('stub', 'model', 'none')
+#embedding size of EMBEDDING_MODEL
+MODEL_EMBEDDING_DIM = 768
+
+
+def run_index_benchmark(file_type: str = 'html',
+                        n_files: int = 20,
+                        paragraphs_per_file: int = 50,
+                        docstore: str = 'memory',
+                        embedder: str = 'stub',
+                        embedding_precision: str = 'fp32',
+                        sentence_splitter: str = 'period',
+                        profile: str = None,
+                        profile_dir: str = None,
+                        seed: int = 0,
+                        path: str = None) -> Dict:
+    """indexing throughput of each extractor and indexer stage over a synthetic corpus
+
+    the stages DOCExtractorDefault and DOCIndexer run while iterating fragments and preparing
+    documents are run one by one, each timed on its own, so a stage whose throughput drops
+    as the corpus grows stands out. parsing runs in the current process
+    parameters:
+        file_type: html or docx
+        n_files, paragraphs_per_file: corpus size
+        docstore: memory or sqlite
+        embedder: stub for hashed embeddings, model to load the embedding model with
+            DocumentEmbedder, none to skip embedding
+        embedding_precision: precision of the embedding model, see DocumentEmbedder
+        sentence_splitter: period or aware, see extractor.sentence_splitter
+        profile: None, cprofile or tracemalloc, see StageProfiler
+        profile_dir: directory cprofile stats are written to, one file per stage
+        seed: random seed of the corpus
+        path: directory of the corpus and document store, a temporary directory if None
+    returns: report with the configuration and seconds, items and items per second of each stage
+    """
+    if file_type not in CORPUS_WRITERS:
+        raise ValueError(f'no corpus writer for {file_type}, expected one of {tuple(CORPUS_WRITERS)}')
+    if embedder not in EMBEDDERS:
+        raise ValueError(f'unknown embedder {embedder}, expected one of {EMBEDDERS}')
+
+    embed = None
+    embedding_dim = STUB_EMBEDDING_DIM
+    if embedder == 'stub':
+        embed = StubEmbeddingRetriever(embedding_dim=STUB_EMBEDDING_DIM).embed_documents
+    elif embedder == 'model':
+        from indexer.embedding import DocumentEmbedder
+        document_embedder = DocumentEmbedder(precision=embedding_precision)
+        embed = document_embedder.embed
+        embedding_dim = MODEL_EMBEDDING_DIM
+
+    profiler = StageProfiler(profile=profile, profile_dir=profile_dir)
+    with tempfile.TemporaryDirectory(prefix='index_benchmark_') as tmp_path:
+        path = path or tmp_path
+        corpus_path = Path(path) / 'corpus'
+        t_start = time.perf_counter()
+        files, _ = CORPUS_WRITERS[file_type](corpus_path, n_files=n_files,
+                                             paragraphs_per_file=paragraphs_per_file, seed=seed)
+        corpus_seconds = time.perf_counter() - t_start
+
+        context_dir = Path(path) / 'context'
+        extractor = DOCExtractorDefault(name=BENCHMARK_DOCUMENT,
+                                        file_types=[file_type],
+                                        sentence_splitter=get_sentence_splitter(sentence_splitter),
+                                        context_loc=str(context_dir / 'context_{document}.json'),
+                                        fragment_to_context_loc=str(context_dir / 'fragment_context_{document}.json'),
+                                        context_store_loc=str(context_dir / 'context_{document}.bin'))
+        document_store = create_benchmark_store(docstore, path, embedding_dim)
+        indexer = DOCIndexer(document_store)
+
+        #extraction, as DOCExtractorBase.iter_fragments runs it file by file
+        t_start = time.perf_counter()
+        fragments = []
+        for file in files:
+            with profiler.stage('parse'):
+                file_content, _ = extractor.file_extractor.parse_file(file)
+            profiler.count('parse', 1, 'files')
+            with profiler.stage('paragraphs_to_fragments'):
+                file_fragments = extractor.paragraphs_to_fragments(file_content)
+            profiler.count('paragraphs_to_fragments', len(file_content['text']), 'paragraphs')
+            file_fragments = extractor.assign_fragment_metadata(extractor.assign_fragment_uuids(file_fragments),
+                                                                file)
+            with profiler.stage('fragment_to_context_connector'):
+                extractor.file_level_operations(file_name=file, file_content=file_content,
+                                                fragments=file_fragments)
+            profiler.count('fragment_to_context_connector', len(file_fragments), 'fragments')
+            fragments.extend(file_fragments)
+        with profiler.stage('write_context'):
+            extractor.document_level_operations()
+        profiler.count('write_context', len(extractor.context), 'contexts')
+
+        #indexing, as DOCIndexer.prepare and write run it
+        with profiler.stage('preprocessing_pipeline'):
+            fragment_text, _ = preprocessing_pipeline([f.text for f in fragments],
+                                                      indexer.cleaning_pipeline, compiled=True)
+        profiler.count('preprocessing_pipeline', len(fragments), 'fragments')
+        for f, t in zip(fragments, fragment_text):
+            f.text = t
+        with profiler.stage('fragments_to_documents'):
+            document_docs = indexer.fragments_to_documents(indexer.enrich_metadata(fragments))
+        profiler.count('fragments_to_documents', len(fragments), 'fragments')
+        with profiler.stage('preprocessor_split'):
+            documents = indexer.preprocessor.run_batch(document_docs)[0]['documents'] if document_docs else []
+        profiler.count('preprocessor_split', len(document_docs), 'fragments')
+        if embedder == 'stub':
+            with profiler.stage('embedding'):
+                for doc, embedding in zip(documents, embed(documents)):
+                    doc.embedding = embedding
+            profiler.count('embedding', len(documents), 'documents')
+        elif embedder == 'model':
+            with profiler.stage('embedding'):
+                embed(documents)
+            profiler.count('embedding', len(documents), 'documents')
+        with profiler.stage('write_documents'):
+            indexer.write(documents)
+        profiler.count('write_documents', len(documents), 'documents')
+        total_seconds = time.perf_counter() - t_start
+        n_documents = document_store.get_document_count()
+
+    return {
+        'config': {
+            'file_type': file_type,
+            'files': n_files,
+            'paragraphs': n_files * paragraphs_per_file,
+            'fragments': len(fragments),
+            'documents': n_documents,
+            'docstore': docstore,
+            'embedder': embedder,
+            'sentence_splitter': sentence_splitter,
+            'profile': profile,
+        },
+        'corpus_seconds': corpus_seconds,
+        'total_seconds': total_seconds,
+        'documents_per_second': n_documents / total_seconds if total_seconds > 0 else float('inf'),
+        'stages': profiler.summary(),
+        'profiles': profiler.write_profiles(),
+    }
+
+def format_report(report: Dict) -> str:
+    """throughput table of an index benchmark report, stages in the order they run"""
+    config = report['config']
+    lines = [f"{config['files']} {config['file_type']} files, {config['paragraphs']} paragraphs, "
+             f"{config['fragments']} fragments, {config['documents']} documents, "
+             f"{config['docstore']} store, {config['embedder']} embedder",
+             f"indexed in {report['total_seconds']:.2f} s, {report['documents_per_second']:.1f} documents/s",
+             f"{'stage':30} {'seconds':>9} {'share':>6} {'items':>8} {'unit':>10} {'per s':>10}"
+             f"{'  peak MiB' if config['profile'] == 'tracemalloc' else ''}"]
+    total = sum(stage['seconds'] for stage in report['stages'].values())
+    for name, stage in report['stages'].items():
+        line = (f"{name:30} {stage['seconds']:>9.3f} {stage['seconds'] / total if total else 0:>6.1%} "
+                f"{stage['items']:>8} {stage['unit'] or '':>10} {stage['per_second']:>10.1f}")
+        if 'peak_bytes' in stage:
+            line += f" {stage['peak_bytes'] / 2**20:>9.1f}"
+        lines.append(line)
+    for name, stage in report['stages'].items():
+        if stage.get('top_functions'):
+            lines.append(f'\n{name}, functions by cumulative time:')
+            lines.extend(stage['top_functions'])
+    if report['profiles']:
+        lines.append(f"\ncprofile stats written to {os.path.dirname(report['profiles'][0])}")
+    return '\n'.join(lines)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='indexing throughput benchmark over a synthetic corpus')
+    parser.add_argument('--file-types', nargs='+', default=['html'], choices=list(CORPUS_WRITERS),
+                        help='corpus file types benchmarked one after another')
+    parser.add_argument('--files', type=int, nargs='+', default=[20],
+                        help='corpus sizes in files, benchmarked one after another to show scaling')
+    parser.add_argument('--paragraphs', type=int, default=50, help='paragraphs per file')
+    parser.add_argument('--docstore', default='memory', choices=list(DOCSTORE_RETRIEVERS))
+    parser.add_argument('--embedder', default='stub', choices=list(EMBEDDERS))
+    parser.add_argument('--precision', default='fp32', help='embedding model precision with --embedder model')
+    parser.add_argument('--sentence-splitter', default='period', choices=['period', 'aware'])
+    parser.add_argument('--profile', choices=['cprofile', 'tracemalloc'])
+    parser.add_argument('--profile-dir', default='/tmp/logs/index_profile',
+                        help='directory of the cprofile stats, a subdirectory per run')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='file the reports are written to as json')
+    args = parser.parse_args()
+
+    reports = []
+    for _file_type in args.file_types:
+        for _n_files in args.files:
+            _report = run_index_benchmark(file_type=_file_type,
+                                          n_files=_n_files,
+                                          paragraphs_per_file=args.paragraphs,
+                                          docstore=args.docstore,
+                                          embedder=args.embedder,
+                                          embedding_precision=args.precision,
+                                          sentence_splitter=args.sentence_splitter,
+                                          profile=args.profile,
+                                          profile_dir=os.path.join(args.profile_dir, f'{_file_type}_{_n_files}'),
+                                          seed=args.seed)
+            print(format_report(_report))
+            print()
+            reports.append(_report)
+    if args.json:
+        with open(args.json, 'w') as fp:
+            json.dump(reports, fp, indent=2)
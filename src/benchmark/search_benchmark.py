@@ -0,0 +1,194 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+from haystack.document_stores import BaseDocumentStore, InMemoryDocumentStore, SQLDocumentStore
+
+main_repo_path = str(Path(os.path.abspath(__file__)).parents[1]).replace('\\', '/')
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from benchmark.corpus import write_html_corpus, synthetic_queries, index_corpus
+from benchmark.stubs import register_stub_models, StubEmbeddingRetriever, STUB_EMBEDDING_DIM
+from pipelines import pipeline_factory
+from util.timing import LatencyRecorder, instrument_pipeline
+
+BENCHMARK_DOCUMENT = 'benchmark'
+#retrievers each benchmark document store supports
+DOCSTORE_RETRIEVERS = {
+    'memory': ('Embedding', 'BM25', 'TfIdf', 'Hybrid'),
+    'sqlite': ('TfIdf',),
+}
+
+
+def create_benchmark_store(docstore: str, path: str, embedding_dim: int) -> BaseDocumentStore:
+    """in-memory or sqlite document store holding the benchmark corpus"""
+    if docstore == 'memory':
+        return InMemoryDocumentStore(embedding_dim=embedding_dim, similarity='dot_product', use_bm25=True)
+    elif docstore == 'sqlite':
+        return SQLDocumentStore(url=f'sqlite:///{path}/benchmark.db')
+    raise NotImplementedError(f'no benchmark document store type: {docstore}')
+
+def run_search_benchmark(pipeline: str = 'summarization',
+                         retriever: str = 'Embedding',
+                         docstore: str = 'memory',
+                         enricher: str = 'next_document',
+                         n_files: int = 20,
+                         paragraphs_per_file: int = 50,
+                         n_queries: int = 100,
+                         n_warmup: int = 5,
+                         params: Dict = None,
+                         stub_models: bool = True,
+                         ms_per_query: float = 0.0,
+                         ms_per_document: float = 0.0,
+                         ms_per_token: float = 0.0,
+                         seed: int = 0,
+                         path: str = None) -> Dict:
+    """search latency of a pipeline over a synthetic corpus
+
+    the corpus is extracted and indexed with DOCExtractorDefault and DOCIndexer.
+    with stub_models the pipeline models are replaced by stubs from benchmark.stubs so the
+    benchmark runs offline on cpu, measuring pipeline and document store overhead.
+    the ms_per_ arguments add simulated model time to the stubs
+    parameters:
+        pipeline: summarization or qa
+        retriever: retriever type, see DOCSTORE_RETRIEVERS
+        docstore: memory or sqlite
+        enricher: enricher mode, None for no enrichment
+        n_files, paragraphs_per_file: corpus size
+        n_queries: number of timed queries
+        n_warmup: number of untimed queries run first
+        params: node parameters passed with each query
+        stub_models: replace the models by stubs, the real models are downloaded otherwise
+        ms_per_query, ms_per_document, ms_per_token: simulated model time, see register_stub_models
+        seed: random seed of the corpus and queries
+        path: directory of the corpus and document store, a temporary directory if None
+    returns: report with the configuration, end to end and per node latency
+    """
+    if retriever not in DOCSTORE_RETRIEVERS[docstore]:
+        raise ValueError(f'retriever {retriever} is not supported by the {docstore} benchmark store, '
+                         f'expected one of {DOCSTORE_RETRIEVERS[docstore]}')
+    if not stub_models and retriever in ('Embedding', 'Hybrid'):
+        raise ValueError('embedding retrievers need stub models, the benchmark store uses stub embeddings')
+    if stub_models:
+        register_stub_models(embedding_dim=STUB_EMBEDDING_DIM, ms_per_query=ms_per_query,
+                             ms_per_document=ms_per_document, ms_per_token=ms_per_token)
+
+    with tempfile.TemporaryDirectory(prefix='search_benchmark_') as tmp_path:
+        path = path or tmp_path
+        t_start = time.perf_counter()
+        _, paragraphs = write_html_corpus(path, n_files=n_files, paragraphs_per_file=paragraphs_per_file, seed=seed)
+        document_store = create_benchmark_store(docstore, path, STUB_EMBEDDING_DIM)
+        embed = None
+        if retriever in ('Embedding', 'Hybrid'):
+            embed = StubEmbeddingRetriever(embedding_dim=STUB_EMBEDDING_DIM).embed_documents
+        contexts, fragment_to_context, next_document_map = index_corpus(path, BENCHMARK_DOCUMENT,
+                                                                        document_store, embed=embed)
+        index_seconds = time.perf_counter() - t_start
+
+        search_pipeline = pipeline_factory(pipeline_type=pipeline,
+                                           document_store=document_store,
+                                           summarizer='local',
+                                           retriever=retriever,
+                                           enricher=enricher,
+                                           sentence_context_connector=fragment_to_context,
+                                           context_store=contexts,
+                                           next_document_map=next_document_map)
+        recorder = LatencyRecorder()
+        instrument_pipeline(search_pipeline.pipeline, recorder.record)
+
+        queries = synthetic_queries(paragraphs, n_queries=n_warmup + n_queries, seed=seed)
+        for query in queries[:n_warmup]:
+            search_pipeline.run(query, params=params)
+        recorder.reset()
+
+        t_start = time.perf_counter()
+        for query in queries[n_warmup:]:
+            with recorder.time('total'):
+                search_pipeline.run(query, params=params)
+        search_seconds = time.perf_counter() - t_start
+        n_documents = document_store.get_document_count()
+
+    return {
+        'config': {
+            'pipeline': pipeline,
+            'retriever': retriever,
+            'docstore': docstore,
+            'enricher': enricher,
+            'stub_models': stub_models,
+            'documents': n_documents,
+            'queries': n_queries,
+            'params': params,
+        },
+        'index_seconds': index_seconds,
+        'queries_per_second': n_queries / search_seconds if search_seconds > 0 else float('inf'),
+        'latency': recorder.summary(),
+    }
+
+def format_report(report: Dict) -> str:
+    """latency table of a benchmark report, total first then nodes in pipeline order"""
+    config = report['config']
+    lines = [f"{config['pipeline']} pipeline, {config['retriever']} retriever, {config['docstore']} store, "
+             f"{config['documents']} documents, {config['queries']} queries"
+             f"{', stub models' if config['stub_models'] else ''}",
+             f"indexed in {report['index_seconds']:.2f} s, {report['queries_per_second']:.1f} queries/s",
+             f"{'step':16} {'count':>6} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'per s':>9}"]
+    latency = report['latency']
+    for name in ['total'] + [name for name in latency if name != 'total']:
+        row = latency.get(name)
+        if row is None:
+            continue
+        lines.append(f"{name:16} {row['count']:>6} {row['mean_ms']:>9.2f} {row['p50_ms']:>9.2f} "
+                     f"{row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['per_second']:>9.1f}")
+    return '\n'.join(lines)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='search latency benchmark over a synthetic corpus')
+    parser.add_argument('--pipeline', default='summarization', choices=['summarization', 'qa'])
+    parser.add_argument('--retrievers', nargs='+', default=['Embedding'],
+                        help='retriever types benchmarked one after another')
+    parser.add_argument('--docstore', default='memory', choices=list(DOCSTORE_RETRIEVERS))
+    parser.add_argument('--enricher', default='next_document')
+    parser.add_argument('--files', type=int, default=20)
+    parser.add_argument('--paragraphs', type=int, default=50, help='paragraphs per file')
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--n-retrieve', type=int, default=10)
+    parser.add_argument('--n-rank', type=int, default=5)
+    parser.add_argument('--real-models', action='store_true',
+                        help='load the configured models instead of stubs')
+    parser.add_argument('--ms-per-query', type=float, default=0.0, help='simulated query encoding time')
+    parser.add_argument('--ms-per-document', type=float, default=0.0, help='simulated ranking time per document')
+    parser.add_argument('--ms-per-token', type=float, default=0.0, help='simulated generation time per token')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='file the reports are written to as json')
+    args = parser.parse_args()
+
+    reports = []
+    for _retriever in args.retrievers:
+        _report = run_search_benchmark(pipeline=args.pipeline,
+                                       retriever=_retriever,
+                                       docstore=args.docstore,
+                                       enricher=None if args.enricher == 'none' else args.enricher,
+                                       n_files=args.files,
+                                       paragraphs_per_file=args.paragraphs,
+                                       n_queries=args.queries,
+                                       n_warmup=args.warmup,
+                                       params={'Retriever': {'top_k': args.n_retrieve},
+                                               'Ranker': {'top_k': args.n_rank}},
+                                       stub_models=not args.real_models,
+                                       ms_per_query=args.ms_per_query,
+                                       ms_per_document=args.ms_per_document,
+                                       ms_per_token=args.ms_per_token,
+                                       seed=args.seed)
+        print(format_report(_report))
+        print()
+        reports.append(_report)
+    if args.json:
+        with open(args.json, 'w') as fp:
+            json.dump(reports, fp, indent=2)
@@ -0,0 +1,252 @@
+import os
+import sys
+import re
+import time
+import zlib
+from pathlib import Path
+from typing import List, Dict, Optional, Union
+
+import numpy as np
+from haystack.nodes import BaseRanker, BaseReader, BaseRetriever
+from haystack.document_stores import BaseDocumentStore
+from haystack.schema import Document, Answer
+
+main_repo_path = str(Path(os.path.abspath(__file__)).parents[1]).replace('\\', '/')
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from util.vars import EMBEDDING_MODEL, RANKER_MODEL, RANKER_FIRST_PASS_MODEL, SUMMARIZER_MODEL
+
+#model names the QA pipeline loads its reader with
+READER_MODEL = 'deepset/roberta-base-squad2'
+STUB_EMBEDDING_DIM = 256
+
+_re_word = re.compile(r'\w+')
+
+def words(text: str) -> List[str]:
+    return _re_word.findall(text.lower())
+
+def hashed_embedding(text: str, dim: int = STUB_EMBEDDING_DIM) -> np.ndarray:
+    """unit length bag of words embedding, each word hashed to a signed dimension"""
+    embedding = np.zeros(dim, dtype='float32')
+    for word in words(text):
+        h = zlib.crc32(word.encode())
+        embedding[h % dim] += 1.0 if (h >> 16) & 1 else -1.0
+    norm = np.linalg.norm(embedding)
+    return embedding / norm if norm > 0 else embedding
+
+def overlap_score(query: str, text: str) -> float:
+    """share of the query words found in text"""
+    query_words = set(words(query))
+    if not query_words:
+        return 0.0
+    return len(query_words & set(words(text))) / len(query_words)
+
+
+class StubEmbeddingRetriever(BaseRetriever):
+    """embedding retriever with hashed bag of words embeddings, no model is loaded
+
+    has the methods of EmbeddingRetriever the pipelines and build_index use
+    """
+
+    def __init__(self,
+                 document_store: BaseDocumentStore = None,
+                 embedding_dim: int = STUB_EMBEDDING_DIM,
+                 ms_per_query: float = 0.0) -> None:
+        """constructor
+
+        parameters:
+            document_store: document store searched, set by the model registry per pipeline
+            embedding_dim: embedding size, must match the document store
+            ms_per_query: simulated query encoding time in milliseconds
+        """
+        super().__init__()
+        self.document_store = document_store
+        self.embedding_dim = embedding_dim
+        self.ms_per_query = ms_per_query
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        if self.ms_per_query:
+            time.sleep(self.ms_per_query * len(queries) / 1000)
+        return np.stack([hashed_embedding(q, self.embedding_dim) for q in queries])
+
+    def embed_documents(self, documents: List[Document]) -> np.ndarray:
+        return np.stack([hashed_embedding(doc.content, self.embedding_dim) for doc in documents])
+
+    def retrieve(self,
+                 query: str,
+                 filters: Optional[Dict] = None,
+                 top_k: Optional[int] = None,
+                 index: str = None,
+                 headers: Optional[Dict[str, str]] = None,
+                 scale_score: bool = None,
+                 document_store: Optional[BaseDocumentStore] = None) -> List[Document]:
+        document_store = document_store or self.document_store
+        return document_store.query_by_embedding(self.embed_queries([query])[0],
+                                                 filters=filters,
+                                                 top_k=top_k or 10,
+                                                 index=index)
+
+    def retrieve_batch(self,
+                       queries: List[str],
+                       filters: Optional[Union[Dict, List[Dict]]] = None,
+                       top_k: Optional[int] = None,
+                       index: str = None,
+                       headers: Optional[Dict[str, str]] = None,
+                       batch_size: Optional[int] = None,
+                       scale_score: bool = None,
+                       document_store: Optional[BaseDocumentStore] = None) -> List[List[Document]]:
+        return [self.retrieve(query, filters=filters, top_k=top_k, index=index, document_store=document_store)
+                for query in queries]
+
+
+class StubRanker(BaseRanker):
+    """cross-encoder stand-in scoring documents by query word overlap"""
+
+    def __init__(self, ms_per_document: float = 0.0) -> None:
+        """constructor
+
+        parameters:
+            ms_per_document: simulated scoring time per document in milliseconds
+        """
+        super().__init__()
+        self.ms_per_document = ms_per_document
+
+    def predict(self,
+                query: str,
+                documents: List[Document],
+                top_k: Optional[int] = None) -> List[Document]:
+        if self.ms_per_document:
+            time.sleep(self.ms_per_document * len(documents) / 1000)
+        scored = []
+        for doc in documents:
+            scored.append(Document(content=doc.content, id=doc.id, meta=doc.meta,
+                                   score=overlap_score(query, doc.content)))
+        scored.sort(key=lambda doc: doc.score, reverse=True)
+        return scored[:top_k]
+
+    def predict_batch(self,
+                      queries: List[str],
+                      documents: Union[List[Document], List[List[Document]]],
+                      top_k: Optional[int] = None,
+                      batch_size: Optional[int] = None) -> Union[List[Document], List[List[Document]]]:
+        if len(documents) > 0 and isinstance(documents[0], Document):
+            return [self.predict(query, documents, top_k=top_k) for query in queries]
+        return [self.predict(query, docs, top_k=top_k) for query, docs in zip(queries, documents)]
+
+
+class StubTokenizer:
+    """whitespace tokenizer with the methods of a huggingface tokenizer the summarizer nodes use"""
+    model_max_length = 512
+
+    def __call__(self, texts, verbose: bool = False, **kwargs) -> Dict:
+        if isinstance(texts, str):
+            return {'input_ids': texts.split()}
+        return {'input_ids': [text.split() for text in texts]}
+
+    def tokenize(self, text: str) -> List[str]:
+        return text.split()
+
+    def convert_tokens_to_string(self, tokens: List[str]) -> str:
+        return ' '.join(tokens)
+
+
+class StubSummarizationPipeline:
+    """huggingface summarization pipeline stand-in, the summary is the leading words of the input"""
+
+    def __init__(self, ms_per_token: float = 0.0) -> None:
+        """constructor
+
+        parameters:
+            ms_per_token: simulated generation time per summary token and batch in milliseconds
+        """
+        self.tokenizer = StubTokenizer()
+        self.ms_per_token = ms_per_token
+
+    def __call__(self, texts: List[str], max_length: int = 400, **kwargs) -> List[Dict]:
+        truncated = [text.split()[:self.tokenizer.model_max_length] for text in texts]
+        summaries = [' '.join(tokens[:max_length]) for tokens in truncated]
+        if self.ms_per_token:
+            longest = max((len(summary.split()) for summary in summaries), default=0)
+            time.sleep(self.ms_per_token * longest / 1000)
+        return [{'summary_text': summary} for summary in summaries]
+
+
+class StubTransformersSummarizer:
+    """TransformersSummarizer stand-in for LengthAwareSummarizer, which only uses its summarizer"""
+
+    def __init__(self, ms_per_token: float = 0.0) -> None:
+        self.summarizer = StubSummarizationPipeline(ms_per_token=ms_per_token)
+
+
+class StubReader(BaseReader):
+    """extractive reader stand-in answering with the best matching sentence of each document"""
+
+    def __init__(self, ms_per_document: float = 0.0) -> None:
+        """constructor
+
+        parameters:
+            ms_per_document: simulated reading time per document in milliseconds
+        """
+        super().__init__()
+        self.ms_per_document = ms_per_document
+        self.return_no_answers = False
+
+    def predict(self,
+                query: str,
+                documents: List[Document],
+                top_k: Optional[int] = None) -> Dict:
+        if self.ms_per_document:
+            time.sleep(self.ms_per_document * len(documents) / 1000)
+        answers = []
+        for doc in documents:
+            sentences = [s for s in doc.content.split('.') if s.strip()] or [doc.content]
+            best = max(sentences, key=lambda sentence: overlap_score(query, sentence))
+            answers.append(Answer(answer=best.strip(),
+                                  type='extractive',
+                                  score=overlap_score(query, best),
+                                  context=doc.content,
+                                  document_ids=[doc.id],
+                                  meta=dict(doc.meta)))
+        answers.sort(key=lambda answer: answer.score, reverse=True)
+        return {'query': query, 'no_ans_gap': 0.0, 'answers': answers[:top_k or 10]}
+
+    def predict_batch(self,
+                      queries: List[str],
+                      documents: Union[List[Document], List[List[Document]]],
+                      top_k: Optional[int] = None,
+                      batch_size: Optional[int] = None) -> Dict:
+        if len(documents) > 0 and isinstance(documents[0], Document):
+            documents = [documents] * len(queries)
+        results = [self.predict(query, docs, top_k=top_k) for query, docs in zip(queries, documents)]
+        return {'queries': queries,
+                'no_ans_gaps': [result['no_ans_gap'] for result in results],
+                'answers': [result['answers'] for result in results]}
+
+
+def register_stub_models(registry=None,
+                         embedding_dim: int = STUB_EMBEDDING_DIM,
+                         ms_per_query: float = 0.0,
+                         ms_per_document: float = 0.0,
+                         ms_per_token: float = 0.0) -> None:
+    """register stub models under the names the search pipelines load,
+    so pipelines are built without downloading or loading any model
+
+    parameters:
+        registry: ModelRegistry, the shared model registry if None
+        embedding_dim: embedding size of the stub embedding retriever
+        ms_per_query: simulated query encoding time of the embedding retriever
+        ms_per_document: simulated scoring time per document of the rankers and the reader
+        ms_per_token: simulated generation time per summary token of the summarizer
+    """
+    if registry is None:
+        from pipelines.model_registry import model_registry as registry
+
+    registry.register('embedding_retriever', EMBEDDING_MODEL,
+                      StubEmbeddingRetriever(embedding_dim=embedding_dim, ms_per_query=ms_per_query))
+    registry.register('ranker', RANKER_MODEL, StubRanker(ms_per_document=ms_per_document))
+    if RANKER_FIRST_PASS_MODEL is not None:
+        #the first pass model is cheaper, simulated at half the cost
+        registry.register('ranker', RANKER_FIRST_PASS_MODEL, StubRanker(ms_per_document=ms_per_document / 2))
+    registry.register('summarizer', SUMMARIZER_MODEL, StubTransformersSummarizer(ms_per_token=ms_per_token))
+    registry.register('reader', READER_MODEL, StubReader(ms_per_document=ms_per_document))
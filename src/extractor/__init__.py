@@ -1,9 +1,29 @@
 import os
 import sys
+import importlib
 from pathlib import Path
 main_repo_path = str(Path(os.path.abspath(__file__)).parents[1]).replace('\\', '/')
 if main_repo_path not in sys.path:
     sys.path.append(main_repo_path)
 
-from extractor.doc_extractor import DOCExtractorDefault, Fragment
-from extractor.text_preprocessing import preprocessing_pipeline
\ No newline at end of file
+#exported name -> module defining it, imported by __getattr__ on first use
+_exports = {
+    'DOCExtractorDefault': 'extractor.doc_extractor',
+    'Fragment': 'extractor.doc_extractor',
+    'preprocessing_pipeline': 'extractor.text_preprocessing',
+    'CompiledPipeline': 'extractor.text_preprocessing',
+    'SentenceSplitter': 'extractor.sentence_splitter',
+    'ContextStore': 'extractor.context_store',
+    'convert_json_context': 'extractor.context_store',
+}
+
+def __getattr__(name: str):
+    """import exported names on first use so importing the package stays cheap"""
+    if name not in _exports:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(_exports[name]), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted({*globals(), *_exports})
@@ -0,0 +1,168 @@
+import os
+import json
+import mmap
+import struct
+from pathlib import Path
+from collections.abc import Mapping, Sequence
+from typing import Dict, Iterator, Optional, Union
+
+import numpy as np
+
+MAGIC = b'CTXSTORE'
+VERSION = 1
+#magic, version, length of the uuid table, number of contexts
+HEADER = struct.Struct('<8sIQQ')
+
+
+class ContextStore:
+    """read-only, memory-mapped store of the context around each fragment
+
+    file layout, all integers little endian:
+        header: magic, version, uuid table length, number of contexts
+        uuid table: int64 context index for each fragment uuid, -1 if the uuid has no context
+        offsets table: uint64 start of each context in the text blob, plus the end of the blob
+        text blob: utf-8 encoded contexts
+    lookups read directly from the mapped file, no dictionaries are built on load.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        """open a context store written by ContextStore.write
+
+        parameters:
+            path: location of the context store file
+        """
+        self.path = Path(path)
+        with open(self.path, 'rb') as fp:
+            self._mmap = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_uuids, n_contexts = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{self.path} is not a context store')
+        if version != VERSION:
+            raise ValueError(f'unsupported context store version {version} in {self.path}')
+
+        offset = HEADER.size
+        self._uuid_table = np.frombuffer(self._mmap, dtype='<i8', count=n_uuids, offset=offset)
+        offset += 8 * n_uuids
+        self._offsets = np.frombuffer(self._mmap, dtype='<u8', count=n_contexts + 1, offset=offset)
+        self._blob_start = offset + 8 * (n_contexts + 1)
+
+        self.fragment_to_context = FragmentToContext(self)
+        self.contexts = Contexts(self)
+
+    @staticmethod
+    def write(path: Union[str, Path],
+              fragment_to_context: Dict[int, str],
+              context: Dict[str, str]) -> None:
+        """write a context store
+
+        the file is written next to path and moved into place,
+        stores opened on the previous file keep working
+        parameters:
+            path: location of the context store file
+            fragment_to_context: maps from fragment uuid to context id
+            context: dictionary of context id to context text
+        """
+        context_index = {}
+        encoded = []
+        for context_id, text in context.items():
+            context_index[context_id] = len(encoded)
+            encoded.append(text.encode('utf-8'))
+
+        n_uuids = max((int(k) for k in fragment_to_context), default=-1) + 1
+        uuid_table = np.full(n_uuids, -1, dtype='<i8')
+        for fragment_uuid, context_id in fragment_to_context.items():
+            uuid_table[int(fragment_uuid)] = context_index.get(context_id, -1)
+
+        offsets = np.zeros(len(encoded) + 1, dtype='<u8')
+        offsets[1:] = np.cumsum([len(e) for e in encoded], dtype='<u8')
+
+        path = Path(path)
+        path.parent.mkdir(exist_ok=True, parents=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'wb') as fp:
+            fp.write(HEADER.pack(MAGIC, VERSION, n_uuids, len(encoded)))
+            fp.write(uuid_table.tobytes())
+            fp.write(offsets.tobytes())
+            for e in encoded:
+                fp.write(e)
+        os.replace(tmp_path, path)
+
+    def context_index(self, fragment_uuid: int) -> int:
+        """index of the context of a fragment, -1 if the fragment has no context"""
+        if 0 <= fragment_uuid < len(self._uuid_table):
+            return int(self._uuid_table[fragment_uuid])
+        return -1
+
+    def get_text(self, index: int) -> str:
+        """context text by context index"""
+        start = self._blob_start + int(self._offsets[index])
+        end = self._blob_start + int(self._offsets[index + 1])
+        return self._mmap[start:end].decode('utf-8')
+
+    def get_context(self, fragment_uuid: int) -> Optional[str]:
+        """context text around a fragment, None if the fragment has no context"""
+        index = self.context_index(fragment_uuid)
+        return None if index < 0 else self.get_text(index)
+
+    def close(self) -> None:
+        self._uuid_table = None
+        self._offsets = None
+        self._mmap.close()
+
+    def __enter__(self) -> 'ContextStore':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class FragmentToContext(Mapping):
+    """read-only mapping of fragment uuid to context index of a ContextStore,
+    replaces the fragment to context dictionary"""
+
+    def __init__(self, store: ContextStore) -> None:
+        self._store = store
+
+    def __getitem__(self, fragment_uuid: int) -> int:
+        index = self._store.context_index(int(fragment_uuid))
+        if index < 0:
+            raise KeyError(fragment_uuid)
+        return index
+
+    def __iter__(self) -> Iterator[int]:
+        return (int(i) for i in np.flatnonzero(self._store._uuid_table >= 0))
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._store._uuid_table >= 0))
+
+
+class Contexts(Sequence):
+    """read-only sequence of the context texts of a ContextStore, indexed by context index"""
+
+    def __init__(self, store: ContextStore) -> None:
+        self._store = store
+
+    def __getitem__(self, index: int) -> str:
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self._store.get_text(index)
+
+    def __len__(self) -> int:
+        return len(self._store._offsets) - 1
+
+
+def convert_json_context(context_loc: Union[str, Path],
+                         fragment_to_context_loc: Union[str, Path],
+                         context_store_loc: Union[str, Path]) -> None:
+    """convert context json files written by DOCExtractorDefault to a context store
+
+    parameters:
+        context_loc: json file of context id to context text
+        fragment_to_context_loc: json file of fragment uuid to context id
+        context_store_loc: location of the context store file to write
+    """
+    with open(context_loc) as fp:
+        context = json.load(fp)
+    with open(fragment_to_context_loc) as fp:
+        fragment_to_context = json.load(fp)
+    ContextStore.write(context_store_loc, fragment_to_context, context)
@@ -1,18 +1,24 @@
 import os 
 import sys
 from pathlib import Path
-from typing import Union, List, Tuple, Dict, Callable
+from typing import Union, List, Tuple, Dict, Callable, Iterator
 import json
 import uuid
+import itertools
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 from .text_preprocessing import preprocessing_pipeline
 from .file_extractor import FileExtractor
+from .sentence_splitter import SentenceSplitter, period_splitter, join_sentences
+from .context_store import ContextStore
 
 main_repo_path = str(Path(os.path.abspath(__file__)).parents[1]).replace('\\', '/')
 if main_repo_path not in sys.path:
     sys.path.append(main_repo_path)
 
-from util.vars import CONTEXT, FRAGMENT_TO_CONTEXT
+from util.vars import CONTEXT, FRAGMENT_TO_CONTEXT, CONTEXT_STORE
 
 class Fragment:
     """represents the smallest subsection of a document
@@ -42,6 +48,9 @@ class DOCExtractorBase:
                  dir: Union[str, Path] = None,
                  file_extractor = None,
                  file_types: List[str] = ["html", "docx", "pdf"],
+                 n_workers: int = 1,
+                 progress_callback: Callable = None,
+                 sentence_splitter: SentenceSplitter = None,
                  ):
         """constructor - all action is initiated by constructor 
         
@@ -49,6 +58,13 @@ class DOCExtractorBase:
             dir: str specifiying path to folder containing DOC html files 
             file_extractor: optional custom file parser
             file_types: file extensions handled by the file_extractor
+            n_workers: number of worker processes used to parse files,
+                1 parses files sequentially in the current process
+            progress_callback: optional function called with the file name and 
+                its fragments after each file is processed
+            sentence_splitter: splits paragraphs into the sentences fragments are made of,
+                splits at every period if None. SentenceSplitter() does not split 
+                abbreviations, decimal numbers and initials
         """
         self.fragments = []
         self.uuid = 0
@@ -58,6 +74,9 @@ class DOCExtractorBase:
         else:
             self.file_extractor = file_extractor
         self.file_types = file_types
+        self.n_workers = n_workers
+        self.progress_callback = progress_callback
+        self.sentence_splitter = period_splitter if sentence_splitter is None else sentence_splitter
 
         self.__post_init__()
 
@@ -65,31 +84,86 @@ class DOCExtractorBase:
         if self.dir is not None:
             self.load(self.dir)
 
-    def load(self,                  
-             dir: Union[str, Path],
-            ):
-        """loads and parses DOC data from folder
+    def list_files(self, dir: Union[str, Path]) -> List[Path]:
+        """list files in folder handled by this extractor, in the order they are loaded
 
         parameters:
             dir: str specifiying path to folder containing specific document files
-            file_type: str specifying file type of files to extract
         """
         files = []
         for ext in self.file_types:
             files.extend(Path(dir).glob(f'*.{ext}'))
-        files = sorted(files)
+        return sorted(files)
 
-        for file in files:
-            file_content, _ = self.file_extractor.parse_file(file)
-            fragments = self.generate_fragments(file, file_content)
+    def load(self,                  
+             dir: Union[str, Path],
+             files: List[Path] = None,
+            ):
+        """loads and parses DOC data from folder
+
+        parameters:
+            dir: str specifiying path to folder containing specific document files
+            files: optional subset of files in dir to load, all handled files are loaded if None
+        """
+        for _, fragments in self.iter_fragments(dir, files=files):
             self.fragments.extend(fragments)
 
+    def iter_fragments(self,
+                       dir: Union[str, Path],
+                       files: List[Path] = None,
+                       ) -> Iterator[Tuple[Path, List[Fragment]]]:
+        """parse files and yield the fragments of each file, in file order, without keeping them
+
+        file level operations run as each file is yielded, 
+        document level operations once all files have been consumed
+        parameters:
+            dir: str specifiying path to folder containing specific document files
+            files: optional subset of files in dir to load, all handled files are loaded if None
+        yields: file and list of its fragments, files without fragments are included
+        """
+        if files is None:
+            files = self.list_files(dir)
+        else:
+            files = sorted(files)
+
+        for file, (file_content, _) in zip(files, self.parse_files(files)):
+            fragments = self.generate_fragments(file, file_content)
             self.file_level_operations(file_name = file,
                                        file_content = file_content,
                                        fragments=fragments)
+            if self.progress_callback is not None:
+                self.progress_callback(file, fragments)
+            yield file, fragments
 
         self.document_level_operations()
 
+    def parse_files(self, files: List[Path]) -> Iterator[Tuple[Dict, str]]:
+        """parse files, yielding (file_content, file_type) in file order
+
+        with n_workers > 1 files are parsed in worker processes, at most 2 * n_workers 
+        files ahead of the consumer so parsed content does not pile up in memory
+        while the consumer is busy, e.g. embedding the previous files
+        """
+        if self.n_workers <= 1:
+            yield from map(self.file_extractor.parse_file, files)
+            return
+
+        #spawn rather than fork, parsing may run in a thread of a process with torch loaded
+        executor = ProcessPoolExecutor(max_workers=self.n_workers,
+                                       mp_context=multiprocessing.get_context('spawn'))
+        try:
+            remaining = iter(files)
+            pending = deque(executor.submit(self.file_extractor.parse_file, file) 
+                            for file in itertools.islice(remaining, 2 * self.n_workers))
+            while pending:
+                parsed = pending.popleft().result()
+                for file in itertools.islice(remaining, 1):
+                    pending.append(executor.submit(self.file_extractor.parse_file, file))
+                yield parsed
+        finally:
+            #drop queued files if the consumer stopped early, e.g. on cancellation
+            executor.shutdown(wait=True, cancel_futures=True)
+
     def file_level_operations(self, file_name, file_content, fragments):
         """method for any work that needs to be done at the file level"""
         pass
@@ -118,22 +192,15 @@ class DOCExtractorBase:
                                 min_char_length: int = 60) -> List[Fragment]:
         """converts paragraphs - unit of extraction from files - into fragments
         
-        this implementation splits on strings and ensures min character length
+        this implementation splits into sentences with self.sentence_splitter and joins 
+        consecutive sentences until a fragment has min character length and a space.
+        paragraphs are streamed, time is linear in the length of the file
         params:
             file_content: text content of file as strings, field ['text] contains list of str
             min_char_length: minimum character length of a fragment
         """
-        paragraphs = file_content['text']
-        all_sentences = ''.join(paragraphs).split('.')
-        fragments = []
-        curr_sentence = ''
-        for sentence in all_sentences:
-            curr_sentence += sentence + '.'
-            if len(curr_sentence) >= min_char_length and ' ' in curr_sentence:
-                fragments.append(Fragment(text=curr_sentence))
-                curr_sentence = ''
-
-        return fragments
+        sentences = self.sentence_splitter.split(file_content['text'])
+        return [Fragment(text=text) for text in join_sentences(sentences, min_char_length=min_char_length)]
     
     def assign_fragment_uuids(self, fragments: List[Fragment]) -> List[Fragment]:
         """assign uuids to fragments"""
@@ -164,6 +231,10 @@ class DOCExtractorDefault(DOCExtractorBase):
                  file_types: List[str] = ["html", "docx", "pdf"],
                  context_loc: str =  CONTEXT,
                  fragment_to_context_loc: str = FRAGMENT_TO_CONTEXT, 
+                 context_store_loc: str = CONTEXT_STORE,
+                 n_workers: int = 1,
+                 progress_callback: Callable = None,
+                 sentence_splitter: SentenceSplitter = None,
                  ):
         """constructor - all action is initiated by constructor 
         
@@ -174,18 +245,27 @@ class DOCExtractorDefault(DOCExtractorBase):
             file_types: file extensions handled by the file_extractor
             context_loc: path to store context data
             fragment_to_context_loc: path to store fragment to context mapping
+            context_store_loc: path to store the memory-mapped context store, None to only write json
+            n_workers: number of worker processes used to parse files
+            progress_callback: optional function called with the file name and 
+                its fragments after each file is processed
+            sentence_splitter: splits paragraphs into sentences, see DOCExtractorBase
         """
         print("Directory Name in Extractor:",dir)
         print(os.listdir(dir))
         self.name = name
         self.context_loc = context_loc.format(document=name)
         self.fragment_to_context_loc = fragment_to_context_loc.format(document=name)
+        self.context_store_loc = None if context_store_loc is None else context_store_loc.format(document=name)
         self.context = {}
         self.fragment_to_context = {}
         super().__init__(
                  dir=dir,
                  file_extractor = file_extractor,
                  file_types = file_types,
+                 n_workers = n_workers,
+                 progress_callback = progress_callback,
+                 sentence_splitter = sentence_splitter,
                  )
 
     def __post_init__(self,):
@@ -215,6 +295,29 @@ class DOCExtractorDefault(DOCExtractorBase):
     def document_level_operations(self,):
         self.write_fragment_context_connector()
 
+    def load_context(self, drop_uuids: set = None) -> None:
+        """load previously written context so new fragments can be added to it
+
+        used when re-indexing only part of a document. 
+        params:
+            drop_uuids: fragment uuids whose context should be discarded, 
+                e.g. fragments from files that changed or were deleted
+        """
+        if drop_uuids is None:
+            drop_uuids = set()
+        if not (Path(self.context_loc).exists() and Path(self.fragment_to_context_loc).exists()):
+            return
+
+        with open(self.fragment_to_context_loc) as fp:
+            fragment_to_context = json.load(fp)
+        with open(self.context_loc) as fp:
+            context = json.load(fp)
+
+        self.fragment_to_context = {int(k):v for k,v in fragment_to_context.items()
+                                    if int(k) not in drop_uuids}
+        retained_context = set(self.fragment_to_context.values())
+        self.context = {k:v for k,v in context.items() if k in retained_context}
+
     def fragment_to_context_connector(self, 
                                       fragments: List[Fragment], 
                                       context_length: int = 4) -> Tuple[Dict, Dict]:
@@ -250,6 +353,8 @@ class DOCExtractorDefault(DOCExtractorBase):
         """write newly created self.context and self.sentence_to_context_connector
         to json to be referenced when pulling longer context
         from retrieved documents
+
+        a memory-mapped ContextStore with the same content is written for searching
         """
         with open(self.fragment_to_context_loc, 'w') as fp:
             json.dump(self.fragment_to_context, fp)
@@ -262,8 +367,10 @@ class DOCExtractorDefault(DOCExtractorBase):
         
         keys = list(self.context.keys())
         values = list(self.context.values())
-        text_cleaned, indices = preprocessing_pipeline(values, cleaning_pipeline)
+        text_cleaned, indices = preprocessing_pipeline(values, cleaning_pipeline, compiled=True)
         self.context = {keys[i]:p  for i,p in zip(indices, text_cleaned) }
         with open(self.context_loc, 'w') as fp:
             json.dump(self.context, fp)
+        if self.context_store_loc is not None:
+            ContextStore.write(self.context_store_loc, self.fragment_to_context, self.context)
     
\ No newline at end of file
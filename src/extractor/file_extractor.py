@@ -1,4 +1,5 @@
 import base64
+import math
 import os
 import sys
 from pathlib import Path
@@ -73,11 +74,114 @@ def _parse_pdf(file_path: str):
 
     return doc_contents
 
+#vertical gap between two lines, as a multiple of the line spacing, that starts a new pdf paragraph
+PDF_PARAGRAPH_GAP = 1.5
+#line spacing of a pdf line as a multiple of its font size, for pages where no two lines are that close
+PDF_LINE_SPACING = 1.2
+
+def _pdf_page_lines(page) -> List[Tuple[float, float, str]]:
+    """lines of text of a pdf page in reading order, as (y position, font size, text)
+
+    text drawn at the same height, within half the font size, is one line
+    parameters:
+        page: pypdf page
+    """
+    lines = []
+
+    def visit(text, cm, tm, font_dict, font_size):
+        if not text.strip():
+            return
+        #text matrix times the current transformation matrix, to page coordinates
+        y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+        size = font_size * math.hypot(tm[2] * cm[0] + tm[3] * cm[2], tm[2] * cm[1] + tm[3] * cm[3])
+        text = text.replace('\n', ' ')
+        if lines and abs(lines[-1][0] - y) <= max(lines[-1][1], size) / 2:
+            y_line, size_line, text_line = lines[-1]
+            lines[-1] = (y_line, max(size_line, size), text_line + text)
+        else:
+            lines.append((y, size, text))
+
+    page.extract_text(visitor_text=visit)
+    return lines
+
+def _pdf_paragraphs(lines: List[Tuple[float, float, str]]) -> List[str]:
+    """join the lines of a pdf page into paragraphs at vertical gaps
+
+    pdfs have no paragraph markup, pypdf separates every line with a single newline. a line
+    starts a new paragraph when the gap above it is more than PDF_PARAGRAPH_GAP times the line
+    spacing, the smallest gap between lines of the page, or when it is above the previous line,
+    e.g. at the top of a new column
+    parameters:
+        lines: lines of the page from _pdf_page_lines
+    """
+    gaps = [y_prev - y for (y_prev, _, _), (y, _, _) in zip(lines, lines[1:])]
+    spacing = min((gap for gap in gaps if gap > 0), default=0)
+    paragraphs = []
+    paragraph = []
+    for i, (_, size, text) in enumerate(lines):
+        if i > 0:
+            gap = gaps[i - 1]
+            line_spacing = min(spacing, PDF_LINE_SPACING * max(size, lines[i - 1][1]))
+            if gap <= 0 or gap > PDF_PARAGRAPH_GAP * line_spacing:
+                paragraphs.append(' '.join(paragraph))
+                paragraph = []
+        paragraph.append(text.strip())
+    if paragraph:
+        paragraphs.append(' '.join(paragraph))
+    return [p for p in paragraphs if p.strip() != '']
+
+def _parse_pdf_local(file_path: str):
+    """parse a pdf in the current process with pypdf, page by page
+
+    paragraphs are found from the vertical gaps between lines, see _pdf_paragraphs, so
+    runs in worker processes next to the docx and html parsers and needs no tika server
+    parameters:
+        file_path: path to a pdf file
+    returns: dict with the list of paragraph text in 'text'
+    raises: ValueError if the pdf is encrypted with a password
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(str(file_path))
+    if reader.is_encrypted:
+        #pdfs that are only protected against editing open with an empty password
+        try:
+            decrypted = reader.decrypt('')
+        except Exception as e:
+            raise ValueError(f'could not decrypt {file_path}: {e}') from e
+        if not decrypted:
+            raise ValueError(f'{file_path} is encrypted with a password and cannot be parsed')
+
+    text = []
+    for page in reader.pages:
+        text.extend(_pdf_paragraphs(_pdf_page_lines(page)))
+
+    return {'text': text}
+
+#pdf parsers by backend name, see FileExtractor
+PDF_BACKENDS = {
+    'local': _parse_pdf_local,
+    'tika': _parse_pdf,
+}
+
 class FileExtractor:
     def __init__(self, 
                  docx_parser=_parse_docx, 
-                 pdf_parser = _parse_pdf,
-                 html_parser = _parse_html):
+                 pdf_parser = None,
+                 html_parser = _parse_html,
+                 pdf_backend: str = 'local'):
+        """constructor
+
+        parameters:
+            docx_parser, pdf_parser, html_parser: functions parsing a file of the type into
+                a dict with the list of paragraph text in 'text'
+            pdf_backend: pdf parser used when pdf_parser is None, local parses with pypdf 
+                in the current process, tika sends files to the tika server
+        """
+        if pdf_parser is None:
+            if pdf_backend not in PDF_BACKENDS:
+                raise ValueError(f'unknown pdf backend {pdf_backend}, expected one of {tuple(PDF_BACKENDS)}')
+            pdf_parser = PDF_BACKENDS[pdf_backend]
         self.docx_parser = docx_parser
         self.pdf_parser = pdf_parser
         self.html_parser = html_parser
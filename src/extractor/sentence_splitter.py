@@ -0,0 +1,156 @@
+import re
+from typing import Iterable, Iterator
+
+#lowercase abbreviations, without their final period, that do not end a sentence
+ABBREVIATIONS = frozenset({
+    'e.g', 'i.e', 'etc', 'cf', 'vs', 'viz', 'al', 'approx', 'ca', 'esp',
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'gen', 'col', 'lt', 'sgt', 'capt', 'rep', 'sen', 'gov',
+    'inc', 'ltd', 'co', 'corp', 'dept', 'univ', 'assn', 'bros',
+    'fig', 'figs', 'eq', 'vol', 'vols', 'ch', 'sec', 'para', 'p', 'pp', 'art', 'ed', 'eds', 'nos',
+    'jan', 'feb', 'mar', 'apr', 'jun', 'jul', 'aug', 'sep', 'sept', 'oct', 'nov', 'dec',
+    'u.s', 'u.s.c', 'u.k', 'a.m', 'p.m',
+})
+#characters before a period searched for the word it ends, abbreviations are short
+_LOOKBACK = 16
+#characters a word can start with that are not part of it
+_OPENING = '([{"\'`'
+
+_re_period = re.compile(r'\.')
+_re_space = re.compile(r'\s')
+
+
+class SentenceSplitter:
+    """splits a stream of paragraphs into sentences at periods
+
+    paragraphs are treated as one concatenated text, as DOCExtractorBase.paragraphs_to_fragments
+    has always done, but are scanned one by one so no joined copy of a file is made.
+    a period is not a sentence boundary when it is part of:
+        a decimal number, e.g. 3.5 or 52.203-16
+        an abbreviation in abbreviations, e.g. etc. or Dr.
+        a dotted abbreviation of one or two letter parts, e.g. U.S. or i.e.
+        an initial, an uppercase letter other than A and I, e.g. J. Smith
+    every other period ends a sentence, so prose without these is split as str.split('.')
+    """
+
+    def __init__(self,
+                 abbreviations: Iterable[str] = ABBREVIATIONS,
+                 numbers: bool = True,
+                 initials: bool = True) -> None:
+        """constructor
+
+        parameters:
+            abbreviations: lowercase abbreviations without their final period
+            numbers: do not split decimal numbers
+            initials: do not split after initials
+        with no abbreviations, numbers and initials every period ends a sentence
+        """
+        self.abbreviations = frozenset(abbreviations)
+        self.numbers = numbers
+        self.initials = initials
+
+    def is_boundary(self, before: str, next_char: str) -> bool:
+        """whether a period ends a sentence
+
+        parameters:
+            before: text before the period, at least the word it ends if the word is short
+            next_char: character after the period, empty at the end of the text
+        """
+        if self.numbers and next_char.isdigit() and before[-1:].isdigit():
+            return False
+        match = None
+        for match in _re_space.finditer(before):
+            pass
+        word = before[match.end():] if match is not None else before
+        word = word.lstrip(_OPENING)
+        if not word:
+            return True
+        if word.lower() in self.abbreviations:
+            return False
+        if self.initials and len(word) == 1 and word.isupper() and word not in 'AI':
+            return False
+        #the first period of a dotted abbreviation, e.g. the e of e.g.
+        if self.abbreviations and len(word) == 1 and word.isalpha() and next_char.isalpha():
+            return False
+        if self.abbreviations and '.' in word and all(0 < len(part) <= 2 and part.isalpha()
+                                                      for part in word.split('.')):
+            return False
+        return True
+
+    def split(self, paragraphs: Iterable[str]) -> Iterator[str]:
+        """sentences of the concatenated paragraphs, each ending with its period
+
+        as with [s + '.' for s in ''.join(paragraphs).split('.')] the text after the last
+        sentence boundary is yielded last with a period appended, '.' if there is no such text
+        parameters:
+            paragraphs: paragraphs of a file, in order
+        """
+        parts = []
+        #last characters of the text scanned, for words spanning paragraphs
+        tail = ''
+        #a period ending the previous paragraph, decided by the first character of the next one
+        held = None
+        for paragraph in paragraphs:
+            if not paragraph:
+                continue
+            if held is not None:
+                if self.is_boundary(held, paragraph[0]):
+                    yield ''.join(parts)
+                    parts = []
+                held = None
+            start = 0
+            for match in _re_period.finditer(paragraph):
+                i = match.start()
+                parts.append(paragraph[start:i + 1])
+                start = i + 1
+                before = paragraph[i - _LOOKBACK:i] if i >= _LOOKBACK else (tail + paragraph[:i])[-_LOOKBACK:]
+                if start == len(paragraph):
+                    held = before
+                elif self.is_boundary(before, paragraph[start]):
+                    yield ''.join(parts)
+                    parts = []
+            if start < len(paragraph):
+                parts.append(paragraph[start:])
+            tail = (tail + paragraph[-_LOOKBACK:])[-_LOOKBACK:]
+        if held is not None:
+            #nothing follows a period ending the text
+            yield ''.join(parts)
+            parts = []
+        yield ''.join(parts) + '.'
+
+
+#splits at every period, the fragments DOCExtractorBase has always produced
+period_splitter = SentenceSplitter(abbreviations=(), numbers=False, initials=False)
+
+#sentence splitters selectable by name, e.g. when building an index
+SENTENCE_SPLITTERS = {
+    'period': period_splitter,
+    'aware': SentenceSplitter(),
+}
+
+def get_sentence_splitter(name: str) -> SentenceSplitter:
+    """sentence splitter by name, period or aware"""
+    if name not in SENTENCE_SPLITTERS:
+        raise ValueError(f'unknown sentence splitter {name}, expected one of {tuple(SENTENCE_SPLITTERS)}')
+    return SENTENCE_SPLITTERS[name]
+
+
+def join_sentences(sentences: Iterable[str], min_char_length: int = 60) -> Iterator[str]:
+    """join consecutive sentences into fragments of at least min_char_length characters with a space
+
+    sentences left over at the end that do not reach the minimum are dropped
+    parameters:
+        sentences: sentences, e.g. from SentenceSplitter.split
+        min_char_length: minimum character length of a fragment
+    """
+    parts = []
+    length = 0
+    has_space = False
+    for sentence in sentences:
+        parts.append(sentence)
+        length += len(sentence)
+        has_space = has_space or ' ' in sentence
+        if length >= min_char_length and has_space:
+            yield ''.join(parts)
+            parts = []
+            length = 0
+            has_space = False
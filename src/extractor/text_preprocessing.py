@@ -2,33 +2,64 @@ import os
 import re
 import unicodedata
 import string
+import threading
+import functools
+import multiprocessing
 from abc import ABC, abstractmethod
-from typing import Union, List, Any, Dict, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Union, List, Any, Dict, Tuple, Callable
 
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
+#nltk is imported and its data downloaded on first use, not when the module is imported
+_nltk_lock = threading.Lock()
+_stop_words = None
 
-nltk_data_path = os.environ['NLTK_DATA']
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt',download_dir = nltk_data_path)
+def nltk_resource(path: str, package: str) -> None:
+    """download an nltk package to NLTK_DATA if it is not installed
 
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords',download_dir = nltk_data_path)
+    parameters:
+        path: nltk data path of the resource, e.g. corpora/stopwords
+        package: nltk package providing the resource, e.g. stopwords
+    """
+    import nltk
+
+    try:
+        nltk.data.find(path)
+    except LookupError:
+        nltk.download(package, download_dir=os.environ['NLTK_DATA'])
 
+def load_stop_words() -> set:
+    """english stop words, loaded once per process"""
+    global _stop_words
+    if _stop_words is None:
+        with _nltk_lock:
+            if _stop_words is None:
+                nltk_resource('corpora/stopwords', 'stopwords')
+                from nltk.corpus import stopwords
+                _stop_words = set(stopwords.words('english'))
+    return _stop_words
 
-stop_words = set(stopwords.words('english'))
+def __getattr__(name: str):
+    #stop_words was a module level set, kept for callers importing it
+    if name == 'stop_words':
+        return load_stop_words()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+#patterns compiled once for all calls
+_re_whitespace = re.compile(r'\s{2,}')
+_re_number = re.compile(r'\d+')
 
 class Preprocessor(ABC):
     """general idea is we have a generic preprocessor that can 
     transform and/or filter text
     this isn't fully functional yet - need to think about how to deal 
     with string sentences vs. list of words for example 
+
+    is_transform and is_filter tell CompiledPipeline which of the two methods
+    do work, subclasses that leave them True are always called
     """
+    is_transform = True
+    is_filter = True
+
     @abstractmethod
     def transform(self, text: str) -> str:
         pass
@@ -40,9 +71,11 @@ class Preprocessor(ABC):
 class clean_whitespace(Preprocessor):
     """cleans whitespace by converting newlines to spaces
     and multiple spaces to single spaces"""
+    is_filter = False
+
     def transform(self, text: str)-> str:
         text = text.replace('\n',' ')
-        text = re.sub('\s{2,}', ' ', text)
+        text = _re_whitespace.sub(' ', text)
         return text
     
     def filter(self, text: str) -> bool:
@@ -53,26 +86,45 @@ class remove_stopwords(Preprocessor):
     
     stopwords are globally defined in this file - consider changing
     """
+    is_filter = False
+
+    @functools.cached_property
+    def stop_words(self) -> set:
+        return load_stop_words()
+
     def transform(self, text: str)-> str:
         text = text.split()
+        stop_words = self.stop_words
         text =  ' '.join([word for word in text if word not in stop_words])
         return text
+
+    def drop_word(self, word: str) -> bool:
+        """word level test used by CompiledPipeline, True for words transform removes"""
+        return word in self.stop_words
     
     def filter(self, text: str) -> bool:
         return True 
     
 class remove_numbers(Preprocessor):
     """remove numbers from a string"""
+    is_filter = False
+
     def transform(self, text: str)-> str:
         text = text.split()
-        re_num = re.compile('\d+')
-        text = ' '.join([word for word in text if not re_num.match(word)])
+        text = ' '.join([word for word in text if not _re_number.match(word)])
         return text
+
+    def drop_word(self, word: str) -> bool:
+        """word level test used by CompiledPipeline, True for words transform removes"""
+        return _re_number.match(word) is not None
+
     def filter(self, text: str) -> bool:
         return True 
     
 class remove_punctuation(Preprocessor):
     """remove punctuation from a string"""
+    is_filter = False
+
     def __init__(self):
         self.trans_map = str.maketrans('', '', string.punctuation)
 
@@ -84,6 +136,8 @@ class remove_punctuation(Preprocessor):
     
 class remove_blanklines(Preprocessor):
     """filter to remove blanklines"""
+    is_transform = False
+
     def transform(self, text: str)-> str:
         return text
     
@@ -105,6 +159,7 @@ class remove_blanklines(Preprocessor):
 # class tokenizer(Preprocessor):
 #     """tokenizes a string"""
 #     def transform(self, text):
+#         from nltk.tokenize import word_tokenize
 #         return word_tokenize(text)
     
 #     def filter(self, text):
@@ -113,6 +168,8 @@ class remove_blanklines(Preprocessor):
 class unicode_normalization(Preprocessor):
     """unicode normalization of a string using NFKD strategy
     """
+    is_filter = False
+
     def transform(self, text: str)-> str:
         return unicodedata.normalize('NFKD', text)
 
@@ -121,6 +178,8 @@ class unicode_normalization(Preprocessor):
     
 class lower_case(Preprocessor):
     """convert a string to all lowercase"""
+    is_filter = False
+
     def transform(self, text: str)-> str:
         return text.lower()
 
@@ -138,12 +197,107 @@ _registry = {
             'remove_blanklines': remove_blanklines(), 
             }
 
-def preprocessing_pipeline(text: List[str], functions: List[str])-> List[str]:
+class CompiledPipeline:
+    """preprocessing pipeline fused into a single pass over each string
+
+    steps that only transform or only filter skip the unused method, 
+    adjacent word removing steps (remove_stopwords, remove_numbers) share one split and join.
+    output and retained indices are identical to applying the steps one after another
+    """
+    def __init__(self, functions: List[str]) -> None:
+        """constructor
+
+        parameters:
+            functions: list of str corresponding to ordered application of Preprocessors
+        """
+        self.functions = list(functions)
+        self.steps = []
+        word_tests = []
+        for f in self.functions:
+            func = _registry[f]
+            if hasattr(func, 'drop_word'):
+                word_tests.append(func.drop_word)
+                continue
+            if word_tests:
+                self.steps.append((False, self._word_step(word_tests)))
+                word_tests = []
+            if func.is_filter:
+                self.steps.append((True, func.filter))
+            if func.is_transform:
+                self.steps.append((False, func.transform))
+        if word_tests:
+            self.steps.append((False, self._word_step(word_tests)))
+
+    @staticmethod
+    def _word_step(word_tests: List[Callable[[str], bool]]) -> Callable[[str], str]:
+        """one split and join removing the words any of the tests drop"""
+        if len(word_tests) == 1:
+            drop = word_tests[0]
+        else:
+            drop = lambda word: any(test(word) for test in word_tests)
+        return lambda text: ' '.join([word for word in text.split() if not drop(word)])
+
+    def __call__(self, text: List[str], offset: int = 0) -> Tuple[List[str], List[int]]:
+        """apply the pipeline
+
+        parameters:
+            text: list of strings to process
+            offset: added to the retained indices, used when processing chunks of a list
+        returns: processed strings and indices of the retained strings
+        """
+        text_processed = []
+        retained_indices = []
+        steps = self.steps
+        for i, p in enumerate(text, offset):
+            for is_filter, func in steps:
+                if is_filter:
+                    if not func(p):
+                        break
+                else:
+                    p = func(p)
+            else:
+                text_processed.append(p)
+                retained_indices.append(i)
+        return text_processed, retained_indices
+
+def _run_compiled_chunk(functions: List[str], 
+                        text: List[str], 
+                        offset: int) -> Tuple[List[str], List[int]]:
+    """worker process entry point, the pipeline is compiled in the worker"""
+    return CompiledPipeline(functions)(text, offset=offset)
+
+def preprocessing_pipeline(text: List[str], 
+                           functions: List[str],
+                           compiled: bool = False,
+                           n_workers: int = 1,
+                           chunk_size: int = 10000)-> List[str]:
     """text preprocessing pipeline composed of sequence of Preprocessor objects
     
         paramaters:
             functions: list of str corresponding to ordered application of Preprocessors 
+            compiled: apply all steps in a single pass over each string, see CompiledPipeline
+            n_workers: number of worker processes for compiled pipelines, 
+                used when text has more than chunk_size strings
+            chunk_size: number of strings sent to a worker process at once
     """
+    if compiled:
+        if n_workers <= 1 or len(text) <= chunk_size:
+            return CompiledPipeline(functions)(text)
+
+        text_processed = []
+        retained_indices = []
+        offsets = range(0, len(text), chunk_size)
+        with ProcessPoolExecutor(max_workers=n_workers,
+                                 mp_context=multiprocessing.get_context('spawn')) as executor:
+            results = executor.map(_run_compiled_chunk, 
+                                   [functions] * len(offsets),
+                                   [text[o:o + chunk_size] for o in offsets],
+                                   offsets)
+            for processed, indices in results:
+                text_processed.extend(processed)
+                retained_indices.extend(indices)
+        return text_processed, retained_indices
+
     _functions = [_registry[f] for f in functions]
     #internally augment list so we can return which elements of the original list have been retained
     text_aug = [(i, p) for i, p in enumerate(text)]
@@ -152,4 +306,4 @@ def preprocessing_pipeline(text: List[str], functions: List[str])-> List[str]:
     
     text_processed = [p for i, p in text_aug]
     retained_indices = [i for i,p in text_aug]
-    return text_processed, retained_indices
\ No newline at end of file
+    return text_processed, retained_indices
@@ -1,7 +1,9 @@
 import os
 import io
+import json
+import time
 import requests
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Iterator
 
 import streamlit as st
 
@@ -31,44 +33,101 @@ def rebuild_summarizer(summarizer: str,
             'document': document}
     response = requests.post(f'http://{container_prefix}_docapp:5000/build_pipeline/summarization', json=data)
 
+def pipeline_config() -> Dict:
+    """pipeline configuration selected in the sidebar, sent with each query so 
+    users with different settings do not replace each other's pipeline"""
+    return {'summarizer': st.session_state.summarizer, 
+            'retriever': st.session_state.retriever,
+            'enricher': st.session_state.enricher,
+            'document': st.session_state.document}
+
 def send_query(query: str, 
                n_retrieve: int =10, 
-               n_rank: int =5) -> Tuple[str, List[Dict]]:
+               n_rank: int =5,
+               config: Dict = None) -> Tuple[str, List[Dict]]:
     """send text query to summarization pipeline
     
     parameters:
         query: str, text seach query
         n_retrieve: int, number of documents to retrieve
         n_rank: int, number or documents to retain after ranking step in pipeline
+        config: dict, optional pipeline configuration, see pipeline_config
     return: 
         summary: str, summary of the retrieved documents in response to query
         docs: list of relevant documents retrieved 
     """
     data = {'query': query, 
             'n_retrieve': n_retrieve,
-            'n_rank': n_rank}
+            'n_rank': n_rank,
+            **(config or {})}
     response = requests.post(f'http://{container_prefix}_docapp:5000/search/summarization', json=data)
     data = response.json()
     summary = data['summary']
     docs = data['relevant_docs']
     return summary, docs
 
+def stream_query(query: str, 
+                 n_retrieve: int =10, 
+                 n_rank: int =5,
+                 config: Dict = None) -> Iterator[Tuple[str, Dict]]:
+    """send text query to the streaming summarization endpoint
+
+    parameters:
+        query: str, text seach query
+        n_retrieve: int, number of documents to retrieve
+        n_rank: int, number or documents to retain after ranking step in pipeline
+        config: dict, optional pipeline configuration, see pipeline_config
+    return: 
+        iterator of (event, data) server-sent events: documents, summary pieces, done or error
+    """
+    data = {'query': query, 
+            'n_retrieve': n_retrieve,
+            'n_rank': n_rank,
+            **(config or {})}
+    with requests.post(f'http://{container_prefix}_docapp:5000/search_stream/summarization', 
+                       json=data, stream=True) as response:
+        if response.status_code != 200:
+            yield 'error', {'error': response.text}
+            return
+        event = None
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith('event: '):
+                event = line[len('event: '):]
+            elif line.startswith('data: '):
+                yield event, json.loads(line[len('data: '):])
+
+def display_documents(docs: List[Dict]) -> None:
+    """write relevant documents with their scores"""
+    for doc in docs:
+        content = doc['meta']['extended_content']
+
+        score = doc['score'] 
+        if score is None:
+            display_str = f'[N/A]: {content}'
+        else:
+            display_str = f'[{score:.2f}]: {content}'
+        
+        st.write(display_str)
+
 @st.cache(allow_output_mutation=True)
 def send_qa_query(query: str,
                   n_retrieve: int =10, 
-                  n_rank: int =5) -> Dict:
+                  n_rank: int =5,
+                  config: Dict = None) -> Dict:
     """ send text query to question and answer pipeline
 
     parameters:
         query: str, text seach query
         n_retrieve: int, number of documents to retrieve
         n_rank: int, number or documents to retain after ranking step in pipeline
+        config: dict, optional pipeline configuration, see pipeline_config
     return: 
         result: dictionary of answers and relevant documents output by QA pipeline
     """
     data = {'query': query, 
             'n_retrieve': n_retrieve,
-            'n_rank': n_rank}
+            'n_rank': n_rank,
+            **(config or {})}
     response = requests.post(f'http://{container_prefix}_docapp:5000/search/qa', json=data)
     data = response.json()
     result = data['result']
@@ -95,7 +154,21 @@ def build_index():
     res = requests.post(f'http://{container_prefix}_docapp:5000/build_index',
                         json = data)
     result= res.json()
-    st.write(result)
+    if not result['success']:
+        st.write(result)
+        return
+
+    #index is built in a background job, poll until it finishes
+    status = st.empty()
+    while True:
+        job = requests.get(f'http://{container_prefix}_docapp:5000/jobs/{result["job_id"]}').json()
+        status.write(f"building index: {job['status']}, {job['phase']}, "
+                     f"{job['files_parsed']}/{job['files_total']} files parsed, "
+                     f"{job['documents_embedded']} documents embedded")
+        if job['status'] not in ('pending', 'running'):
+            break
+        time.sleep(2)
+    st.write(job)
     
 def list_documents():
     response = requests.get(f'http://{container_prefix}_docapp:5000/documents')
@@ -115,7 +188,7 @@ n_retrieve = st.sidebar.number_input('Number to Retrieve:',
 n_rank = st.sidebar.number_input('Number to Keep Post Ranking:', 
                                     min_value=1, max_value=15,
                                     value=5,step=1)
-retriever = st.sidebar.selectbox('Retriever',('Embedding','TfIdf', 'DensePassage' ))
+retriever = st.sidebar.selectbox('Retriever',('Embedding','TfIdf', 'DensePassage', 'Hybrid'))
 enricher = st.sidebar.selectbox('Enricher',('None','next_document'))
 summarizer = st.sidebar.selectbox('Summarizer',('local','openai'))
 qa_search = st.sidebar.checkbox('QA Search',value=False )
@@ -148,27 +221,28 @@ if uploaded_file is not None:
 
 if text_query != '':
     if qa_search:
-        result = send_qa_query(text_query, n_retrieve, n_rank)
+        result = send_qa_query(text_query, n_retrieve, n_rank, pipeline_config())
         st.write(result)
     else:
-        summary, docs = send_query(text_query, n_retrieve, n_rank)
-        #display response summary
+        #display response summary as it is generated, relevant documents as soon as they are ranked
         st.write('\n')
         st.write('__Response Summary:__')
-        st.write(f'{summary}')
+        summary_placeholder = st.empty()
+        summary_placeholder.write('_generating summary..._')
         st.write('\n')
         st.write('\n')
         st.write('__Relevant Sections:__')
-
-        #display relevant documents
-        for doc in docs:
-            doc_path = doc['meta']['file']
-            content = doc['meta']['extended_content']
-
-            score = doc['score'] 
-            if score is None:
-                display_str = f'[N/A]: {content}'
-            else:
-                display_str = f'[{score:.2f}]: {content}'
-            
-            st.write(display_str)
\ No newline at end of file
+        docs_container = st.container()
+
+        summary = ''
+        for event, data in stream_query(text_query, n_retrieve, n_rank, pipeline_config()):
+            if event == 'documents':
+                with docs_container:
+                    display_documents(data)
+            elif event == 'summary':
+                summary += data['text']
+                summary_placeholder.write(summary)
+            elif event == 'done':
+                summary_placeholder.write(data['summary'])
+            elif event == 'error':
+                summary_placeholder.error(f"search failed: {data['error']}")
\ No newline at end of file
@@ -1,9 +1,29 @@
 import os
 import sys
+import importlib
 from pathlib import Path
 main_repo_path = str(Path(os.path.abspath(__file__)).parents[1]).replace('\\', '/')
 if main_repo_path not in sys.path:
     sys.path.append(main_repo_path)
 
-from indexer.doc_indexer import DOCIndexer
-from indexer.build_indices import build_index
\ No newline at end of file
+#exported name -> module defining it, imported by __getattr__ on first use
+_exports = {
+    'DOCIndexer': 'indexer.doc_indexer',
+    'IndexManifest': 'indexer.manifest',
+    'IndexJob': 'indexer.jobs',
+    'JobManager': 'indexer.jobs',
+    'JobCancelled': 'indexer.jobs',
+    'JobConflictError': 'indexer.jobs',
+    'build_index': 'indexer.build_indices',
+}
+
+def __getattr__(name: str):
+    """import exported names on first use so importing the package stays cheap"""
+    if name not in _exports:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(_exports[name]), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted({*globals(), *_exports})
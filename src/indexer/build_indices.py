@@ -1,47 +1,60 @@
 import os
 import sys
 import logging
+import json
 from pathlib import Path
+from typing import List, Tuple, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 
 import time
+import numpy as np
 from loguru import logger
 
 from haystack.document_stores import ElasticsearchDocumentStore, \
-                FAISSDocumentStore, SQLDocumentStore
-from haystack.nodes import EmbeddingRetriever
+                FAISSDocumentStore, SQLDocumentStore, BaseDocumentStore
+from haystack.schema import Document
 
 main_repo_path = str(Path(os.path.abspath(__file__)).parents[1]).replace('\\', '/')
 if main_repo_path not in sys.path:
     sys.path.append(main_repo_path)
 
-from extractor import DOCExtractorDefault
+from extractor import DOCExtractorDefault, Fragment
+from extractor.file_extractor import FileExtractor
+from extractor.sentence_splitter import get_sentence_splitter
 from indexer import DOCIndexer
-from util.vars import EMBEDDING_MODEL, EMBEDDING_MODEL_FORMAT
+from indexer.manifest import IndexManifest
+from indexer.jobs import IndexJob
+from indexer.embedding import DocumentEmbedder
+from indexer.faiss_index import faiss_index_factory, train_document_store, remove_vectors
+from nodes import build_next_document_map
+from util.vars import EMBEDDING_BATCH_SIZE, EMBEDDING_PRECISION, \
+    INDEX_CHUNK_SIZE, MANIFEST, NEXT_DOCUMENT, FAISS_INDEX_TYPE, FAISS_NLIST, FAISS_TRAIN_SIZE, \
+    PDF_BACKEND, SENTENCE_SPLITTER
 
 #build indices for desired retriever types
 
-def build_index(doc_name: str = 'PyramidDocs', 
-                data_path: str = r"C:\Users\harsmith\Documents\GitHub\CSUBOT\data",
-                ds_path: str = '/tmp/data', 
-                retriever: str ='Embedding', 
-                docstore_type: str = 'elasticsearch') -> None:
-    """build document store index for later searching
-    
+def create_document_store(doc_name: str,
+                          ds_path: Path,
+                          retriever: str,
+                          docstore_type: str,
+                          load_existing: bool = False,
+                          faiss_index_type: str = FAISS_INDEX_TYPE) -> BaseDocumentStore:
+    """create the document store an index is written to
+
     parameters:
         doc_name: str, name for document or group of documents, used for elasticsearch index name
-        data_path: str, path to directory where raw documents are held
-        ds_path: str, document store path for file-based document stores
-        retriever: str, retriever type, used for generating embeddings as needed
+        ds_path: Path, document store path for file-based document stores
+        retriever: str, retriever type, used to name file-based document stores
         docstore_type: str, type of document store: currently allows: sql, faiss, elasticsearch
+        load_existing: bool, load a previously saved faiss index instead of creating a new one
+        faiss_index_type: str, faiss index type of new faiss indexes, see FAISS_INDEX_TYPES.
+            index types that require training are replaced by a trained index before documents are written
     """
-    data_path = r"C:\Users\harsmith\Documents\GitHub\CSUBOT\data"
-    ds_path = Path(ds_path)
     try:
         container_prefix = os.environ['CONTAINER_PREFIX']
     except KeyError:
         container_prefix = None
 
-    logger.debug(f' building index for retriever: {retriever}, docstore: {docstore_type}')
     if docstore_type == 'elasticsearch':
         es_host = f'{container_prefix}_es_haystack'
         document_store = ElasticsearchDocumentStore(
@@ -55,49 +68,278 @@ def build_index(doc_name: str = 'PyramidDocs',
     elif docstore_type == 'faiss':
         faiss_dir = ds_path / 'faiss_docstore'
         faiss_dir.mkdir(exist_ok=True, parents=True)
-        document_store = FAISSDocumentStore(
-                    sql_url = f'sqlite:///{str(faiss_dir)}/faiss_document_store_{doc_name}_{retriever}.db',
-                    embedding_dim=768,
-                    faiss_index_factory_str='Flat',
-                )
+        index_path = faiss_dir / f'faiss_index_{doc_name}_{retriever}.bin'
+        if load_existing and index_path.exists():
+            document_store = FAISSDocumentStore.load(index_path=str(index_path))
+        else:
+            document_store = FAISSDocumentStore(
+                        sql_url = f'sqlite:///{str(faiss_dir)}/faiss_document_store_{doc_name}_{retriever}.db',
+                        embedding_dim=768,
+                        faiss_index_factory_str=faiss_index_factory(faiss_index_type),
+                    )
     elif docstore_type == 'sql':
         sql_dir = ds_path / 'sql_docstore'
         sql_dir.mkdir(exist_ok=True, parents=True)
         document_store = SQLDocumentStore(f"sqlite:///{str(sql_dir)}/sql_index_{doc_name}_{retriever}.db")
     else:
         raise NotImplementedError(f'no known document store type: {docstore_type}')
+    return document_store
+
+def delete_stale_documents(document_store: BaseDocumentStore, 
+                           stale_ids: List[str],
+                           docstore_type: str) -> None:
+    """remove the documents of changed or deleted files before re-indexing them
+
+    for faiss only the stale vectors are removed, see remove_vectors, and the few documents
+    whose vectors fill the freed vector ids get their new vector id. FAISSDocumentStore.delete_documents
+    would load every document and shift the vector ids of a Flat index out of step with the documents
+    """
+    if not stale_ids:
+        return
+    if docstore_type == 'faiss':
+        index = document_store.index
+        vector_ids = [int(doc.meta['vector_id']) for doc in document_store.get_documents_by_id(stale_ids)
+                      if doc.meta.get('vector_id') is not None]
+        document_store.faiss_indexes[index], moved = remove_vectors(document_store.faiss_indexes[index],
+                                                                    vector_ids)
+        #the sql rows only, the vectors are removed
+        SQLDocumentStore.delete_documents(document_store, ids=stale_ids)
+        if moved:
+            moved_docs = document_store.get_documents_by_vector_ids([str(i) for i in moved])
+            document_store.update_vector_ids({doc.id: str(moved[int(doc.meta['vector_id'])])
+                                              for doc in moved_docs})
+    else:
+        document_store.delete_documents(ids=stale_ids)
+
+def chunk_by_file(file_fragments: Iterable[Tuple[Path, List[Fragment]]], 
+                  chunk_size: int = INDEX_CHUNK_SIZE) -> Iterator[Tuple[List[Path], List[Fragment]]]:
+    """group the fragments of consecutive files into chunks of about chunk_size fragments
+
+    files are never split across chunks so fragments are only linked within their file
+    parameters:
+        file_fragments: iterable of file and its fragments, e.g. DOCExtractorBase.iter_fragments
+        chunk_size: number of fragments after which a chunk is closed
+    yields: files of the chunk, including files without fragments, and their fragments
+    """
+    files = []
+    fragments = []
+    for file, _fragments in file_fragments:
+        files.append(file)
+        fragments.extend(_fragments)
+        if len(fragments) >= chunk_size:
+            yield files, fragments
+            files = []
+            fragments = []
+    if files:
+        yield files, fragments
+
+def record_indexed_files(manifest: IndexManifest,
+                         files: List[Path],
+                         fragments: List[Fragment],
+                         documents: List[Document],
+                         next_uuid: int) -> None:
+    """record the fragment uuids and document ids of indexed files in the manifest
+
+    parameters:
+        manifest: manifest of the index being built
+        files: files that were indexed
+        fragments: fragments of these files
+        documents: documents written for these fragments
+        next_uuid: next unassigned fragment uuid, used as empty range for files without fragments
+    """
+    uuid_ranges = {}
+    for fragment in fragments:
+        start, end = uuid_ranges.get(fragment.metadata['document'], (fragment.uuid, fragment.uuid))
+        uuid_ranges[fragment.metadata['document']] = (min(start, fragment.uuid), max(end, fragment.uuid + 1))
+    document_ids = {}
+    for doc in documents:
+        document_ids.setdefault(doc.meta['file'], []).append(doc.id)
+    for file in files:
+        uuid_range = uuid_ranges.get(str(file), (next_uuid, next_uuid))
+        manifest.record_file(file, uuid_range, document_ids.get(str(file), []))
+
+def write_next_document_map(document_store: BaseDocumentStore, path: str) -> None:
+    """write the map from each document to its following documents, 
+    used by RetrievalEnricher to find neighbours without document store queries
+
+    built from the whole document store so it stays complete after incremental builds,
+    documents are streamed from the store rather than loaded at once
+    """
+    documents = document_store.get_all_documents_generator(return_embedding=False)
+    next_document_map = build_next_document_map(documents)
+    with open(path, 'w') as fp:
+        json.dump(next_document_map, fp)
+
+def build_index(doc_name: str = 'PyramidDocs', 
+                data_path: str = r"C:\Users\harsmith\Documents\GitHub\CSUBOT\data",
+                ds_path: str = '/tmp/data', 
+                retriever: str ='Embedding', 
+                docstore_type: str = 'elasticsearch',
+                n_workers: int = 1,
+                incremental: bool = False,
+                chunk_size: int = INDEX_CHUNK_SIZE,
+                embedding_batch_size: int = EMBEDDING_BATCH_SIZE,
+                embedding_precision: str = EMBEDDING_PRECISION,
+                faiss_index_type: str = FAISS_INDEX_TYPE,
+                faiss_nlist: int = FAISS_NLIST,
+                faiss_train_size: int = FAISS_TRAIN_SIZE,
+                pdf_backend: str = PDF_BACKEND,
+                sentence_splitter: str = SENTENCE_SPLITTER,
+                job: IndexJob = None) -> None:
+    """build document store index for later searching
+
+    files are parsed, prepared, embedded and written in chunks of about chunk_size fragments,
+    so memory use is bounded by the chunk size rather than the size of the corpus. 
+    with n_workers > 1 the next files are parsed while a chunk is embedded,
+    and a chunk is written to the document store while the next one is embedded.
+    
+    parameters:
+        doc_name: str, name for document or group of documents, used for elasticsearch index name
+        data_path: str, path to directory where raw documents are held
+        ds_path: str, document store path for file-based document stores
+        retriever: str, retriever type, used for generating embeddings as needed
+        docstore_type: str, type of document store: currently allows: sql, faiss, elasticsearch
+        n_workers: int, number of worker processes used to parse files
+        incremental: bool, only index files that changed since the last build and
+            remove documents of deleted files, uses the manifest written by previous builds
+        chunk_size: int, number of fragments indexed together
+        embedding_batch_size: int, number of documents encoded at once
+        embedding_precision: str, fp32, fp16 (gpu), int8 (cpu) or auto, see DocumentEmbedder
+        faiss_index_type: str, faiss index type: Flat, HNSW, IVF, IVFPQ or HNSWPQ.
+            IVF and PQ indexes are trained on the embeddings of the first faiss_train_size documents,
+            these documents are held in memory until training
+        faiss_nlist: int, number of IVF centroids, chosen from the number of training documents if None
+        faiss_train_size: int, number of documents used to train the faiss index
+        pdf_backend: str, local to parse pdfs with pypdf in the parsing processes,
+            tika to send them to the tika server
+        sentence_splitter: str, period to split fragments at every period, aware to not split
+            abbreviations, decimal numbers and initials, see extractor.sentence_splitter
+        job: IndexJob, optional background job receiving progress updates, 
+            cancellation is checked between files and chunks. documents of chunks 
+            written before cancelling stay in the document store 
+    """
+    if job is None:
+        job = IndexJob(job_id=None, doc_name=doc_name)
+    ds_path = Path(ds_path)
+    splitter = get_sentence_splitter(sentence_splitter)
+    config = {'docstore_type': docstore_type, 'retriever': retriever}
+    if sentence_splitter != 'period':
+        #fragments change with the splitter, files are re-indexed when it changes. 
+        #left out for the period splitter so manifests written before the option still match
+        config['sentence_splitter'] = sentence_splitter
+    manifest = IndexManifest.load(MANIFEST.format(document=doc_name))
+    if not incremental or manifest.config != config:
+        if incremental:
+            logger.debug(f'manifest config {manifest.config} does not match {config}, indexing all files')
+        manifest = IndexManifest(MANIFEST.format(document=doc_name), config=config)
+        incremental = False
+
+    logger.debug(f' building index for retriever: {retriever}, docstore: {docstore_type}')
+    document_store = create_document_store(doc_name=doc_name,
+                                           ds_path=ds_path,
+                                           retriever=retriever,
+                                           docstore_type=docstore_type,
+                                           load_existing=incremental,
+                                           faiss_index_type=faiss_index_type)
   
     print("------------DATA PATH:",data_path)
     t_start = time.time()
+    job.set_phase('extracting')
     extracted_docs = DOCExtractorDefault(name=doc_name,
-                                         dir=data_path)
-    #print("Directory Name in Extractor:",extracted_docs.dir)
+                                         dir=None,
+                                         file_extractor=FileExtractor(pdf_backend=pdf_backend),
+                                         sentence_splitter=splitter,
+                                         n_workers=n_workers,
+                                         progress_callback=job.file_parsed)
+    files = extracted_docs.list_files(data_path)
+    if incremental:
+        changed, deleted = manifest.diff(files)
+        stale_records = manifest.stale_records(changed, deleted)
+        stale_ids = [i for r in stale_records for i in r['document_ids']]
+        stale_uuids = {u for r in stale_records for u in range(*r['uuid_range'])}
+        logger.debug(f'incremental build: {len(changed)} changed, {len(deleted)} deleted, '
+                     f'{len(files) - len(changed)} unchanged files')
+        delete_stale_documents(document_store, stale_ids, docstore_type)
+        for file in deleted:
+            manifest.remove_file(file)
+        extracted_docs.load_context(drop_uuids=stale_uuids)
+        extracted_docs.uuid = manifest.next_uuid
+    else:
+        changed = files
+
+    job.files_total = len(changed)
     indexer = DOCIndexer(document_store)
-    if len(extracted_docs.get_fragments()) == 0:
+    embedder = None
+    if docstore_type != 'sql' and retriever in ('Embedding', 'Hybrid'):
+        embedder = DocumentEmbedder(batch_size=embedding_batch_size,
+                                    precision=embedding_precision)
+
+    #each chunk is embedded before it is written so the document store 
+    #never holds documents without embeddings. writes run in a single thread,
+    #at most one chunk is waiting to be written while the next is embedded
+    def write_chunk(documents: List[Document]) -> None:
+        indexer.write(documents)
+        job.documents_written += len(documents)
+
+    def train_faiss(documents: List[Document]) -> None:
+        embeddings = np.stack([doc.embedding for doc in documents[:faiss_train_size]])
+        train_document_store(document_store, embeddings, 
+                             index_type=faiss_index_type, nlist=faiss_nlist)
+
+    #an untrained faiss index takes no vectors, documents are held until there are enough to train on
+    untrained = docstore_type == 'faiss' and embedder is not None \
+        and not document_store.faiss_indexes['document'].is_trained
+    held_documents = []
+
+    job.set_phase('indexing')
+    n_fragments = 0
+    file_fragments = extracted_docs.iter_fragments(data_path, files=changed)
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix='index-writer') as writer:
+        pending_writes = []
+        def submit_write(documents: List[Document]) -> None:
+            if pending_writes:
+                pending_writes.pop().result()
+            pending_writes.append(writer.submit(write_chunk, documents))
+
+        for chunk_files, fragments in chunk_by_file(file_fragments, chunk_size):
+            job.check_cancelled()
+            n_fragments += len(fragments)
+            documents = indexer.prepare(fragments)
+            if embedder is not None:
+                embedder.embed(documents, job=job)
+            record_indexed_files(manifest, chunk_files, fragments, documents, extracted_docs.uuid)
+            if untrained:
+                held_documents.extend(documents)
+                if len(held_documents) < faiss_train_size:
+                    continue
+                train_faiss(held_documents)
+                untrained = False
+                documents, held_documents = held_documents, []
+            submit_write(documents)
+        if held_documents:
+            train_faiss(held_documents)
+            submit_write(held_documents)
+        if pending_writes:
+            pending_writes.pop().result()
+
+    if embedder is not None:
+        logger.debug(f'embedded {embedder.documents_embedded} documents '
+                     f'at {embedder.documents_per_second:.1f} documents/s '
+                     f'({embedder.precision}, {embedder.device}, batch size {embedder.batch_size})')
+    if not incremental and n_fragments == 0:
         raise Exception("No data found, please add data or correct path.")
-    indexer.add(extracted_docs.get_fragments())
+    manifest.next_uuid = extracted_docs.uuid
     t_end = time.time()
-    t_elapsed = t_end - t_start
-    logger.debug(f'time to do indexing: {t_elapsed}')
+    logger.debug(f'time to do indexing: {t_end - t_start} s')
+
+    job.set_phase('saving')
     docstore_description = document_store.describe_documents()
     logger.debug(docstore_description)
-
-    t_start = time.time()
-    if docstore_type != 'sql' and retriever=='Embedding':
-        _retriever = EmbeddingRetriever(
-                document_store=document_store,
-                embedding_model=EMBEDDING_MODEL,
-                model_format=EMBEDDING_MODEL_FORMAT,
-                use_gpu=True,
-            )
-        document_store.update_embeddings(_retriever)
-
     if docstore_type=='faiss':
-        document_store.save(index_path=f'{str(faiss_dir)}/faiss_index_{doc_name}_{retriever}.bin')
+        document_store.save(index_path=f'{str(ds_path)}/faiss_docstore/faiss_index_{doc_name}_{retriever}.bin')
 
-    t_end = time.time()
-    t_elapsed = t_end - t_start
-    logger.debug(f'time to embed documents: {t_elapsed} s')
+    write_next_document_map(document_store, NEXT_DOCUMENT.format(document=doc_name))
+    manifest.save()
 
 if __name__ == "__main__":
     docstore_type = os.environ['DOCUMENT_STORE']
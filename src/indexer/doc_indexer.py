@@ -5,6 +5,7 @@ from typing import List, Dict
 
 from haystack.nodes import PreProcessor
 from haystack.document_stores import BaseDocumentStore
+from haystack.schema import Document
 
 from loguru import logger
 
@@ -49,30 +50,25 @@ class DOCIndexer:
         """enrich metadata by adding next and previous 
         document id to create implicit linked list
         
+        fragments are only linked to fragments of the same file so links stay valid 
+        when files are re-indexed individually in incremental builds
         parameters:
-            metadata: list, metatdata associated with paragraphs 
-            paragraphs: list of documents for indexing
+            fragments: list of fragments for indexing, fragments of a file must be adjacent
 
-        return: metadata, as augemented in this function
+        return: fragments, with metadata augemented in this function
         """
         
-        #handle edge cases
-        key_0 = fragments[0].uuid
-        key_1 = fragments[1].uuid
-        key_end = fragments[-1].uuid
-        key_endm1 = fragments[-2].uuid
-        fragments[key_0].metadata['prev'] = None
-        fragments[key_0].metadata['next'] = key_1
-        fragments[key_end].metadata['prev'] = key_endm1
-        fragments[key_end].metadata['next'] = None
-
+        #link by position rather than uuid so uuids need not start at 0
+        #(partial re-indexing continues numbering from a previous build)
         n_elms = len(fragments)
-        for i in range(1,n_elms-1):
-            key_i = fragments[i].uuid
-            key_im1 = fragments[i-1].uuid
-            key_ip1 = fragments[i+1].uuid
-            fragments[key_i].metadata['prev'] = key_im1
-            fragments[key_i].metadata['next'] = key_ip1
+        for i, fragment in enumerate(fragments):
+            document = fragment.metadata['document']
+            prev_fragment = fragments[i-1] if i > 0 else None
+            next_fragment = fragments[i+1] if i < n_elms-1 else None
+            fragment.metadata['prev'] = prev_fragment.uuid \
+                if prev_fragment is not None and prev_fragment.metadata['document'] == document else None
+            fragment.metadata['next'] = next_fragment.uuid \
+                if next_fragment is not None and next_fragment.metadata['document'] == document else None
 
         return fragments
 
@@ -103,20 +99,41 @@ class DOCIndexer:
             docs.append(d)
         return docs
     
-    def add(self, 
-            fragments: List[Fragment]) -> None:
-        """index documents by adding to document store
-        
+    def prepare(self, 
+                fragments: List[Fragment]) -> List[Document]:
+        """convert fragments to the haystack Documents written to the document store
+
         converts extracted document into haystack format and augments metadata
         parameters: 
-            doc_data: extracted document data
+            fragments: fragments extracted from documents for indexing
+        return: list of haystack Documents
         """
+        if len(fragments) == 0:
+            return []
 
         fragment_text = [f.text for f in fragments]
-        fragment_text, _ = preprocessing_pipeline(fragment_text, self.cleaning_pipeline)
+        fragment_text, _ = preprocessing_pipeline(fragment_text, self.cleaning_pipeline, compiled=True)
         for f, t in zip(fragments, fragment_text): f.text = t 
         fragments = self.enrich_metadata(fragments)
         document_docs = self.fragments_to_documents(fragments)
 
         docs_preprocessed = self.preprocessor.run_batch(document_docs)
-        self.docstore.write_documents(docs_preprocessed[0]['documents'])
\ No newline at end of file
+        return docs_preprocessed[0]['documents']
+
+    def write(self, documents: List[Document]) -> None:
+        """write prepared documents, with embeddings if set, to the document store"""
+        if documents:
+            self.docstore.write_documents(documents)
+
+    def add(self, 
+            fragments: List[Fragment]) -> List[Document]:
+        """index documents by adding to document store
+        
+        converts extracted document into haystack format and augments metadata
+        parameters: 
+            fragments: fragments extracted from documents for indexing
+        return: list of haystack Documents written to the document store
+        """
+        documents = self.prepare(fragments)
+        self.write(documents)
+        return documents
@@ -0,0 +1,118 @@
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+from loguru import logger
+
+from haystack.nodes import EmbeddingRetriever
+from haystack.schema import Document
+
+main_repo_path = str(Path(os.path.abspath(__file__)).parents[1]).replace('\\', '/')
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from indexer.jobs import IndexJob
+from util.vars import EMBEDDING_MODEL, EMBEDDING_MODEL_FORMAT, EMBEDDING_BATCH_SIZE, \
+    EMBEDDING_PRECISION
+
+PRECISIONS = ('fp32', 'fp16', 'int8', 'auto')
+
+
+class DocumentEmbedder:
+    """embeds documents at index time
+
+    documents are sorted by length before batching so each batch pads to similar lengths,
+    and the model can run in reduced precision: fp16 on gpu, int8 dynamic quantization
+    of the linear layers on cpu. the model is loaded for the embedder alone rather than
+    taken from the model registry since reduced precision changes it in place.
+    """
+    def __init__(self,
+                 embedding_model: str = EMBEDDING_MODEL,
+                 model_format: str = EMBEDDING_MODEL_FORMAT,
+                 batch_size: int = EMBEDDING_BATCH_SIZE,
+                 precision: str = EMBEDDING_PRECISION,
+                 device: str = None,
+                 sort_by_length: bool = True) -> None:
+        """constructor
+
+        parameters:
+            embedding_model: name of the document embedding model
+            model_format: haystack model format of the embedding model
+            batch_size: number of documents encoded at once
+            precision: fp32, fp16 (gpu only), int8 (cpu only) or auto,
+                auto picks fp16 on gpu and int8 on cpu
+            device: cuda or cpu, cuda if available when None
+            sort_by_length: batch documents of similar length together
+        """
+        import torch
+
+        if precision not in PRECISIONS:
+            raise ValueError(f'unknown precision {precision}, expected one of {PRECISIONS}')
+        if device is None:
+            device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        if precision == 'auto':
+            precision = 'fp16' if device == 'cuda' else 'int8'
+        if precision == 'fp16' and device != 'cuda':
+            raise ValueError('fp16 embedding requires a gpu, use int8 on cpu')
+        if precision == 'int8' and device != 'cpu':
+            raise ValueError('int8 embedding runs on cpu only, use fp16 on gpu')
+
+        self.batch_size = batch_size
+        self.precision = precision
+        self.device = device
+        self.sort_by_length = sort_by_length
+        self.retriever = EmbeddingRetriever(
+                document_store=None,
+                embedding_model=embedding_model,
+                model_format=model_format,
+                batch_size=batch_size,
+                use_gpu=device == 'cuda',
+                progress_bar=False,
+            )
+        model = self.retriever.embedding_encoder.embedding_model
+        if precision == 'fp16':
+            model.half()
+        elif precision == 'int8':
+            torch.quantization.quantize_dynamic(model, {torch.nn.Linear},
+                                                dtype=torch.qint8, inplace=True)
+        self.documents_embedded = 0
+        self.seconds = 0.0
+
+    @property
+    def documents_per_second(self) -> float:
+        """embedding throughput over all documents embedded so far"""
+        return self.documents_embedded / self.seconds if self.seconds > 0 else 0.0
+
+    def batches(self, documents: List[Document]) -> List[List[Document]]:
+        """split documents into batches, sorted by length if enabled"""
+        if self.sort_by_length:
+            documents = sorted(documents, key=lambda doc: len(doc.content))
+        return [documents[start:start + self.batch_size]
+                for start in range(0, len(documents), self.batch_size)]
+
+    def embed(self, documents: List[Document], job: IndexJob = None) -> None:
+        """set the embedding of each document, batch by batch
+
+        cancellation is checked and progress reported after every batch
+        parameters:
+            documents: documents to embed, embeddings are set in place
+            job: optional background job receiving progress updates
+        """
+        t_start = time.time()
+        for batch in self.batches(documents):
+            if job is not None:
+                job.check_cancelled()
+            embeddings = self.retriever.embed_documents(batch)
+            for doc, embedding in zip(batch, embeddings):
+                doc.embedding = embedding
+            self.documents_embedded += len(batch)
+            if job is not None:
+                job.documents_embedded += len(batch)
+        t_elapsed = time.time() - t_start
+        self.seconds += t_elapsed
+        if job is not None:
+            job.embedding_seconds += t_elapsed
+        logger.debug(f'embedded {len(documents)} documents in {t_elapsed:.2f} s, '
+                     f'{self.documents_per_second:.1f} documents/s overall')
@@ -0,0 +1,240 @@
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+import faiss
+from loguru import logger
+
+main_repo_path = str(Path(os.path.abspath(__file__)).parents[1]).replace('\\', '/')
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from util.vars import FAISS_INDEX_TYPE, FAISS_NLIST, FAISS_PQ_M, FAISS_HNSW_M, \
+    FAISS_NPROBE, FAISS_EF_SEARCH
+
+#faiss index factory strings of the supported index types
+FAISS_INDEX_TYPES = {
+    'Flat': 'Flat',
+    'HNSW': 'HNSW{hnsw_m},Flat',
+    'IVF': 'IVF{nlist},Flat',
+    'IVFPQ': 'IVF{nlist},PQ{pq_m}',
+    'HNSWPQ': 'HNSW{hnsw_m},PQ{pq_m}',
+}
+
+def faiss_index_factory(index_type: str = FAISS_INDEX_TYPE,
+                        n_vectors: int = None,
+                        nlist: int = FAISS_NLIST,
+                        pq_m: int = FAISS_PQ_M,
+                        hnsw_m: int = FAISS_HNSW_M) -> str:
+    """faiss index factory string of an index type
+
+    parameters:
+        index_type: one of FAISS_INDEX_TYPES
+        n_vectors: number of training vectors, used to choose nlist when nlist is None
+        nlist: number of IVF centroids, about 4 * sqrt(n_vectors) if None,
+            limited to n_vectors / 39 so every centroid gets enough training vectors
+        pq_m: number of product quantizer sub-vectors, must divide the embedding dimension
+        hnsw_m: number of HNSW links per vector
+    """
+    if index_type not in FAISS_INDEX_TYPES:
+        raise ValueError(f'unknown faiss index type {index_type}, expected one of {list(FAISS_INDEX_TYPES)}')
+    if nlist is None:
+        nlist = int(4 * np.sqrt(n_vectors)) if n_vectors else 1024
+        if n_vectors:
+            nlist = min(nlist, n_vectors // 39)
+        nlist = max(nlist, 1)
+    return FAISS_INDEX_TYPES[index_type].format(nlist=nlist, pq_m=pq_m, hnsw_m=hnsw_m)
+
+def requires_training(index_type: str) -> bool:
+    """True for index types whose centroids or codebooks are trained before vectors are added"""
+    return 'IVF' in index_type or 'PQ' in index_type
+
+def create_faiss_index(embeddings: np.ndarray,
+                       index_type: str = FAISS_INDEX_TYPE,
+                       nlist: int = FAISS_NLIST,
+                       pq_m: int = FAISS_PQ_M,
+                       hnsw_m: int = FAISS_HNSW_M) -> Any:
+    """create an empty inner product faiss index, trained on embeddings if the type requires it
+
+    parameters:
+        embeddings: float32 array of training vectors, one row per vector
+        index_type: one of FAISS_INDEX_TYPES
+        nlist, pq_m, hnsw_m: see faiss_index_factory
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+    factory = faiss_index_factory(index_type, n_vectors=len(embeddings),
+                                  nlist=nlist, pq_m=pq_m, hnsw_m=hnsw_m)
+    index = faiss.index_factory(embeddings.shape[1], factory, faiss.METRIC_INNER_PRODUCT)
+    if not index.is_trained:
+        logger.debug(f'training faiss index {factory} on {len(embeddings)} vectors')
+        index.train(embeddings)
+    return index
+
+def train_document_store(document_store: Any,
+                         embeddings: np.ndarray,
+                         index_type: str = FAISS_INDEX_TYPE,
+                         nlist: int = FAISS_NLIST,
+                         pq_m: int = FAISS_PQ_M,
+                         hnsw_m: int = FAISS_HNSW_M,
+                         index: str = 'document') -> None:
+    """replace the empty faiss index of a FAISSDocumentStore with an index trained on embeddings
+
+    the index is created here rather than by the document store so nlist
+    can follow the number of training vectors
+    parameters:
+        document_store: FAISSDocumentStore without vectors
+        embeddings: training sample of document embeddings
+        index_type, nlist, pq_m, hnsw_m: see create_faiss_index
+        index: name of the document store index
+    """
+    if document_store.faiss_indexes[index].ntotal > 0:
+        raise ValueError('faiss index already holds vectors, only empty indexes can be trained')
+    document_store.faiss_indexes[index] = create_faiss_index(embeddings, index_type=index_type,
+                                                             nlist=nlist, pq_m=pq_m, hnsw_m=hnsw_m)
+
+def remove_vectors(faiss_index: Any,
+                   vector_ids: Sequence[int],
+                   batch_size: int = 10_000) -> Tuple[Any, Dict[int, int]]:
+    """remove vectors from a faiss index keeping the vector ids 0 to ntotal - 1 in use
+
+    FAISSDocumentStore numbers vectors by the order they are added, so the ids freed by
+    removed vectors are filled with the vectors with the highest ids and the documents of
+    only these vectors change their vector id. IVF indexes remove and add by id in place.
+    Flat indexes would shift the ids of all later vectors and HNSW indexes cannot remove
+    vectors, so these are copied to a new index in batches of batch_size vectors
+    parameters:
+        faiss_index: faiss index, e.g. FAISSDocumentStore.faiss_indexes['document']
+        vector_ids: ids of the vectors removed
+        batch_size: number of vectors copied at a time
+    returns: faiss index without the vectors, the index passed in if it was changed in place,
+        and the new id of each moved vector by its old id
+    """
+    n_total = faiss_index.ntotal
+    removed = set(int(i) for i in vector_ids if 0 <= int(i) < n_total)
+    if not removed:
+        return faiss_index, {}
+    n_kept = n_total - len(removed)
+    holes = sorted(i for i in removed if i < n_kept)
+    tail = [i for i in range(n_kept, n_total) if i not in removed]
+    moved = dict(zip(tail, holes))
+
+    ivf = faiss.try_extract_index_ivf(faiss_index)
+    if ivf is not None:
+        #a hashtable direct map reconstructs, removes and adds vectors by id
+        direct_map_type = ivf.direct_map.type
+        ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+        tail_vectors = np.vstack([faiss_index.reconstruct(i) for i in tail]) if tail else None
+        faiss_index.remove_ids(np.array(sorted(removed | set(tail)), dtype='int64'))
+        if tail:
+            faiss_index.add_with_ids(tail_vectors, np.array(holes, dtype='int64'))
+        ivf.set_direct_map_type(direct_map_type)
+        return faiss_index, moved
+
+    #a copy keeps the training of HNSWPQ indexes
+    new_index = faiss.clone_index(faiss_index)
+    new_index.reset()
+    for start in range(0, n_kept, batch_size):
+        vectors = faiss_index.reconstruct_n(start, min(batch_size, n_kept - start))
+        for old, new in moved.items():
+            if start <= new < start + len(vectors):
+                vectors[new - start] = faiss_index.reconstruct(old)
+        new_index.add(vectors)
+    return new_index, moved
+
+def set_search_params(faiss_index: Any,
+                      nprobe: int = FAISS_NPROBE,
+                      ef_search: int = FAISS_EF_SEARCH) -> None:
+    """set query time parameters of a faiss index, parameters the index does not have are ignored
+
+    parameters:
+        faiss_index: faiss index, e.g. FAISSDocumentStore.faiss_indexes['document']
+        nprobe: number of IVF centroids searched, higher is slower with better recall
+        ef_search: size of the HNSW candidate list, higher is slower with better recall
+    """
+    faiss_index = faiss.downcast_index(faiss_index)
+    if nprobe is not None and faiss.try_extract_index_ivf(faiss_index) is not None:
+        faiss.extract_index_ivf(faiss_index).nprobe = nprobe
+    if ef_search is not None and hasattr(faiss_index, 'hnsw'):
+        faiss_index.hnsw.efSearch = ef_search
+
+def recall_latency_report(embeddings: np.ndarray,
+                          queries: np.ndarray,
+                          index_type: str,
+                          top_k: int = 10,
+                          search_values: Sequence[int] = (1, 4, 16, 64),
+                          n_train: int = None,
+                          **index_kwargs) -> List[Dict]:
+    """recall and latency of an approximate index against the exact Flat index
+
+    parameters:
+        embeddings: document embeddings added to both indexes
+        queries: query embeddings
+        index_type: one of FAISS_INDEX_TYPES
+        top_k: number of neighbours compared
+        search_values: nprobe values for IVF indexes, efSearch values for HNSW indexes
+        n_train: number of embeddings sampled for training, all if None
+        index_kwargs: nlist, pq_m, hnsw_m passed to create_faiss_index
+    returns: one row per search value, and one for the Flat baseline,
+        with recall@top_k and mean milliseconds per query
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+    queries = np.ascontiguousarray(queries, dtype='float32')
+
+    def timed_search(index):
+        t_start = time.perf_counter()
+        _, ids = index.search(queries, top_k)
+        return ids, 1000 * (time.perf_counter() - t_start) / len(queries)
+
+    flat = faiss.IndexFlatIP(embeddings.shape[1])
+    flat.add(embeddings)
+    exact_ids, flat_ms = timed_search(flat)
+    report = [{'index_type': 'Flat', 'param': None, 'value': None, 'recall': 1.0, 'ms_per_query': flat_ms}]
+    if index_type == 'Flat':
+        return report
+
+    train = embeddings
+    if n_train is not None and n_train < len(embeddings):
+        sample = np.random.default_rng(0).choice(len(embeddings), n_train, replace=False)
+        train = embeddings[sample]
+    index = create_faiss_index(train, index_type=index_type, **index_kwargs)
+    index.add(embeddings)
+
+    param = 'nprobe' if 'IVF' in index_type else 'efSearch' if 'HNSW' in index_type else None
+    for value in (search_values if param is not None else [None]):
+        set_search_params(index,
+                          nprobe=value if param == 'nprobe' else None,
+                          ef_search=value if param == 'efSearch' else None)
+        ids, ms = timed_search(index)
+        hits = sum(len(set(found) & set(exact)) for found, exact in zip(ids, exact_ids))
+        report.append({'index_type': index_type,
+                       'param': param,
+                       'value': value,
+                       'recall': hits / exact_ids.size,
+                       'ms_per_query': ms})
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='recall and latency of approximate faiss indexes '
+                                                 'against the Flat index of a built document store')
+    parser.add_argument('index_path', help='faiss index file written by build_index with the Flat index type')
+    parser.add_argument('--index-types', nargs='+', default=['IVF', 'IVFPQ', 'HNSW'])
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--n-queries', type=int, default=1000)
+    parser.add_argument('--n-train', type=int, default=None)
+    args = parser.parse_args()
+
+    flat_index = faiss.read_index(args.index_path)
+    vectors = flat_index.reconstruct_n(0, flat_index.ntotal)
+    #queries are sampled document embeddings, perturbed so they are not exact matches
+    rng = np.random.default_rng(0)
+    query_ids = rng.choice(len(vectors), min(args.n_queries, len(vectors)), replace=False)
+    query_vectors = vectors[query_ids] + rng.normal(0, vectors.std() / 4, (len(query_ids), vectors.shape[1]))
+    for _index_type in args.index_types:
+        for row in recall_latency_report(vectors, query_vectors, _index_type,
+                                         top_k=args.top_k, n_train=args.n_train):
+            print(f"{row['index_type']:8} {str(row['param']):8} {str(row['value']):6} "
+                  f"recall@{args.top_k}: {row['recall']:.3f}  {row['ms_per_query']:.3f} ms/query")
@@ -0,0 +1,187 @@
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+from loguru import logger
+
+
+class JobCancelled(Exception):
+    """raised inside a running job once cancellation has been requested"""
+
+
+class JobConflictError(RuntimeError):
+    """raised when a job is submitted for a document that already has an active job"""
+
+
+class IndexJob:
+    """state and progress of a background index build
+
+    progress counters are updated by build_index while the job runs
+    """
+    def __init__(self, job_id: str, doc_name: str, params: Dict = None) -> None:
+        """constructor
+
+        parameters:
+            job_id: unique job identifier
+            doc_name: name of the document being indexed
+            params: parameters the job was submitted with
+        """
+        self.id = job_id
+        self.doc_name = doc_name
+        self.params = params
+        self.status = 'pending'
+        self.phase = None
+        self.files_total = 0
+        self.files_parsed = 0
+        self.fragments = 0
+        self.documents_written = 0
+        self.documents_embedded = 0
+        self.embedding_seconds = 0.0
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._cancel = threading.Event()
+
+    @property
+    def active(self) -> bool:
+        return self.status in ('pending', 'running')
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self) -> None:
+        """request cancellation, the job stops at the next file, embedding batch or phase boundary"""
+        self._cancel.set()
+
+    def check_cancelled(self) -> None:
+        """raise JobCancelled if cancellation was requested"""
+        if self._cancel.is_set():
+            raise JobCancelled(f'job {self.id} cancelled')
+
+    def set_phase(self, phase: str) -> None:
+        """start a new phase of the build"""
+        self.check_cancelled()
+        logger.debug(f'index build {self.doc_name}: {phase}')
+        self.phase = phase
+
+    def file_parsed(self, file_name, fragments: List) -> None:
+        """progress callback for the extractor, called after each file"""
+        self.files_parsed += 1
+        self.fragments += len(fragments)
+        self.check_cancelled()
+
+    def to_dict(self) -> Dict:
+        """json serializable job description"""
+        if self.started is None:
+            elapsed = 0.0
+        else:
+            elapsed = (self.finished or time.time()) - self.started
+        return {
+            'job_id': self.id,
+            'doc_name': self.doc_name,
+            'status': self.status,
+            'phase': self.phase,
+            'files_total': self.files_total,
+            'files_parsed': self.files_parsed,
+            'fragments': self.fragments,
+            'documents_written': self.documents_written,
+            'documents_embedded': self.documents_embedded,
+            'documents_per_second': self.documents_embedded / self.embedding_seconds 
+                if self.embedding_seconds > 0 else 0.0,
+            'elapsed': elapsed,
+            'error': self.error,
+            'params': self.params,
+        }
+
+
+class JobManager:
+    """runs index builds in background threads and tracks their progress
+
+    only one active job is allowed per document name,
+    only the most recent max_finished finished jobs are kept
+    """
+    def __init__(self, max_workers: int = 1, max_finished: int = 50) -> None:
+        """constructor
+
+        parameters:
+            max_workers: number of jobs that run at the same time, further jobs wait
+            max_finished: number of finished jobs kept for status queries
+        """
+        self.jobs = {}
+        self.max_finished = max_finished
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='index-job')
+        self._lock = threading.Lock()
+
+    def submit(self, 
+               doc_name: str, 
+               fn: Callable, 
+               on_done: Callable = None, 
+               **kwargs) -> IndexJob:
+        """start a job running fn(job=job, **kwargs) in the background
+
+        parameters:
+            doc_name: name of the document the job builds, used to prevent concurrent builds
+            fn: function performing the work, must accept a job keyword argument
+            on_done: optional callback called with the job once it has finished
+        raises: JobConflictError if a job for doc_name is pending or running
+        """
+        with self._lock:
+            for job in self.jobs.values():
+                if job.doc_name == doc_name and job.active:
+                    raise JobConflictError(f'index build for {doc_name} already in progress: job {job.id}')
+            job = IndexJob(uuid.uuid4().hex, doc_name, params=kwargs)
+            self.jobs[job.id] = job
+            self._prune()
+        self.executor.submit(self._run, job, fn, on_done, kwargs)
+        return job
+
+    def _run(self, job: IndexJob, fn: Callable, on_done: Callable, kwargs: Dict) -> None:
+        job.started = time.time()
+        job.status = 'running'
+        try:
+            job.check_cancelled()
+            fn(job=job, **kwargs)
+            job.status = 'succeeded'
+        except JobCancelled:
+            job.status = 'cancelled'
+        except Exception as e:
+            logger.exception(f'job {job.id} failed')
+            job.status = 'failed'
+            job.error = str(e)
+        finally:
+            job.finished = time.time()
+            if on_done is not None:
+                on_done(job)
+
+    def _prune(self) -> None:
+        """drop the oldest finished jobs beyond max_finished, called with the lock held"""
+        finished = sorted((job for job in self.jobs.values() if not job.active),
+                          key=lambda job: job.created, reverse=True)
+        for job in finished[self.max_finished:]:
+            del self.jobs[job.id]
+
+    def get(self, job_id: str) -> IndexJob:
+        """return job by id, None if unknown"""
+        return self.jobs.get(job_id)
+
+    def list(self) -> List[IndexJob]:
+        """all jobs, most recent first"""
+        return sorted(list(self.jobs.values()), key=lambda job: job.created, reverse=True)
+
+    def cancel(self, job_id: str) -> IndexJob:
+        """request cancellation of a job, returns the job or None if unknown"""
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job.cancel()
+        return job
+
+    def shutdown(self, wait: bool = True) -> None:
+        """cancel active jobs and stop worker threads"""
+        for job in self.jobs.values():
+            if job.active:
+                job.cancel()
+        self.executor.shutdown(wait=wait)
@@ -0,0 +1,119 @@
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+
+class IndexManifest:
+    """per-file record of what has been indexed for a document
+
+    the manifest is stored next to the context json files and is used to
+    re-index only the files that changed since the previous build. 
+    for each file it keeps the content hash, modification time, 
+    range of fragment uuids created from the file and ids of the documents 
+    written to the document store.
+    """
+
+    def __init__(self, 
+                 path: Union[str, Path],
+                 files: Dict[str, Dict] = None,
+                 next_uuid: int = 0,
+                 config: Dict = None) -> None:
+        """constructor
+
+        parameters:
+            path: location of the manifest json file
+            files: dictionary of file path to indexed file record
+            next_uuid: first fragment uuid not yet used by the document
+            config: settings the index was built with, e.g. docstore type and retriever
+        """
+        self.path = Path(path)
+        self.files = {} if files is None else files
+        self.next_uuid = next_uuid
+        self.config = {} if config is None else config
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'IndexManifest':
+        """load manifest from disk, an empty manifest is returned if none exists"""
+        if not Path(path).exists():
+            return cls(path)
+        with open(path) as fp:
+            data = json.load(fp)
+        return cls(path, 
+                   files=data['files'], 
+                   next_uuid=data['next_uuid'], 
+                   config=data.get('config', {}))
+
+    def save(self) -> None:
+        """write manifest to disk"""
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        data = {
+            'next_uuid': self.next_uuid,
+            'config': self.config,
+            'files': self.files,
+        }
+        with open(self.path, 'w') as fp:
+            json.dump(data, fp)
+
+    @staticmethod
+    def file_hash(file: Union[str, Path], chunk_size: int = 1 << 20) -> str:
+        """sha256 hash of file content"""
+        digest = hashlib.sha256()
+        with open(file, 'rb') as fp:
+            for chunk in iter(lambda: fp.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def is_unchanged(self, file: Union[str, Path]) -> bool:
+        """check if file content matches what was indexed
+
+        the modification time is checked first so unchanged files are not re-read,
+        the content hash decides when the modification time differs
+        """
+        record = self.files.get(str(file))
+        if record is None:
+            return False
+        if record['mtime'] == Path(file).stat().st_mtime:
+            return True
+        return record['hash'] == self.file_hash(file)
+
+    def diff(self, files: List[Union[str, Path]]) -> Tuple[List[Path], List[str]]:
+        """compare files on disk to the manifest
+
+        parameters:
+            files: files currently in the document folder
+        returns:
+            changed: files that are new or whose content changed since indexing
+            deleted: files in the manifest that are no longer on disk
+        """
+        changed = [Path(f) for f in files if not self.is_unchanged(f)]
+        current = {str(f) for f in files}
+        deleted = [f for f in self.files if f not in current]
+        return changed, deleted
+
+    def stale_records(self, changed: List[Path], deleted: List[str]) -> List[Dict]:
+        """records of previously indexed files whose documents must be removed"""
+        names = [str(f) for f in changed] + list(deleted)
+        return [self.files[name] for name in names if name in self.files]
+
+    def record_file(self, 
+                    file: Union[str, Path], 
+                    uuid_range: Tuple[int, int], 
+                    document_ids: List[str]) -> None:
+        """record an indexed file
+
+        parameters:
+            file: path of indexed file
+            uuid_range: [first, last + 1) fragment uuids created from the file
+            document_ids: ids of document store documents created from the file
+        """
+        self.files[str(file)] = {
+            'hash': self.file_hash(file),
+            'mtime': Path(file).stat().st_mtime,
+            'uuid_range': list(uuid_range),
+            'document_ids': list(document_ids),
+        }
+
+    def remove_file(self, file: Union[str, Path]) -> None:
+        """remove a file from the manifest"""
+        self.files.pop(str(file), None)
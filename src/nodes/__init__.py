@@ -1,2 +1,26 @@
-from .retrieval_enricher import RetrievalEnricher
-from .prompt_node import PromptNodeWrapped
\ No newline at end of file
+import importlib
+
+#exported name -> module defining it, imported by __getattr__ on first use
+_exports = {
+    'RetrievalEnricher': '.retrieval_enricher',
+    'build_next_document_map': '.retrieval_enricher',
+    'PromptNodeWrapped': '.prompt_node',
+    'CachedEmbeddingRetriever': '.cached_retriever',
+    'HybridRetriever': '.hybrid_retriever',
+    'reciprocal_rank_fusion': '.hybrid_retriever',
+    'sparse_retriever': '.hybrid_retriever',
+    'AdaptiveRanker': '.adaptive_ranker',
+    'PassageSelector': '.summarization',
+    'LengthAwareSummarizer': '.summarization',
+}
+
+def __getattr__(name: str):
+    """import exported names on first use so importing the package stays cheap"""
+    if name not in _exports:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(_exports[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted({*globals(), *_exports})
@@ -0,0 +1,182 @@
+import os
+import sys
+import time
+import threading
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+
+from haystack.nodes.base import BaseComponent
+from haystack.nodes import BaseRanker
+from haystack.schema import Document
+
+main_repo_path = str(Path(os.path.abspath(__file__)).parents[1]).replace('\\', '/')
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from util.vars import RANKER_RERANK_K, RANKER_RETRIEVER_MARGIN, RANKER_FIRST_PASS_MARGIN, \
+    RANKER_LATENCY_BUDGET_MS
+
+
+def clear_winner(documents: List[Document], margin: Optional[float]) -> bool:
+    """True if the first document leads the second by at least margin"""
+    if margin is None or len(documents) < 2:
+        return False
+    first, second = documents[0].score, documents[1].score
+    return first is not None and second is not None and first - second >= margin
+
+
+class AdaptiveRanker(BaseComponent):
+    """cross-encoder ranking that spends less compute on easy queries
+
+    stages, each skipped when the previous one already gives a clear winner:
+        retriever order: kept if the top retriever score leads by retriever_margin
+        first pass: optional cheaper cross-encoder scoring all candidates,
+            kept if the top score leads by first_pass_margin
+        second pass: cross-encoder rescoring the rerank_k best candidates,
+            shortened or skipped to stay within latency_budget_ms
+    the time per document of the second pass is learned from previous queries.
+    per-stage timings of each query are returned as ranker_timings,
+    running totals are kept in stats
+    """
+    outgoing_edges = 1
+
+    def __init__(self,
+                 ranker: BaseRanker,
+                 first_pass_ranker: BaseRanker = None,
+                 top_k: int = 5,
+                 rerank_k: int = RANKER_RERANK_K,
+                 retriever_margin: float = RANKER_RETRIEVER_MARGIN,
+                 first_pass_margin: float = RANKER_FIRST_PASS_MARGIN,
+                 latency_budget_ms: float = RANKER_LATENCY_BUDGET_MS) -> None:
+        """constructor
+
+        parameters:
+            ranker: cross-encoder ranker of the second pass, e.g. ms-marco-MiniLM-L-12-v2
+            first_pass_ranker: optional cheaper ranker scoring all candidates, e.g. ms-marco-MiniLM-L-6-v2
+            top_k: number of documents returned
+            rerank_k: number of first pass candidates rescored by the second pass,
+                all candidates when there is no first pass
+            retriever_margin: retriever score lead of the top document that skips ranking, None to always rank
+            first_pass_margin: first pass score lead of the top document that skips the second pass
+            latency_budget_ms: per query ranking budget in milliseconds, None for no budget
+        """
+        super().__init__()
+        self.ranker = ranker
+        self.first_pass_ranker = first_pass_ranker
+        self.top_k = top_k
+        self.rerank_k = rerank_k
+        self.retriever_margin = retriever_margin
+        self.first_pass_margin = first_pass_margin
+        self.latency_budget_ms = latency_budget_ms
+        self.stats = {
+            'queries': 0,
+            'retriever_exits': 0,
+            'first_pass_exits': 0,
+            'budget_cuts': 0,
+            'first_pass_ms': 0.0,
+            'second_pass_ms': 0.0,
+            'second_pass_documents': 0,
+        }
+        self._lock = threading.Lock()
+
+    def second_pass_size(self, n_candidates: int, elapsed_ms: float, latency_budget_ms: Optional[float]) -> int:
+        """number of candidates the second pass can rescore within the remaining budget"""
+        if latency_budget_ms is None:
+            return n_candidates
+        remaining_ms = latency_budget_ms - elapsed_ms
+        with self._lock:
+            n_scored = self.stats['second_pass_documents']
+            ms_per_document = self.stats['second_pass_ms'] / n_scored if n_scored else None
+        if remaining_ms <= 0:
+            return 0
+        if ms_per_document is None or ms_per_document <= 0:
+            return n_candidates
+        return min(n_candidates, int(remaining_ms / ms_per_document))
+
+    def rank(self,
+             query: str,
+             documents: List[Document],
+             top_k: Optional[int] = None,
+             rerank_k: Optional[int] = None,
+             latency_budget_ms: Optional[float] = None) -> Tuple[List[Document], Dict]:
+        """rank the documents of a single query
+
+        parameters:
+            query: query text
+            documents: retrieved documents in retriever order
+            top_k, rerank_k, latency_budget_ms: override the values given to the constructor
+        returns: top_k ranked documents and the timings of each stage
+        """
+        top_k = top_k or self.top_k
+        rerank_k = rerank_k or self.rerank_k
+        if latency_budget_ms is None:
+            latency_budget_ms = self.latency_budget_ms
+        timings = {'exit': None, 'first_pass_ms': 0.0, 'second_pass_ms': 0.0, 'second_pass_documents': 0}
+        t_start = time.perf_counter()
+
+        if clear_winner(documents, self.retriever_margin):
+            timings['exit'] = 'retriever'
+            self._record(timings)
+            return documents[:top_k], timings
+
+        candidates = documents
+        if self.first_pass_ranker is not None:
+            candidates = self.first_pass_ranker.predict(query=query, documents=documents, top_k=len(documents))
+            timings['first_pass_ms'] = 1000 * (time.perf_counter() - t_start)
+            if clear_winner(candidates, self.first_pass_margin):
+                timings['exit'] = 'first_pass'
+                self._record(timings)
+                return candidates[:top_k], timings
+            n_rerank = min(len(candidates), max(rerank_k or len(candidates), top_k))
+        else:
+            n_rerank = len(candidates)
+
+        elapsed_ms = 1000 * (time.perf_counter() - t_start)
+        n_second_pass = self.second_pass_size(n_rerank, elapsed_ms, latency_budget_ms)
+        if n_second_pass < n_rerank:
+            timings['exit'] = 'budget'
+        if n_second_pass >= 2:
+            t_second_pass = time.perf_counter()
+            reranked = self.ranker.predict(query=query, documents=candidates[:n_second_pass],
+                                           top_k=n_second_pass)
+            candidates = reranked + candidates[n_second_pass:]
+            timings['second_pass_ms'] = 1000 * (time.perf_counter() - t_second_pass)
+            timings['second_pass_documents'] = n_second_pass
+        self._record(timings)
+        return candidates[:top_k], timings
+
+    def _record(self, timings: Dict) -> None:
+        with self._lock:
+            self.stats['queries'] += 1
+            if timings['exit'] == 'retriever':
+                self.stats['retriever_exits'] += 1
+            elif timings['exit'] == 'first_pass':
+                self.stats['first_pass_exits'] += 1
+            elif timings['exit'] == 'budget':
+                self.stats['budget_cuts'] += 1
+            self.stats['first_pass_ms'] += timings['first_pass_ms']
+            self.stats['second_pass_ms'] += timings['second_pass_ms']
+            self.stats['second_pass_documents'] += timings['second_pass_documents']
+
+    def run(self,
+            query: str,
+            documents: List[Document],
+            top_k: Optional[int] = None,
+            rerank_k: Optional[int] = None,
+            latency_budget_ms: Optional[float] = None):
+        documents, timings = self.rank(query, documents, top_k=top_k, rerank_k=rerank_k,
+                                       latency_budget_ms=latency_budget_ms)
+        return {'documents': documents, 'ranker_timings': timings}, 'output_1'
+
+    def run_batch(self,
+                  queries: List[str],
+                  documents: List[List[Document]],
+                  top_k: Optional[int] = None,
+                  rerank_k: Optional[int] = None,
+                  latency_budget_ms: Optional[float] = None):
+        """rank each query on its own, the latency budget applies per query"""
+        results = [self.rank(query, docs, top_k=top_k, rerank_k=rerank_k,
+                             latency_budget_ms=latency_budget_ms)
+                   for query, docs in zip(queries, documents)]
+        return {'documents': [docs for docs, _ in results],
+                'ranker_timings': [timings for _, timings in results]}, 'output_1'
@@ -0,0 +1,70 @@
+import os
+import sys
+import re
+import unicodedata
+from pathlib import Path
+from typing import List
+
+import numpy as np
+from haystack.nodes import EmbeddingRetriever
+
+main_repo_path = str(Path(os.path.abspath(__file__)).parents[1]).replace('\\', '/')
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from util.cache import TTLCache
+from util.vars import QUERY_EMBEDDING_CACHE_SIZE, QUERY_EMBEDDING_CACHE_TTL
+
+_re_whitespace = re.compile(r'\s+')
+
+def normalize_query(query: str) -> str:
+    """normalize query text so trivially different queries share a cache entry
+
+    documents are lower cased at indexing time so queries are lower cased as well
+    """
+    query = unicodedata.normalize('NFKC', query)
+    return _re_whitespace.sub(' ', query).strip().lower()
+
+
+class CachedEmbeddingRetriever(EmbeddingRetriever):
+    """EmbeddingRetriever with a bounded cache of query embeddings
+
+    repeated queries skip the transformer forward pass. 
+    entries are keyed on the normalized query text and the embedding model name.
+    """
+
+    def __init__(self, 
+                 *args, 
+                 cache_size: int = QUERY_EMBEDDING_CACHE_SIZE,
+                 cache_ttl: float = QUERY_EMBEDDING_CACHE_TTL,
+                 **kwargs) -> None:
+        """constructor
+
+        parameters:
+            cache_size: maximum number of query embeddings held
+            cache_ttl: seconds a query embedding stays cached, None for no expiry
+            remaining arguments are passed to EmbeddingRetriever
+        """
+        super().__init__(*args, **kwargs)
+        self.query_cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """create embeddings for a list of queries, using cached embeddings where available
+
+        parameters:
+            queries: list of query strings
+        returns: embeddings, one per query
+        """
+        keys = [(normalize_query(q), self.embedding_model) for q in queries]
+        embeddings = [self.query_cache.get(key) for key in keys]
+
+        #embed each missing query once, even if repeated within the batch
+        missing = list(dict.fromkeys(key for key, e in zip(keys, embeddings) if e is None))
+        if missing:
+            new_embeddings = super().embed_queries([query for query, _ in missing])
+            computed = dict(zip(missing, new_embeddings))
+            for key, embedding in computed.items():
+                self.query_cache.set(key, embedding)
+            embeddings = [computed[key] if e is None else e for key, e in zip(keys, embeddings)]
+
+        return np.stack(embeddings)
@@ -0,0 +1,113 @@
+import os
+import sys
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
+
+from haystack.nodes.base import BaseComponent
+from haystack.nodes import BaseRetriever, BM25Retriever, TfidfRetriever
+from haystack.schema import Document
+from haystack.document_stores import BaseDocumentStore, KeywordDocumentStore
+
+main_repo_path = str(Path(os.path.abspath(__file__)).parents[1]).replace('\\', '/')
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from util.vars import RRF_K
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]],
+                           k: int = RRF_K,
+                           top_k: int = None) -> List[Document]:
+    """fuse ranked document lists by reciprocal rank
+
+    each document scores sum(1 / (k + rank)) over the lists it appears in, rank starting at 1.
+    only ranks are used so the incomparable scores of sparse and dense retrievers need no scaling
+    parameters:
+        rankings: ranked document lists, e.g. one per retriever
+        k: rank offset, damps the weight of the first ranks
+        top_k: number of documents returned, all if None
+    returns: documents ordered by fused score, score set to the fused score
+    """
+    scores = {}
+    documents = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, 1):
+            scores[doc.id] = scores.get(doc.id, 0.0) + 1.0 / (k + rank)
+            documents.setdefault(doc.id, doc)
+
+    fused = []
+    for doc_id in sorted(scores, key=scores.get, reverse=True)[:top_k]:
+        doc = documents[doc_id]
+        doc.score = scores[doc_id]
+        fused.append(doc)
+    return fused
+
+def sparse_retriever(document_store: BaseDocumentStore) -> BaseRetriever:
+    """keyword retriever for a document store, BM25 where the store supports it, TfIdf otherwise"""
+    if isinstance(document_store, KeywordDocumentStore):
+        return BM25Retriever(document_store)
+    return TfidfRetriever(document_store=document_store)
+
+
+class HybridRetriever(BaseComponent):
+    """runs a sparse and a dense retriever in parallel and fuses their results
+    with reciprocal rank fusion"""
+    outgoing_edges = 1
+
+    def __init__(self,
+                 sparse_retriever: BaseRetriever,
+                 dense_retriever: BaseRetriever,
+                 top_k: int = 10,
+                 rrf_k: int = RRF_K) -> None:
+        """constructor
+
+        parameters:
+            sparse_retriever: keyword retriever, e.g. BM25Retriever or TfidfRetriever
+            dense_retriever: embedding retriever
+            top_k: number of fused documents returned, each retriever also retrieves top_k
+            rrf_k: rank offset of reciprocal rank fusion
+        """
+        super().__init__()
+        self.sparse_retriever = sparse_retriever
+        self.dense_retriever = dense_retriever
+        self.top_k = top_k
+        self.rrf_k = rrf_k
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='hybrid-retriever')
+
+    def retrieve(self,
+                 query: str,
+                 top_k: Optional[int] = None,
+                 filters: Optional[Dict] = None) -> List[Document]:
+        """fused documents of a single query"""
+        top_k = top_k or self.top_k
+        sparse = self.executor.submit(self.sparse_retriever.retrieve, query=query, top_k=top_k, filters=filters)
+        dense = self.executor.submit(self.dense_retriever.retrieve, query=query, top_k=top_k, filters=filters)
+        return reciprocal_rank_fusion([sparse.result(), dense.result()], k=self.rrf_k, top_k=top_k)
+
+    def retrieve_batch(self,
+                       queries: List[str],
+                       top_k: Optional[int] = None,
+                       filters: Optional[Dict] = None) -> List[List[Document]]:
+        """fused documents of each query, each retriever processes the whole batch"""
+        top_k = top_k or self.top_k
+        sparse = self.executor.submit(self.sparse_retriever.retrieve_batch,
+                                      queries=queries, top_k=top_k, filters=filters)
+        dense = self.executor.submit(self.dense_retriever.retrieve_batch,
+                                     queries=queries, top_k=top_k, filters=filters)
+        return [reciprocal_rank_fusion([s, d], k=self.rrf_k, top_k=top_k)
+                for s, d in zip(sparse.result(), dense.result())]
+
+    def run(self,
+            query: str,
+            top_k: Optional[int] = None,
+            filters: Optional[Dict] = None):
+        documents = self.retrieve(query=query, top_k=top_k, filters=filters)
+        return {'documents': documents}, 'output_1'
+
+    def run_batch(self,
+                  queries: List[str],
+                  top_k: Optional[int] = None,
+                  filters: Optional[Dict] = None):
+        documents = self.retrieve_batch(queries=queries, top_k=top_k, filters=filters)
+        return {'documents': documents}, 'output_1'
@@ -1,60 +1,200 @@
-from typing import Optional, List, Dict, Tuple
+import os
+import sys
+from pathlib import Path
+from typing import List, Dict, Tuple, Union, Iterable
 
 from haystack.nodes.base import BaseComponent
 from haystack.nodes import DocumentMerger
 from haystack.schema import Document
 from haystack.document_stores import BaseDocumentStore
 
+main_repo_path = str(Path(os.path.abspath(__file__)).parents[1]).replace('\\', '/')
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from util.cache import TTLCache
+from util.vars import ENRICHER_CACHE_SIZE
+
+def next_document_key(uuid: int, split_id: int) -> str:
+    """key of a document in the next document map"""
+    return f'{uuid}_{split_id}'
+
+def build_next_document_map(documents: Iterable[Document]) -> Dict[str, List[str]]:
+    """map each indexed document to the ids of the documents following it
+
+    the next document is the next split of the same fragment or, 
+    for the last split, all splits of the next fragment.
+    documents are consumed in a single pass and only their ids and links are kept, 
+    so a document store generator can be passed without loading its content
+    parameters:
+        documents: indexed documents, meta must contain uuid, _split_id and next
+    returns: dictionary of next_document_key(uuid, _split_id) to list of document ids
+    """
+    ids_by_key = {}
+    ids_by_uuid = {}
+    links = []
+    for doc in documents:
+        key = next_document_key(doc.meta['uuid'], doc.meta['_split_id'])
+        ids_by_key.setdefault(key, []).append(doc.id)
+        ids_by_uuid.setdefault(doc.meta['uuid'], []).append(doc.id)
+        links.append((key, 
+                      next_document_key(doc.meta['uuid'], doc.meta['_split_id'] + 1), 
+                      doc.meta['next']))
+
+    next_document_map = {}
+    for key, next_split, next_uuid in links:
+        if next_split in ids_by_key:
+            next_document_map[key] = ids_by_key[next_split]
+        else:
+            next_document_map[key] = ids_by_uuid.get(next_uuid, [])
+    return next_document_map
+
 class RetrievalEnricher(BaseComponent):
     """add additional potentially relevant documents to retrieval results"""
     outgoing_edges = 1
 
     def __init__(self, 
                  document_store: BaseDocumentStore,
-                 mode: str =None) -> None:
+                 mode: str =None,
+                 next_document_map: Dict[str, List[str]] = None,
+                 cache_size: int = ENRICHER_CACHE_SIZE) -> None:
         """constructor
         
         parameters: 
             document_store: Haystack DocumentStore with documents to enrich retrival
             mode: str (should be list of enum), enrichment activity (currenly only option is next_document)
+            next_document_map: optional map built at index time by build_next_document_map,
+                when given neighbours are looked up by id and cached in process
+            cache_size: number of neighbour documents cached when next_document_map is given
         """
         self.document_store = document_store
         self.mode = mode
+        self.next_document_map = next_document_map
+        self.document_cache = TTLCache(maxsize=cache_size)
         self.merger = DocumentMerger()
 
     def find_next_section(self, 
-                          doc: Document) -> Document:
+                          doc: Document) -> List[Document]:
         """enrich retrieved documents by adding the next section
         
         parameters:
             doc: Haystack Document, focal document, 
                 section following this document will be returned
 
-        returns: Haystack Document, next_doc, document following 'doc'
+        returns: list of Haystack Documents, next_doc, documents following 'doc'
+        """
+        return self.find_next_sections([doc])[0]
+
+    def find_next_sections(self, 
+                           documents: List[Document]) -> List[List[Document]]:
+        """find the sections following each document with a single document store query
+
+        the next section is the next split of the same fragment or, 
+        if there is none, the fragment referenced by meta['next']
+        parameters:
+            documents: Haystack Documents, focal documents
+        returns: list of next documents for each focal document
+        """
+        if self.next_document_map is not None:
+            return self._find_next_sections_by_id(documents)
+        return self._find_next_sections_by_query(documents)
+
+    def _find_next_sections_by_query(self, 
+                                     documents: List[Document]) -> List[List[Document]]:
+        """find next sections with a single document store query on the uuids of the documents
+        and of the fragments following them"""
+        uuids = set()
+        for doc in documents:
+            uuids.add(doc.meta['uuid'])
+            if doc.meta['next'] is not None:
+                uuids.add(doc.meta['next'])
+        if not uuids:
+            return [[] for _ in documents]
+
+        candidates = self.document_store.get_all_documents(filters={"uuid": {"$in": list(uuids)}})
+        by_split = {}
+        by_uuid = {}
+        for candidate in candidates:
+            by_split.setdefault((candidate.meta['uuid'], candidate.meta['_split_id']), []).append(candidate)
+            by_uuid.setdefault(candidate.meta['uuid'], []).append(candidate)
+
+        next_sections = []
+        for doc in documents:
+            next_doc = by_split.get((doc.meta['uuid'], doc.meta['_split_id'] + 1), [])
+            if next_doc == [] and doc.meta['next'] is not None:
+                #no hits found in next split, use next uuid
+                next_doc = by_uuid.get(doc.meta['next'], [])
+            next_sections.append(next_doc)
+        return next_sections
+
+    def _find_next_sections_by_id(self, 
+                                  documents: List[Document]) -> List[List[Document]]:
+        """find next sections using the index-time next document map
+
+        neighbours already among the documents or in the cache need no document store call,
+        all remaining neighbours are fetched in a single call. documents missing from the map,
+        e.g. indexed after the map was loaded, fall back to a document store query
         """
+        keys = [next_document_key(doc.meta['uuid'], doc.meta['_split_id']) for doc in documents]
+        unmapped = [doc for doc, key in zip(documents, keys) if key not in self.next_document_map]
+        unmapped_sections = iter(self._find_next_sections_by_query(unmapped) if unmapped else [])
+        next_ids = [self.next_document_map.get(key, []) for key in keys]
 
-        split_target =  doc.meta['_split_id'] + 1
-        next_uuid = doc.meta['next']
-        filter = {"$and":
-                        {
-                            "uuid" : {"$eq" : doc.meta['uuid']},
-                            "_split_id" : {"$eq" : split_target},
-                        }
-                }
-        next_doc = self.document_store.get_all_documents(filters=filter)
-
-        if next_doc == [] and next_uuid is not None:  
-            #no hits found in next split, try next uuid
-            filter = {"$and":
-                            {
-                                "uuid" : {"$eq" : next_uuid},
-                                "_split_id" : {"$eq" : 0},
-                            }
-                    }
-            filter = {"uuid": {"$eq":next_uuid}}
-            next_doc = self.document_store.get_all_documents(filters=filter)
-
-        return next_doc
+        found = {doc.id: doc for doc in documents}
+        missing = set()
+        for doc_id in {i for ids in next_ids for i in ids}:
+            if doc_id in found:
+                continue
+            cached = self.document_cache.get(doc_id)
+            if cached is None:
+                missing.add(doc_id)
+            else:
+                found[doc_id] = cached
+        if missing:
+            for doc in self.document_store.get_documents_by_id(ids=list(missing)):
+                found[doc.id] = doc
+                self.document_cache.set(doc.id, doc)
+
+        return [[found[i] for i in ids if i in found] if key in self.next_document_map 
+                else next(unmapped_sections)
+                for key, ids in zip(keys, next_ids)]
+
+    def enrich(self, 
+               documents: List[Document]) -> List[Document]:
+        """enrich the documents retrieved for a single query
+        
+        parameters: 
+            documents: List[Document], documents to be enriched
+        returns: 
+            enriched documents 
+        """
+        return self.enrich_batch([documents])[0]
+
+    def enrich_batch(self, 
+                     documents: List[List[Document]]) -> List[List[Document]]:
+        """enrich the documents retrieved for several queries, 
+        neighbours for all queries are found together
+        
+        parameters: 
+            documents: List[List[Document]], documents to be enriched, one list per query
+        returns: 
+            enriched documents, one list per query
+        """
+        if self.mode != 'next_document':  #convert to enum
+            return documents
+
+        flat_documents = [doc for docs in documents for doc in docs]
+        hit_docs = iter(self.find_next_sections(flat_documents))
+        enriched_documents = []
+        for docs in documents:
+            enriched = []
+            for doc in docs:
+                doc_enriched = self.merger.merge(documents=[doc, *next(hit_docs)])[0]
+                doc_enriched.score = doc.score
+                doc_enriched.meta = doc.meta
+                enriched.append(doc_enriched)
+            enriched_documents.append(enriched)
+        return enriched_documents
 
     def run(self, 
             documents: List[Document]) -> Tuple[Dict, str]:
@@ -65,23 +205,27 @@ class RetrievalEnricher(BaseComponent):
         returns: 
             output: enriched documents 
         """
-        enriched_documents = []
-        for doc in documents:
-            if self.mode == 'next_document':  #convert to enum
-                hit_docs = self.find_next_section(doc)
-                doc_enriched = self.merger.merge(documents=[doc, *hit_docs])[0]
-                doc_enriched.score = doc.score
-                doc_enriched.meta = doc.meta
-                enriched_documents.append(doc_enriched)
-            else: 
-                enriched_documents.append(doc)
+        output={
+            "documents": self.enrich(documents),
+        }
+        return output, "output_1"
+
+    def run_batch(self, 
+                  documents: Union[List[Document], List[List[Document]]]) -> Tuple[Dict, str]:
+        """run_batch function matching Haystack API for a node
+        
+        parameters: 
+            documents: List[List[Document]], documents to be enriched, one list per query
+                a single flat list of documents is enriched as one list
+        returns: 
+            output: enriched documents, one list per query
+        """
+        if len(documents) > 0 and isinstance(documents[0], Document):
+            enriched_documents = self.enrich(documents)
+        else:
+            enriched_documents = self.enrich_batch(documents)
 
         output={
             "documents": enriched_documents,
         }
         return output, "output_1"
-
-    def run_batch(self, queries: List[str], my_arg: Optional[int] = 10):
-        # Insert code here to manipulate the input and produce an output dictionary
-        raise NotImplementedError('run_batch has not yet been implemented for Retrival Enricher')
-        
\ No newline at end of file
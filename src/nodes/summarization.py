@@ -0,0 +1,249 @@
+import os
+import sys
+from pathlib import Path
+import threading
+from typing import List, Dict, Optional, Tuple, Union, Callable, Iterator
+
+from haystack.nodes.base import BaseComponent
+from haystack.nodes import TransformersSummarizer
+from haystack.schema import Document
+
+main_repo_path = str(Path(os.path.abspath(__file__)).parents[1]).replace('\\', '/')
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from util.vars import SUMMARIZER_MAX_INPUT_TOKENS, SUMMARIZER_MIN_LENGTH, SUMMARIZER_MAX_LENGTH, \
+    SUMMARIZER_NUM_BEAMS, SUMMARIZER_BATCH_SIZE
+
+
+def word_count(text: str) -> int:
+    """token count used when no tokenizer is given"""
+    return len(text.split())
+
+
+class PassageSelector(BaseComponent):
+    """select the most relevant documents up to a token budget
+
+    documents are taken by descending score until the budget is used,
+    the last document taken is truncated to the remaining budget.
+    placed before the DocumentMerger so the summarizer never receives more text than it can use.
+    documents are copied, not modified, as they are also part of the search results
+    """
+    outgoing_edges = 1
+
+    def __init__(self,
+                 max_tokens: int = SUMMARIZER_MAX_INPUT_TOKENS,
+                 tokenizer: Callable = None) -> None:
+        """constructor
+
+        parameters:
+            max_tokens: token budget of the selected documents
+            tokenizer: optional huggingface tokenizer of the summarizer,
+                words are counted if None
+        """
+        super().__init__()
+        self.max_tokens = max_tokens
+        self.tokenizer = tokenizer
+
+    def select(self,
+               documents: List[Document],
+               max_tokens: Optional[int] = None) -> List[Document]:
+        """documents within the token budget, most relevant first"""
+        budget = max_tokens or self.max_tokens
+        ranked = sorted(documents, key=lambda doc: doc.score if doc.score is not None else float('-inf'),
+                        reverse=True)
+        selected = []
+        for doc in ranked:
+            if budget <= 0:
+                break
+            if self.tokenizer is None:
+                tokens = doc.content.split()
+                n_tokens = len(tokens)
+                truncated = ' '.join(tokens[:budget])
+            else:
+                tokens = self.tokenizer.tokenize(doc.content)
+                n_tokens = len(tokens)
+                truncated = self.tokenizer.convert_tokens_to_string(tokens[:budget])
+            content = doc.content if n_tokens <= budget else truncated
+            selected.append(Document(content=content, id=doc.id, meta=dict(doc.meta), score=doc.score))
+            budget -= n_tokens
+        return selected
+
+    def run(self,
+            documents: List[Document],
+            max_tokens: Optional[int] = None) -> Tuple[Dict, str]:
+        return {'documents': self.select(documents, max_tokens=max_tokens)}, 'output_1'
+
+    def run_batch(self,
+                  documents: Union[List[Document], List[List[Document]]],
+                  max_tokens: Optional[int] = None) -> Tuple[Dict, str]:
+        if len(documents) > 0 and isinstance(documents[0], Document):
+            selected = self.select(documents, max_tokens=max_tokens)
+        else:
+            selected = [self.select(docs, max_tokens=max_tokens) for docs in documents]
+        return {'documents': selected}, 'output_1'
+
+
+def stop_on_event(stop: threading.Event):
+    """transformers stopping criteria ending generation once stop is set"""
+    from transformers import StoppingCriteria, StoppingCriteriaList
+
+    class StopOnEvent(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs) -> bool:
+            return stop.is_set()
+
+    return StoppingCriteriaList([StopOnEvent()])
+
+
+class LengthAwareSummarizer(BaseComponent):
+    """summarizes documents with a shared TransformersSummarizer,
+    with generation settings that can be changed per request
+
+    inputs longer than the model accepts are truncated. batches of inputs are sorted
+    by length before generation so each generation batch pads to similar lengths.
+    the summary is set in meta['summary'] of each document, as TransformersSummarizer does
+    """
+    outgoing_edges = 1
+
+    def __init__(self,
+                 summarizer: TransformersSummarizer,
+                 min_length: int = SUMMARIZER_MIN_LENGTH,
+                 max_length: int = SUMMARIZER_MAX_LENGTH,
+                 num_beams: int = SUMMARIZER_NUM_BEAMS,
+                 batch_size: int = SUMMARIZER_BATCH_SIZE) -> None:
+        """constructor
+
+        parameters:
+            summarizer: TransformersSummarizer whose model and tokenizer are used
+            min_length: minimum number of generated tokens
+            max_length: maximum number of generated tokens
+            num_beams: beam search width, model default if None, 1 for greedy decoding
+            batch_size: number of inputs generated together
+        """
+        super().__init__()
+        self.summarizer = summarizer
+        self.min_length = min_length
+        self.max_length = max_length
+        self.num_beams = num_beams
+        self.batch_size = batch_size
+
+    @property
+    def tokenizer(self):
+        return self.summarizer.summarizer.tokenizer
+
+    def generation_kwargs(self,
+                          min_length: Optional[int] = None,
+                          max_length: Optional[int] = None,
+                          num_beams: Optional[int] = None) -> Dict:
+        """generation settings of a request, unset values default to the constructor settings
+
+        a default min_length above the requested max_length is lowered to max_length
+        raises: ValueError if both lengths are given and min_length is larger than max_length
+        """
+        if min_length is not None and max_length is not None and min_length > max_length:
+            raise ValueError(f'min_length {min_length} is larger than max_length {max_length}')
+        max_length = self.max_length if max_length is None else max_length
+        min_length = min(self.min_length, max_length) if min_length is None else min_length
+        if min_length > max_length:
+            #only the maximum is a default here, the requested minimum is kept
+            max_length = min_length
+        kwargs = {'min_length': min_length, 'max_length': max_length}
+        num_beams = self.num_beams if num_beams is None else num_beams
+        if num_beams is not None:
+            kwargs['num_beams'] = num_beams
+        return kwargs
+
+    def summarize(self, texts: List[str], **generation_kwargs) -> List[str]:
+        """summaries of texts, in the order of texts"""
+        if not texts:
+            return []
+        lengths = [len(ids) for ids in self.tokenizer(texts, verbose=False)['input_ids']]
+        order = sorted(range(len(texts)), key=lambda i: lengths[i])
+        summaries = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            outputs = self.summarizer.summarizer([texts[i] for i in batch],
+                                                 truncation=True,
+                                                 return_text=True,
+                                                 clean_up_tokenization_spaces=True,
+                                                 batch_size=len(batch),
+                                                 **generation_kwargs)
+            for i, output in zip(batch, outputs):
+                summaries[i] = output['summary_text']
+        return summaries
+
+    def stream(self,
+               text: str,
+               min_length: Optional[int] = None,
+               max_length: Optional[int] = None,
+               num_beams: Optional[int] = None,
+               stop: threading.Event = None) -> Iterator[str]:
+        """summarize a single text, yielding pieces of the summary as they are generated
+
+        token streaming requires greedy decoding so num_beams is ignored.
+        generation stops at the next token once stop is set or the iterator is closed
+        """
+        from transformers import TextIteratorStreamer
+
+        kwargs = self.generation_kwargs(min_length, max_length)
+        kwargs.pop('num_beams', None)
+        model = self.summarizer.summarizer.model
+        tokenizer = self.tokenizer
+        prefix = getattr(model.config, 'prefix', None) or ''
+        inputs = tokenizer(prefix + text, truncation=True, return_tensors='pt').to(model.device)
+        streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        stop = threading.Event() if stop is None else stop
+
+        errors = []
+
+        def generate():
+            try:
+                model.generate(**inputs, streamer=streamer, num_beams=1, 
+                               stopping_criteria=stop_on_event(stop), **kwargs)
+            except Exception as e:
+                #unblock the consumer, the error is raised there
+                errors.append(e)
+                streamer.end()
+
+        thread = threading.Thread(target=generate, name='summary-stream', daemon=True)
+        thread.start()
+        try:
+            for piece in streamer:
+                if stop.is_set():
+                    break
+                if piece:
+                    yield piece
+        finally:
+            #also reached when the consumer closes the iterator early
+            stop.set()
+            thread.join()
+        if errors:
+            raise errors[0]
+
+    def run(self,
+            documents: List[Document],
+            min_length: Optional[int] = None,
+            max_length: Optional[int] = None,
+            num_beams: Optional[int] = None) -> Tuple[Dict, str]:
+        if not documents:
+            raise AttributeError('Summarizer needs at least one document to produce a summary.')
+        kwargs = self.generation_kwargs(min_length, max_length, num_beams)
+        summaries = self.summarize([doc.content for doc in documents], **kwargs)
+        for doc, summary in zip(documents, summaries):
+            doc.meta['summary'] = summary
+        return {'documents': documents}, 'output_1'
+
+    def run_batch(self,
+                  documents: Union[List[Document], List[List[Document]]],
+                  min_length: Optional[int] = None,
+                  max_length: Optional[int] = None,
+                  num_beams: Optional[int] = None) -> Tuple[Dict, str]:
+        """summarize the documents of all queries together, sorted by length across queries"""
+        if len(documents) > 0 and isinstance(documents[0], Document):
+            return self.run(documents, min_length=min_length, max_length=max_length, num_beams=num_beams)
+        kwargs = self.generation_kwargs(min_length, max_length, num_beams)
+        flat = [doc for docs in documents for doc in docs]
+        summaries = self.summarize([doc.content for doc in flat], **kwargs)
+        for doc, summary in zip(flat, summaries):
+            doc.meta['summary'] = summary
+        return {'documents': documents}, 'output_1'
@@ -1,10 +1,29 @@
 import os
 import sys
+import importlib
 from pathlib import Path
 main_repo_path = str(Path(os.path.abspath(__file__)).parents[1]).replace('\\', '/')
 if main_repo_path not in sys.path:
     sys.path.append(main_repo_path)
 
-from pipelines.search_summarizer import SearchSummarizer
-from pipelines.search_qa import SearchQA
-from pipelines.pipeline_factory import pipeline_factory
\ No newline at end of file
+#exported name -> module defining it, imported by __getattr__ on first use
+_exports = {
+    'ModelRegistry': 'pipelines.model_registry',
+    'SearchSummarizer': 'pipelines.search_summarizer',
+    'SearchQA': 'pipelines.search_qa',
+    'pipeline_factory': 'pipelines.pipeline_factory',
+    'QueryBatcher': 'pipelines.query_batcher',
+}
+#the shared model registry has the name of its module, so it is not exported here,
+#use from pipelines.model_registry import model_registry
+
+def __getattr__(name: str):
+    """import exported names on first use so importing the package stays cheap"""
+    if name not in _exports:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(_exports[name]), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted({*globals(), *_exports})
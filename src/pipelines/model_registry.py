@@ -0,0 +1,261 @@
+import os
+import sys
+import copy
+import time
+import threading
+import weakref
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from loguru import logger
+from haystack.nodes import DensePassageRetriever, SentenceTransformersRanker, \
+    TransformersSummarizer, FARMReader
+from haystack.document_stores import BaseDocumentStore
+
+main_repo_path = str(Path(os.path.abspath(__file__)).parents[1]).replace('\\', '/')
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from nodes import CachedEmbeddingRetriever, AdaptiveRanker, LengthAwareSummarizer
+from util.vars import EMBEDDING_MODEL, EMBEDDING_MODEL_FORMAT, \
+    MODEL_REGISTRY_MAX_MODELS, MODEL_REGISTRY_MAX_IDLE, RANKER_MODEL, RANKER_FIRST_PASS_MODEL, \
+    SUMMARIZER_MODEL, SUMMARIZER_MIN_LENGTH, SUMMARIZER_MAX_LENGTH
+
+def default_device() -> str:
+    """device models are loaded on when use_gpu is requested"""
+    import torch
+
+    return 'cuda' if torch.cuda.is_available() else 'cpu'
+
+def model_memory(component: Any, max_depth: int = 4) -> int:
+    """approximate memory held by the torch parameters and buffers of a component
+
+    torch modules are searched for in the attributes of the component
+    """
+    import torch
+
+    seen_modules = set()
+    seen_tensors = set()
+    total = 0
+    stack = [(component, 0)]
+    while stack:
+        obj, depth = stack.pop()
+        if isinstance(obj, torch.nn.Module):
+            if id(obj) in seen_modules:
+                continue
+            seen_modules.add(id(obj))
+            for tensor in [*obj.parameters(), *obj.buffers()]:
+                if id(tensor) not in seen_tensors:
+                    seen_tensors.add(id(tensor))
+                    total += tensor.numel() * tensor.element_size()
+            continue
+        if depth >= max_depth or isinstance(obj, (str, bytes, int, float, BaseDocumentStore)):
+            continue
+        if isinstance(obj, (list, tuple)):
+            children = obj
+        elif hasattr(obj, '__dict__'):
+            children = vars(obj).values()
+        else:
+            continue
+        stack.extend((child, depth + 1) for child in children)
+    return total
+
+
+class ModelRegistry:
+    """process-wide registry of loaded models shared across pipelines
+
+    each (kind, model name, device) is loaded once. every caller receives its own
+    shallow copy of the loaded component, so the model weights are shared while 
+    attributes such as the document store can differ per pipeline.
+    a model is in use while any copy is alive and is never evicted then. 
+    unused models are evicted once idle for max_idle seconds, and least recently 
+    used first once more than max_models are loaded.
+    """
+
+    def __init__(self, 
+                 max_models: int = MODEL_REGISTRY_MAX_MODELS,
+                 max_idle: float = MODEL_REGISTRY_MAX_IDLE) -> None:
+        """constructor
+
+        parameters:
+            max_models: maximum number of models held, None for no limit. 
+                models in use are kept even when the limit is exceeded
+            max_idle: seconds after which an unused model is evicted, None to keep unused models
+        """
+        self.max_models = max_models
+        self.max_idle = max_idle
+        self._models = {}
+        self._lock = threading.RLock()
+
+    def get(self, 
+            kind: str, 
+            model_name: str, 
+            loader: Callable[[], Any], 
+            device: str = None,
+            **attributes) -> Any:
+        """return a copy of the shared model, loading it with loader on first use
+
+        parameters:
+            kind: type of component, e.g. ranker or summarizer
+            model_name: name or path of the model
+            loader: function creating the component
+            device: device the model runs on, defaults to default_device()
+            attributes: attributes set on the returned copy, e.g. document_store
+        """
+        key = (kind, model_name, device or default_device())
+        with self._lock:
+            self.evict_idle()
+            entry = self._models.get(key)
+            if entry is None:
+                logger.debug(f'loading {kind} model {model_name}')
+                entry = self._add(key, loader())
+            component = copy.copy(entry['component'])
+            for name, value in attributes.items():
+                setattr(component, name, value)
+            entry['users'] += 1
+            entry['last_used'] = time.time()
+            weakref.finalize(component, self._released, key, entry)
+            return component
+
+    def _released(self, key: Tuple, entry: Dict) -> None:
+        """a copy handed out by get was garbage collected"""
+        with self._lock:
+            entry['users'] -= 1
+            entry['last_used'] = time.time()
+
+    def register(self, 
+                 kind: str, 
+                 model_name: str, 
+                 component: Any, 
+                 device: str = None) -> None:
+        """add an already created component, e.g. a stub model for testing"""
+        key = (kind, model_name, device or default_device())
+        with self._lock:
+            self._add(key, component)
+
+    def _add(self, key: Tuple, component: Any) -> Dict:
+        now = time.time()
+        entry = {
+            'component': component,
+            'memory': model_memory(component),
+            'loaded': now,
+            'last_used': now,
+            'users': 0,
+        }
+        self._models[key] = entry
+        self._evict_lru()
+        return entry
+
+    def _evict_lru(self) -> None:
+        if self.max_models is None:
+            return
+        unused = sorted((k for k, e in self._models.items() if e['users'] == 0),
+                        key=lambda k: self._models[k]['last_used'])
+        for key in unused[:max(0, len(self._models) - self.max_models)]:
+            logger.debug(f'evicting least recently used model {key}')
+            del self._models[key]
+        if len(self._models) > self.max_models:
+            logger.warning(f'{len(self._models)} models in use, more than max_models={self.max_models}')
+
+    def evict_idle(self, max_idle: float = None) -> List[Tuple]:
+        """evict models that no pipeline uses and that were released more than max_idle seconds ago
+
+        returns: keys of evicted models
+        """
+        max_idle = self.max_idle if max_idle is None else max_idle
+        if max_idle is None:
+            return []
+        now = time.time()
+        with self._lock:
+            idle = [k for k, e in self._models.items() 
+                    if e['users'] == 0 and now - e['last_used'] > max_idle]
+            for key in idle:
+                logger.debug(f'evicting idle model {key}')
+                del self._models[key]
+        return idle
+
+    def clear(self) -> None:
+        """remove all models, copies in use keep working but are no longer shared"""
+        with self._lock:
+            self._models.clear()
+
+    def memory_usage(self) -> int:
+        """total bytes of model parameters held"""
+        with self._lock:
+            return sum(e['memory'] for e in self._models.values())
+
+    def describe(self) -> List[Dict]:
+        """loaded models with memory usage, number of users and idle time"""
+        now = time.time()
+        with self._lock:
+            return [{
+                        'kind': kind,
+                        'model': model_name,
+                        'device': device,
+                        'memory_bytes': e['memory'],
+                        'users': e['users'],
+                        'idle_seconds': 0.0 if e['users'] else now - e['last_used'],
+                    } for (kind, model_name, device), e in self._models.items()]
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+model_registry = ModelRegistry()
+
+def shared_embedding_retriever(document_store: BaseDocumentStore,
+                               embedding_model: str = EMBEDDING_MODEL,
+                               model_format: str = EMBEDDING_MODEL_FORMAT) -> CachedEmbeddingRetriever:
+    """embedding retriever for document_store using the shared embedding model"""
+    return model_registry.get('embedding_retriever', embedding_model,
+                              lambda: CachedEmbeddingRetriever(
+                                        document_store=None,
+                                        embedding_model=embedding_model,
+                                        model_format=model_format,
+                                        use_gpu=True,
+                                    ),
+                              document_store=document_store)
+
+def shared_dense_passage_retriever(document_store: BaseDocumentStore,
+                                   query_embedding_model: str = "facebook/dpr-question_encoder-single-nq-base",
+                                   passage_embedding_model: str = "facebook/dpr-ctx_encoder-single-nq-base") -> DensePassageRetriever:
+    """dense passage retriever for document_store using the shared DPR encoders"""
+    return model_registry.get('dense_passage_retriever', query_embedding_model,
+                              lambda: DensePassageRetriever(
+                                        document_store=None,
+                                        query_embedding_model=query_embedding_model,
+                                        passage_embedding_model=passage_embedding_model,
+                                    ),
+                              document_store=document_store)
+
+def shared_ranker(model_name: str = RANKER_MODEL) -> SentenceTransformersRanker:
+    """shared cross-encoder ranker"""
+    return model_registry.get('ranker', model_name,
+                              lambda: SentenceTransformersRanker(model_name_or_path=model_name))
+
+def adaptive_ranker(model_name: str = RANKER_MODEL,
+                    first_pass_model_name: str = RANKER_FIRST_PASS_MODEL) -> AdaptiveRanker:
+    """adaptive ranker over the shared cross-encoders, without a first pass if first_pass_model_name is None
+
+    the AdaptiveRanker itself is not shared, its timing statistics belong to one pipeline
+    """
+    first_pass_ranker = None if first_pass_model_name is None else shared_ranker(first_pass_model_name)
+    return AdaptiveRanker(shared_ranker(model_name), first_pass_ranker=first_pass_ranker)
+
+def shared_summarizer(model_name: str = SUMMARIZER_MODEL) -> TransformersSummarizer:
+    """shared transformer summarizer"""
+    return model_registry.get('summarizer', model_name,
+                              lambda: TransformersSummarizer(model_name_or_path=model_name, 
+                                                             min_length=SUMMARIZER_MIN_LENGTH, 
+                                                             max_length=SUMMARIZER_MAX_LENGTH,
+                                                             use_gpu=True,
+                                                             ))
+
+def length_aware_summarizer(model_name: str = SUMMARIZER_MODEL) -> LengthAwareSummarizer:
+    """summarizer node over the shared transformer summarizer, 
+    generation settings default to the SUMMARIZER_ variables and can be set per request"""
+    return LengthAwareSummarizer(shared_summarizer(model_name))
+
+def shared_reader(model_name: str = "deepset/roberta-base-squad2") -> FARMReader:
+    """shared extractive QA reader"""
+    return model_registry.get('reader', model_name,
+                              lambda: FARMReader(model_name_or_path=model_name, use_gpu=True))
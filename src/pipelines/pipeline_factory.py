@@ -18,7 +18,8 @@ def pipeline_factory(pipeline_type: str,
                     retriever: str=None,
                     enricher: str=None, 
                     sentence_context_connector: Dict=None,
-                    context_store: Dict=None,):
+                    context_store: Dict=None,
+                    next_document_map: Dict=None,):
     """ factory function to build search pipeline
 
     parameters:
@@ -29,6 +30,7 @@ def pipeline_factory(pipeline_type: str,
         enricher: str, specifies type of RetrievalEnricher to use
         sentence_context_connector: dict, dictionary to convert from the sentence uuid to context uuid/index
         context_store: dict, contains list of all full length context to match with each sentence
+        next_document_map: dict, optional map of document to following document ids used by the enricher
     returns:
         pipeline: SearchSummarizer, SearchQA
     """
@@ -39,12 +41,14 @@ def pipeline_factory(pipeline_type: str,
                     retriever=retriever,
                     enricher=enricher,
                     sentence_context_connector=sentence_context_connector,
-                    context_store=context_store,)
+                    context_store=context_store,
+                    next_document_map=next_document_map,)
     
     elif pipeline_type == 'qa':
         return SearchQA(document_store = document_store, 
                     retriever=retriever,
-                    enricher=enricher, )
+                    enricher=enricher, 
+                    next_document_map=next_document_map,)
     
     else: 
         raise NotImplementedError('pipeline type: {pipeline_type} does not exist')
\ No newline at end of file
@@ -0,0 +1,120 @@
+import json
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Tuple
+
+from loguru import logger
+
+_STOP = object()
+
+class QueryBatcher:
+    """coalesces concurrent queries into batched pipeline runs
+
+    queries submitted from several threads within a short window are collected,
+    up to a maximum batch size, and run together through the pipeline's run_batch
+    so transformer nodes process them in a single forward pass. 
+    callers block until the result of their own query is available.
+    """
+
+    def __init__(self, 
+                 pipeline: Any, 
+                 max_batch_size: int = 4,
+                 max_wait_ms: float = 10) -> None:
+        """constructor
+
+        parameters:
+            pipeline: SearchSummarizer or SearchQA, any object with run and run_batch methods
+            max_batch_size: maximum number of queries run in one batch, 1 disables batching
+            max_wait_ms: time to wait for further queries after the first query of a batch arrives
+        """
+        self.pipeline = pipeline
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._worker = None
+        if max_batch_size > 1:
+            self._worker = threading.Thread(target=self._process_queue, 
+                                            name='query-batcher', 
+                                            daemon=True)
+            self._worker.start()
+
+    def run(self, 
+            query: str, 
+            params: Dict = None) -> Tuple[str, Any]:
+        """run a single query, possibly batched with concurrent queries
+
+        parameters and return value match the wrapped pipeline's run method
+        """
+        future = Future()
+        with self._lock:
+            batching = self._worker is not None and not self._closed
+            if batching:
+                self._queue.put((query, params, future))
+        if not batching:
+            return self.pipeline.run(query, params=params)
+        return future.result()
+
+    def close(self) -> None:
+        """stop the batching thread once queued queries have been processed
+
+        queries submitted after closing run directly on the pipeline
+        """
+        with self._lock:
+            if self._worker is not None and not self._closed:
+                self._queue.put(_STOP)
+            self._closed = True
+
+    def _process_queue(self) -> None:
+        """collect queries into batches until closed"""
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[Tuple[str, Dict, Future]]) -> None:
+        """run a batch of queries, grouped by parameters since nodes share params within a batch"""
+        groups = {}
+        for query, params, future in batch:
+            key = json.dumps(params, sort_keys=True, default=str)
+            groups.setdefault(key, (params, []))[1].append((query, future))
+
+        for params, items in groups.values():
+            queries = [query for query, _ in items]
+            try:
+                if len(items) == 1:
+                    results = [self.pipeline.run(queries[0], params=params)]
+                else:
+                    logger.debug(f'running batch of {len(items)} queries')
+                    pipeline_type, batch_results = self.pipeline.run_batch(queries, params=params)
+                    results = [(pipeline_type, r) for r in batch_results]
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+            if len(results) != len(items):
+                e = RuntimeError(f'pipeline returned {len(results)} results for {len(items)} queries')
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(items, results):
+                future.set_result(result)
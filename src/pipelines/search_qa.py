@@ -1,50 +1,52 @@
 import os
 import sys
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Dict, Tuple, List
 
 from haystack import Pipeline
-from haystack.nodes import BM25Retriever, EmbeddingRetriever, \
-    DensePassageRetriever, TfidfRetriever, \
-     SentenceTransformersRanker, FARMReader
+from haystack.nodes import BM25Retriever, TfidfRetriever
 from haystack.document_stores import BaseDocumentStore
 
 main_repo_path = str(Path(os.path.abspath(__file__)).parents[1]).replace('\\', '/')
 if main_repo_path not in sys.path:
     sys.path.append(main_repo_path)
 
-from nodes import RetrievalEnricher
+from nodes import RetrievalEnricher, HybridRetriever, sparse_retriever
+from pipelines.model_registry import shared_embedding_retriever, shared_dense_passage_retriever, \
+    adaptive_ranker, shared_reader
 
 class SearchQA:
     """pipeline for query-based search, document retrival, and question answering"""
     def __init__(self, 
                  document_store: BaseDocumentStore,  
                  retriever: str = 'Embedding', 
-                 enricher: str = None) -> None:
+                 enricher: str = None,
+                 next_document_map: dict = None) -> None:
         """construtor
         
         parameters:
             document_store: Haystack DocumentStore, document database to search
             retriever: str, specifies type of Haystack Retriever used to search document store
             enricher: str, specifies type of RetrievalEnricher to use
+            next_document_map: dict, optional map of document to following document ids used by the enricher
         """
 
         self.pipeline = None
         self.retriever = None
+        self.ranker = None
         self.document_store = document_store
         self.enricher = enricher
+        self.next_document_map = next_document_map
 
         self.__post_init__(retriever)
 
     
     def __post_init__(self, 
-                      retriever: str, 
-                      update_embedding: str) -> None:
+                      retriever: str) -> None:
         """actions to initialize pipeline object
         
         parameters:
             retriever: str, specifies type of Haystack Retriever
-            update_embeddings: bool, indicating whether to updated document store embeddings
         """
 
         if retriever == 'BM25':
@@ -54,29 +56,25 @@ class SearchQA:
            self.retriever = TfidfRetriever(document_store=self.document_store)
 
         elif retriever == 'Embedding':
-            self.retriever = EmbeddingRetriever(
-                document_store=self.document_store,
-                embedding_model="sentence-transformers/multi-qa-mpnet-base-dot-v1",
-                model_format="sentence_transformers",
-                use_gpu=True,
-            )
+            self.retriever = shared_embedding_retriever(self.document_store)
 
         elif retriever == 'DensePassage': 
-            self.retriever = DensePassageRetriever(
-                document_store=self.document_store,
-                query_embedding_model="facebook/dpr-question_encoder-single-nq-base",
-                passage_embedding_model="facebook/dpr-ctx_encoder-single-nq-base"
-            )
+            self.retriever = shared_dense_passage_retriever(self.document_store)
+
+        elif retriever == 'Hybrid':
+            self.retriever = HybridRetriever(sparse_retriever(self.document_store),
+                                             shared_embedding_retriever(self.document_store))
         else:
             raise NotImplementedError(f'retriever type {retriever} has not been implemented')
 
-        ranker = SentenceTransformersRanker(model_name_or_path="cross-encoder/ms-marco-MiniLM-L-12-v2")
-        enricher = RetrievalEnricher(self.document_store, mode =self.enricher)
-        reader = FARMReader(model_name_or_path="deepset/roberta-base-squad2", use_gpu=True)
+        self.ranker = adaptive_ranker()
+        enricher = RetrievalEnricher(self.document_store, mode =self.enricher,
+                                     next_document_map=self.next_document_map)
+        reader = shared_reader("deepset/roberta-base-squad2")
 
         self.pipeline = Pipeline()
         self.pipeline.add_node(component=self.retriever, name='Retriever', inputs=['Query'])
-        self.pipeline.add_node(component=ranker, name='Ranker', inputs=['Retriever'])
+        self.pipeline.add_node(component=self.ranker, name='Ranker', inputs=['Retriever'])
         self.pipeline.add_node(component=enricher, name='Enricher', inputs=['Ranker'])
         self.pipeline.add_node(component=reader, name='Reader', inputs=['Enricher'])
         
@@ -99,6 +97,36 @@ class SearchQA:
 
         result = self.pipeline.run(query=query, params = params)
         return 'qa', result
+
+    def run_batch(self, 
+                  queries: List[str], 
+                  params: Dict =None) -> Tuple[str, List[Dict]]:
+        """run pipeline on a batch of queries sharing the same parameters
+        
+        parameters: 
+            queries: list of str, text queries used to search DocumentStore
+            params: dict, parameters to be passed to pipeline nodes
+        return:
+            tuple of pipeline type and list of results, one per query, as returned by run
+        """
+        if params is None:
+            params={
+                "Retriever": {"top_k": 10},
+                "Ranker": {"top_k": 5}
+            }
+
+        result = self.pipeline.run_batch(queries=queries, params = params)
+        results = []
+        for i, query in enumerate(queries):
+            results.append({
+                'query': query,
+                'answers': result['answers'][i],
+                'documents': result['documents'][i],
+                'root_node': result.get('root_node'),
+                'params': result.get('params'),
+                'node_id': result.get('node_id'),
+            })
+        return 'qa', results
     
     def prepare_response(self, result):
         return {'result': result}
\ No newline at end of file
@@ -1,14 +1,13 @@
 import os
 import sys
+import threading
 from pathlib import Path
 from typing import Dict, Tuple, List
 
-from typing import Dict, List, Optional, Tuple, Union, Any
+from typing import Dict, List, Optional, Tuple, Union, Any, Mapping, Sequence, Iterator
 
 from haystack import Pipeline
-from haystack.nodes import BM25Retriever, EmbeddingRetriever, \
-    TfidfRetriever, SentenceTransformersRanker,\
-    TransformersSummarizer, DocumentMerger, JoinDocuments
+from haystack.nodes import BM25Retriever, TfidfRetriever, DocumentMerger, JoinDocuments
 
 from haystack.nodes import  PromptNode, PromptTemplate, PromptModel
 from haystack.nodes.prompt.shapers import AnswerParser
@@ -19,9 +18,9 @@ main_repo_path = str(Path(os.path.abspath(__file__)).parents[1]).replace('\\', '
 if main_repo_path not in sys.path:
     sys.path.append(main_repo_path)
 
-from nodes import RetrievalEnricher, PromptNodeWrapped
+from nodes import RetrievalEnricher, HybridRetriever, sparse_retriever, PassageSelector, PromptNodeWrapped
+from pipelines.model_registry import shared_embedding_retriever, adaptive_ranker, length_aware_summarizer
 from util import connect_to_docstore
-from util.vars import EMBEDDING_MODEL, EMBEDDING_MODEL_FORMAT
 
 
 class SearchSummarizer:
@@ -32,8 +31,9 @@ class SearchSummarizer:
                  retriever: str = 'Embedding', 
                  summarizer: str = 'local',
                  enricher: str = None,
-                 sentence_context_connector: dict = None,
-                 context_store: list = None,
+                 sentence_context_connector: Mapping = None,
+                 context_store: Sequence = None,
+                 next_document_map: dict = None,
                  ) -> None:
         """construtor
         
@@ -41,16 +41,21 @@ class SearchSummarizer:
             document_store: Haystack DocumentStore, document database to search
             retriever: str, specifies type of Haystack Retriever used to search document store
             enricher: str, specifies type of RetrievalEnricher to use
-            sentence_context_connector: dict, dictionary to convert from the sentence uuid to context uuid/index
-            context_store: list, contains list of all full length context to match with each sentence
+            sentence_context_connector: dict or ContextStore.fragment_to_context, converts from the sentence uuid to context uuid/index
+            context_store: dict or ContextStore.contexts, contains all full length context to match with each sentence
+            next_document_map: dict, optional map of document to following document ids used by the enricher
         """
 
         self.pipeline = None
         self.retriever = None
+        self.ranker = None
         self.document_store = document_store
         self.enricher = enricher
         self.sentence_context_connector = sentence_context_connector
         self.context_store = context_store
+        self.next_document_map = next_document_map
+        self.supports_batch = summarizer == 'local'
+        self.supports_streaming = summarizer == 'local'
 
         self.__post_init__(summarizer, retriever)
 
@@ -73,27 +78,29 @@ class SearchSummarizer:
 
         elif retriever == 'Embedding':
             print('setting up embedding retriever')
-            self.retriever = EmbeddingRetriever(
-                document_store=self.document_store,
-                embedding_model=EMBEDDING_MODEL,
-                model_format=EMBEDDING_MODEL_FORMAT,
-                use_gpu=True,
-            )
+            self.retriever = shared_embedding_retriever(self.document_store)
+
+        elif retriever == 'Hybrid':
+            print('setting up hybrid retriever')
+            self.retriever = HybridRetriever(sparse_retriever(self.document_store),
+                                             shared_embedding_retriever(self.document_store))
         else:
             raise NotImplementedError(f'retriever type {retriever} has not been implemented')
 
         print('setting up sentence transformer ranker')
-        ranker = SentenceTransformersRanker(model_name_or_path="cross-encoder/ms-marco-MiniLM-L-12-v2")
-        enricher = RetrievalEnricher(self.document_store, mode =self.enricher)
+        self.ranker = adaptive_ranker()
+        enricher = RetrievalEnricher(self.document_store, mode =self.enricher,
+                                     next_document_map=self.next_document_map)
         merger = DocumentMerger()
+        selector = None
+        self.merger = merger
 
         # Use either open source or OpenAI model. For OpenAI, need API KEY placed into .env
         if summarizer == 'local':
             print('setting up sentence transformer summarizer')
-            summarizer_node= TransformersSummarizer(model_name_or_path='t5-large', 
-                                                    min_length=100, max_length=400,
-                                                    use_gpu=True,
-                                                    )
+            summarizer_node = length_aware_summarizer()
+            #the summarizer only sees the most relevant text that fits its input
+            selector = PassageSelector(tokenizer=summarizer_node.tokenizer)
         elif summarizer == 'openai':
             print('setting up openai summarizer')
             try:
@@ -115,11 +122,23 @@ class SearchSummarizer:
 
         self.pipeline = Pipeline()
         self.pipeline.add_node(component=self.retriever, name='Retriever', inputs=['Query'])
-        self.pipeline.add_node(component=ranker, name='Ranker', inputs=['Retriever'])
+        self.pipeline.add_node(component=self.ranker, name='Ranker', inputs=['Retriever'])
         self.pipeline.add_node(component=enricher, name='Enricher', inputs=['Ranker'])
-        self.pipeline.add_node(component=merger, name='Merger', inputs=['Enricher'])
+        if selector is not None:
+            self.pipeline.add_node(component=selector, name='PassageSelector', inputs=['Enricher'])
+            self.pipeline.add_node(component=merger, name='Merger', inputs=['PassageSelector'])
+        else:
+            self.pipeline.add_node(component=merger, name='Merger', inputs=['Enricher'])
         self.pipeline.add_node(component=summarizer_node, name='Summarizer', inputs=['Merger'])
         self.pipeline.add_node(component=JoinDocuments(join_mode="concatenate"), name="JoinResults", inputs=["Summarizer", 'Enricher'])
+        self.selector = selector
+        self.summarizer_node = summarizer_node
+
+        #the same nodes up to the enricher, used to send results before the summary is generated
+        self.retrieval_pipeline = Pipeline()
+        self.retrieval_pipeline.add_node(component=self.retriever, name='Retriever', inputs=['Query'])
+        self.retrieval_pipeline.add_node(component=self.ranker, name='Ranker', inputs=['Retriever'])
+        self.retrieval_pipeline.add_node(component=enricher, name='Enricher', inputs=['Ranker'])
         
     def run(self, 
             query: str, 
@@ -139,19 +158,105 @@ class SearchSummarizer:
                 "Ranker": {"top_k": 5}
             }
         result = self.pipeline.run(query=query, params = params)
-        summary = result['documents'][-1].meta['summary']
-        relevant_docs = result['documents'][:-1]
+        results = self.split_result(result['documents'])
+        return 'summarizer', results
 
-        for doc in relevant_docs:
-            doc.meta['extended_content'] = self.context_store[self.sentence_context_connector[doc.meta['uuid']]]
+    def run_batch(self, 
+                  queries: List[str], 
+                  params: Dict =None) -> Tuple[str, List[Tuple[str, List[Document]]]]:
+        """run pipeline on a batch of queries sharing the same parameters
+
+        transformer nodes process the whole batch in each forward pass.
+        the openai summarizer has no batch path so queries are run one at a time
+        parameters: 
+            queries: list of str, text queries used to search DocumentStore
+            params: dict, parameters to be passed to pipeline nodes
+        return:
+            tuple of pipeline type and list of results, one per query, as returned by run
+        """
+        if not self.supports_batch:
+            return 'summarizer', [self.run(query, params=params)[1] for query in queries]
 
-        results = (summary, relevant_docs)
+        if params is None:
+            params={
+                "Retriever": {"top_k": 10},
+                "Ranker": {"top_k": 5}
+            }
+        result = self.pipeline.run_batch(queries=queries, params = params)
+        results = [self.split_result(documents) for documents in result['documents']]
         return 'summarizer', results
+
+    def retrieve(self, 
+                 query: str, 
+                 params: Dict = None) -> List[Document]:
+        """retrieve, rank and enrich documents without summarizing them
+
+        parameters: 
+            query: str, text query used to search DocumentStore
+            params: dict, parameters to be passed to pipeline nodes, 
+                parameters of the summarization nodes are ignored
+        return: relevant documents with their extended context
+        """
+        if params is None:
+            params={
+                "Retriever": {"top_k": 10},
+                "Ranker": {"top_k": 5}
+            }
+        params = {node: node_params for node, node_params in params.items() 
+                  if self.retrieval_pipeline.get_node(node) is not None}
+        result = self.retrieval_pipeline.run(query=query, params=params)
+        return self.add_extended_content(result['documents'])
+
+    def stream_summary(self, 
+                       query: str, 
+                       documents: List[Document], 
+                       params: Dict = None,
+                       stop: threading.Event = None) -> Iterator[str]:
+        """summarize documents returned by retrieve, yielding the summary text as it is generated
+
+        the local summarizer streams tokens with greedy decoding,
+        the openai summarizer yields the whole summary at once
+        parameters: 
+            query: str, text query the documents were retrieved for
+            documents: relevant documents returned by retrieve
+            params: dict, parameters to be passed to pipeline nodes
+            stop: optional event, local generation stops once it is set
+        """
+        params = params or {}
+        if self.selector is not None:
+            documents = self.selector.select(documents, **params.get('PassageSelector', {}))
+        merged, _ = self.merger.run(documents=documents)
+        if self.supports_streaming:
+            yield from self.summarizer_node.stream(merged['documents'][0].content, 
+                                                   stop=stop,
+                                                   **params.get('Summarizer', {}))
+        else:
+            result, _ = self.summarizer_node.run(query=query, documents=merged['documents'])
+            yield result['answers'][0].answer
+
+    def add_extended_content(self, 
+                             documents: List[Document]) -> List[Document]:
+        """attach the extended context to each relevant document"""
+        for doc in documents:
+            doc.meta['extended_content'] = self.context_store[self.sentence_context_connector[doc.meta['uuid']]]
+        return documents
+
+    def split_result(self, 
+                     documents: List[Document]) -> Tuple[str, List[Document]]:
+        """separate the summary from the relevant documents of a single query
+        and attach the extended context to each relevant document"""
+        summary = documents[-1].meta['summary']
+        relevant_docs = self.add_extended_content(documents[:-1])
+
+        return summary, relevant_docs
     
     def prepare_response(self, result):
-        relevant_doc_data = []
-
         summary, relevant_docs = result
+        return {'summary': summary, 'relevant_docs': self.prepare_documents(relevant_docs)}
+
+    def prepare_documents(self, relevant_docs: List[Document]) -> List[Dict]:
+        """json serializable relevant documents"""
+        relevant_doc_data = []
         for doc in relevant_docs:
             temp = {
                     'meta': doc.meta,
@@ -159,5 +264,4 @@ class SearchSummarizer:
                     'content': doc.content
                     }
             relevant_doc_data.append(temp)
-
-        return {'summary': summary, 'relevant_docs': relevant_doc_data}
+        return relevant_doc_data
@@ -1,10 +1,30 @@
 import os
 import sys
+import importlib
 from pathlib import Path
 
 main_repo_path = str(Path(os.path.abspath(__file__)).parents[1]).replace('\\', '/')
 if main_repo_path not in sys.path:
     sys.path.append(main_repo_path)
 
-from util.util_funcs import connect_to_docstore, retriever_to_index
-from util.vars import CONTEXT, FRAGMENT_TO_CONTEXT
\ No newline at end of file
+#exported name -> module defining it, imported by __getattr__ on first use
+_exports = {
+    'connect_to_docstore': 'util.util_funcs',
+    'retriever_to_index': 'util.util_funcs',
+    'TTLCache': 'util.cache',
+    'BoundedExecutor': 'util.concurrency',
+    'QueueFullError': 'util.concurrency',
+    'CONTEXT': 'util.vars',
+    'FRAGMENT_TO_CONTEXT': 'util.vars',
+}
+
+def __getattr__(name: str):
+    """import exported names on first use so importing the package stays cheap"""
+    if name not in _exports:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(_exports[name]), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted({*globals(), *_exports})
@@ -0,0 +1,138 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+_MISSING = object()
+
+class TTLCache:
+    """thread-safe bounded LRU cache with optional time-to-live
+
+    entries are evicted least recently used first once maxsize is reached
+    and are treated as missing once older than ttl seconds.
+    hit and miss counters are kept for monitoring cache effectiveness.
+    """
+
+    def __init__(self, 
+                 maxsize: int = 1024, 
+                 ttl: Optional[float] = None,
+                 timer: Callable[[], float] = time.monotonic,
+                 on_evict: Optional[Callable[[Hashable, Any], None]] = None) -> None:
+        """constructor
+
+        parameters:
+            maxsize: maximum number of entries held
+            ttl: seconds an entry stays valid, None keeps entries until evicted
+            timer: clock used for expiry, replaceable for testing
+            on_evict: called with key and value of entries dropped by eviction, 
+                expiry, invalidate or clear, e.g. to release resources held by the value
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """return cached value for key, default if missing or expired"""
+        expired = []
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING:
+                value, expires = item
+                if expires is None or expires > self.timer():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                expired.append((key, value))
+            self.misses += 1
+        self._evicted(expired)
+        return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """add or replace an entry, evicting the least recently used entry if full"""
+        if self.maxsize <= 0:
+            return
+        expires = None if self.ttl is None else self.timer() + self.ttl
+        evicted = []
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                old_key, (old_value, _) = self._data.popitem(last=False)
+                evicted.append((old_key, old_value))
+                self.evictions += 1
+        self._evicted(evicted)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """remove an entry and return its value"""
+        with self._lock:
+            item = self._data.pop(key, _MISSING)
+        return default if item is _MISSING else item[0]
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """remove all entries whose key satisfies predicate
+
+        returns: number of entries removed
+        """
+        with self._lock:
+            removed = [(k, v[0]) for k, v in self._data.items() if predicate(k)]
+            for k, _ in removed:
+                del self._data[k]
+        self._evicted(removed)
+        return len(removed)
+
+    def clear(self) -> None:
+        """remove all entries"""
+        with self._lock:
+            removed = [(k, v[0]) for k, v in self._data.items()]
+            self._data.clear()
+        self._evicted(removed)
+
+    def _evicted(self, items) -> None:
+        """run the eviction callback outside the lock"""
+        if self.on_evict is None:
+            return
+        for key, value in items:
+            self.on_evict(key, value)
+
+    def keys(self) -> list:
+        """keys currently held, least recently used first"""
+        with self._lock:
+            return list(self._data)
+
+    def items(self) -> list:
+        """(key, value) pairs currently held, least recently used first, 
+        does not update recency or hit/miss counters"""
+        with self._lock:
+            return [(key, value) for key, (value, _) in self._data.items()]
+
+    def stats(self) -> Dict:
+        """hit/miss counters and occupancy of the cache"""
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / requests if requests else 0.0,
+                'evictions': self.evictions,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """membership test, does not update recency or hit/miss counters"""
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+        if item is _MISSING:
+            return False
+        expires = item[1]
+        return expires is None or expires > self.timer()
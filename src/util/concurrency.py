@@ -0,0 +1,83 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+class QueueFullError(RuntimeError):
+    """raised when a BoundedExecutor cannot accept more work"""
+
+
+class BoundedExecutor:
+    """runs blocking calls off the asyncio event loop with bounded concurrency
+
+    at most max_workers calls run at once and at most max_queue further calls
+    wait for a worker. calls beyond that are rejected with QueueFullError
+    so load is shed instead of building an unbounded backlog.
+    """
+
+    def __init__(self, 
+                 max_workers: int = 4, 
+                 max_queue: int = 16,
+                 name: str = 'bounded') -> None:
+        """constructor
+
+        parameters:
+            max_workers: number of calls executed concurrently
+            max_queue: number of calls allowed to wait for a free worker
+            name: prefix for worker thread names
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, 
+                                           thread_name_prefix=name)
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """start fn(*args, **kwargs) in a worker thread
+
+        the call holds its slot until it finishes or is cancelled before it starts,
+        not until its caller stops waiting, so abandoned calls still count against the limit
+        raises: QueueFullError if running and waiting calls are at capacity
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                raise QueueFullError(f'{self._pending} calls running or queued, '
+                                     f'limit is {self.max_workers + self.max_queue}')
+            self._pending += 1
+        try:
+            future = self.executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future: Future = None) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """run fn(*args, **kwargs) in a worker thread and await the result
+
+        cancelling the awaiting task cancels the call if it has not started yet
+        raises: QueueFullError if running and waiting calls are at capacity
+        """
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> Dict:
+        """number of calls in progress and configured limits"""
+        with self._lock:
+            pending = self._pending
+        return {
+            'pending': pending,
+            'running': min(pending, self.max_workers),
+            'queued': max(pending - self.max_workers, 0),
+            'max_workers': self.max_workers,
+            'max_queue': self.max_queue,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """stop worker threads"""
+        self.executor.shutdown(wait=wait)
@@ -0,0 +1,228 @@
+import os
+import time
+import threading
+import functools
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Sequence
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """q-th percentile of values, linearly interpolated between the closest ranks
+
+    parameters:
+        values: samples, need not be sorted
+        q: percentile between 0 and 100
+    """
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class LatencyRecorder:
+    """thread-safe collection of latency samples by name, e.g. by pipeline node
+
+    samples are kept so exact percentiles can be reported,
+    intended for benchmark runs rather than long running servers
+    """
+
+    def __init__(self) -> None:
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float) -> None:
+        """add a latency sample in seconds"""
+        with self._lock:
+            self._samples.setdefault(name, []).append(seconds)
+
+    @contextmanager
+    def time(self, name: str) -> Iterator[None]:
+        """record the duration of the with block, also when it raises"""
+        t_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - t_start)
+
+    def samples(self, name: str) -> List[float]:
+        with self._lock:
+            return list(self._samples.get(name, []))
+
+    def summary(self,
+                percentiles: Sequence[float] = (50, 95, 99)) -> Dict[str, Dict[str, float]]:
+        """count, mean, percentiles in milliseconds and throughput of each name
+
+        throughput is calls per second of time spent in the call,
+        the throughput of a single worker running only that step
+        """
+        with self._lock:
+            samples = {name: list(values) for name, values in self._samples.items()}
+        report = {}
+        for name, values in samples.items():
+            total = sum(values)
+            row = {'count': len(values), 'mean_ms': 1000 * total / len(values)}
+            for q in percentiles:
+                row[f'p{q:g}_ms'] = 1000 * percentile(values, q)
+            row['per_second'] = len(values) / total if total > 0 else float('inf')
+            report[name] = row
+        return report
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+
+def instrument_pipeline(pipeline: Any,
+                        record: Callable[[str, float], None],
+                        methods: Sequence[str] = ('run', 'run_batch')) -> None:
+    """time every node of a haystack Pipeline
+
+    the run methods of each node component are wrapped on the instance,
+    so instrumentation is per pipeline even when node classes are shared.
+    components used by several pipelines, or instrumented more than once,
+    report to every recorder. wrappers keep the signature haystack uses to select node parameters
+    parameters:
+        pipeline: haystack Pipeline
+        record: called with the node name and the seconds each call took,
+            e.g. LatencyRecorder.record
+        methods: component methods timed
+    """
+    for name in pipeline.graph.nodes:
+        component = pipeline.get_node(name)
+        if component is None or name == pipeline.root_node:
+            continue
+        for method in methods:
+            run = getattr(component, method, None)
+            if run is not None:
+                setattr(component, method, _timed(run, name, record))
+
+def instrument_methods(obj: Any,
+                       methods: Sequence[str],
+                       record: Callable[[str, float], None]) -> None:
+    """time calls to methods of an object, e.g. the query methods of a document store
+
+    parameters:
+        obj: object whose methods are wrapped on the instance
+        methods: method names, names the object does not have are skipped
+        record: called with the method name and the seconds each call took
+    """
+    for method in methods:
+        fn = getattr(obj, method, None)
+        if fn is not None:
+            setattr(obj, method, _timed(fn, method, record))
+
+def _timed(fn: Callable, name: str, record: Callable[[str, float], None]) -> Callable:
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        t_start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            record(name, time.perf_counter() - t_start)
+    return wrapper
+
+
+class StageProfiler:
+    """time, count items through and optionally profile the stages of a batch job, e.g. indexing
+
+    a stage may be entered many times, e.g. once per file, its time and items add up.
+    with cprofile each stage has its own profile, written as <stage>.prof to profile_dir.
+    with tracemalloc the peak memory allocated within each stage is reported.
+    stages must not be nested when profiling
+    """
+    PROFILERS = (None, 'cprofile', 'tracemalloc')
+
+    def __init__(self, profile: str = None, profile_dir: str = None, top_functions: int = 10) -> None:
+        """constructor
+
+        parameters:
+            profile: None, cprofile or tracemalloc
+            profile_dir: directory cprofile stats are written to by write_profiles
+            top_functions: number of functions by cumulative time in the summary, with cprofile
+        """
+        if profile not in self.PROFILERS:
+            raise ValueError(f'unknown profiler {profile}, expected one of {self.PROFILERS}')
+        self.profile = profile
+        self.profile_dir = profile_dir
+        self.top_functions = top_functions
+        self.stages = {}
+        self._profiles = {}
+
+    def _stage(self, name: str) -> Dict[str, Any]:
+        return self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'items': 0, 'unit': None})
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """time the with block as part of stage name"""
+        stage = self._stage(name)
+        profiler = None
+        if self.profile == 'cprofile':
+            import cProfile
+            profiler = self._profiles.setdefault(name, cProfile.Profile())
+            profiler.enable()
+        elif self.profile == 'tracemalloc':
+            import tracemalloc
+            #traced only within stages, tracing slows down all allocations
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            memory_start = tracemalloc.get_traced_memory()[0]
+        t_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stage['seconds'] += time.perf_counter() - t_start
+            stage['calls'] += 1
+            if profiler is not None:
+                profiler.disable()
+            elif self.profile == 'tracemalloc':
+                peak = tracemalloc.get_traced_memory()[1] - memory_start
+                stage['peak_bytes'] = max(stage.get('peak_bytes', 0), peak)
+                if started_tracing:
+                    tracemalloc.stop()
+
+    def count(self, name: str, items: int, unit: str = 'items') -> None:
+        """add items processed by a stage, e.g. files parsed"""
+        stage = self._stage(name)
+        stage['items'] += items
+        stage['unit'] = unit
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """seconds, items and items per second of each stage, in the order stages were first entered"""
+        report = {}
+        for name, stage in self.stages.items():
+            row = dict(stage)
+            row['per_second'] = stage['items'] / stage['seconds'] if stage['seconds'] > 0 else float('inf')
+            if name in self._profiles:
+                row['top_functions'] = self.top_function_lines(name)
+            report[name] = row
+        return report
+
+    def top_function_lines(self, name: str) -> List[str]:
+        """functions of a cprofile stage with the highest cumulative time"""
+        import io
+        import pstats
+
+        out = io.StringIO()
+        stats = pstats.Stats(self._profiles[name], stream=out)
+        stats.sort_stats('cumulative').print_stats(self.top_functions)
+        lines = out.getvalue().splitlines()
+        #the function rows follow the column header of the stats table
+        header = next((i for i, line in enumerate(lines) if line.lstrip().startswith('ncalls')), None)
+        return [line for line in lines[header + 1:] if line.strip()] if header is not None else []
+
+    def write_profiles(self) -> List[str]:
+        """write the cprofile stats of each stage to profile_dir, readable with pstats or snakeviz"""
+        if not self._profiles or self.profile_dir is None:
+            return []
+        os.makedirs(self.profile_dir, exist_ok=True)
+        files = []
+        for name, profiler in self._profiles.items():
+            file = os.path.join(self.profile_dir, f'{name}.prof')
+            profiler.dump_stats(file)
+            files.append(file)
+        return files
@@ -6,17 +6,22 @@ from typing import Tuple
 from haystack.document_stores import ElasticsearchDocumentStore,\
              FAISSDocumentStore, SQLDocumentStore, BaseDocumentStore
 
+from util.vars import FAISS_NPROBE, FAISS_EF_SEARCH
+
 retriever_to_index = { 
                         'Embedding' :'doc_embedding',
                         'DensePassage' : 'doc_densepassage',
                         'BM25' : 'doc_embedding',
-                        'TfIdf' :'doc_embedding'
+                        'TfIdf' :'doc_embedding',
+                        'Hybrid' :'doc_embedding',
                     }
 
 def connect_to_docstore(docstore_type: str = None,
                         ds_path: str ='/tmp/data', 
                         retriever: str ='Embedding',
-                        index: str = None) -> BaseDocumentStore:
+                        index: str = None,
+                        nprobe: int = FAISS_NPROBE,
+                        ef_search: int = FAISS_EF_SEARCH) -> BaseDocumentStore:
     """connect to document store
     
     parameters:
@@ -24,6 +29,8 @@ def connect_to_docstore(docstore_type: str = None,
         ds_path = str, path to document store data, when relevant
         retriever = str, type of retriever associated with document store, 
             used to determine index within document store
+        nprobe = int, number of centroids searched by IVF faiss indexes
+        ef_search = int, candidate list size of HNSW faiss indexes
 
     return:
         document_store: Haystack DocumentStore
@@ -49,7 +56,9 @@ def connect_to_docstore(docstore_type: str = None,
             embedding_dim=768
         )
     elif docstore_type == 'faiss':
+        from indexer.faiss_index import set_search_params
         document_store = FAISSDocumentStore.load(index_path = f'{ds_path}/faiss_docstore/faiss_index_doc_{retriever}.bin')
+        set_search_params(document_store.faiss_indexes['document'], nprobe=nprobe, ef_search=ef_search)
     elif docstore_type == 'sql':
         document_store = SQLDocumentStore(f"sqlite:///{ds_path}/sql_docstore/sql_index_doc_{retriever}.db")
     else: 
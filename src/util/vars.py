@@ -1,5 +1,60 @@
 CONTEXT='/tmp/data/context/context_{document}.json'
+CONTEXT_STORE='/tmp/data/context/context_{document}.bin'
 FRAGMENT_TO_CONTEXT='/tmp/data/context/fragment_context_connector_{document}.json'
 ES_INDEX='doc_embedding'
 EMBEDDING_MODEL="sentence-transformers/multi-qa-mpnet-base-dot-v1"
-EMBEDDING_MODEL_FORMAT="sentence_transformers"
\ No newline at end of file
+EMBEDDING_MODEL_FORMAT="sentence_transformers"
+MANIFEST='/tmp/data/context/manifest_{document}.json'
+QUERY_EMBEDDING_CACHE_SIZE=1024
+QUERY_EMBEDDING_CACHE_TTL=3600
+RESULT_CACHE_SIZE=256
+RESULT_CACHE_TTL=3600
+SEARCH_CONCURRENCY=4
+SEARCH_QUEUE_DEPTH=16
+#queries are batched per worker thread so batch sizes above SEARCH_CONCURRENCY are never reached
+QUERY_BATCH_SIZE=4
+QUERY_BATCH_WAIT_MS=10
+NEXT_DOCUMENT='/tmp/data/context/next_document_{document}.json'
+ENRICHER_CACHE_SIZE=4096
+#rank offset of reciprocal rank fusion in hybrid retrieval
+RRF_K=60
+#cross-encoder ranking, see nodes.AdaptiveRanker. margins are in score units of the previous stage
+RANKER_MODEL='cross-encoder/ms-marco-MiniLM-L-12-v2'
+RANKER_FIRST_PASS_MODEL='cross-encoder/ms-marco-MiniLM-L-6-v2'
+RANKER_RERANK_K=6
+RANKER_RETRIEVER_MARGIN=None
+RANKER_FIRST_PASS_MARGIN=None
+RANKER_LATENCY_BUDGET_MS=None
+#local summarizer, see nodes.LengthAwareSummarizer. NUM_BEAMS None uses the model default
+SUMMARIZER_MODEL='t5-large'
+SUMMARIZER_MIN_LENGTH=100
+SUMMARIZER_MAX_LENGTH=400
+SUMMARIZER_NUM_BEAMS=None
+SUMMARIZER_BATCH_SIZE=4
+SUMMARIZER_MAX_INPUT_TOKENS=512
+INDEX_JOB_WORKERS=2
+MODEL_REGISTRY_MAX_MODELS=8
+MODEL_REGISTRY_MAX_IDLE=None
+EMBEDDING_BATCH_SIZE=32
+#fp32, fp16 (gpu), int8 (cpu) or auto, see indexer.embedding.DocumentEmbedder
+EMBEDDING_PRECISION='fp32'
+INDEX_JOB_HISTORY=50
+PIPELINE_CACHE_SIZE=8
+#number of fragments prepared, embedded and written together when building an index
+INDEX_CHUNK_SIZE=1000
+#pdf parser used when building an index: local (pypdf, in the parsing process) or tika (tika server)
+PDF_BACKEND='local'
+#sentence splitter fragments are made with: period splits at every period as indexes always have been,
+#aware does not split abbreviations, decimal numbers and initials
+SENTENCE_SPLITTER='period'
+#faiss index type, see indexer.faiss_index.FAISS_INDEX_TYPES, and its build and query parameters
+FAISS_INDEX_TYPE='Flat'
+FAISS_NLIST=None
+FAISS_PQ_M=64
+FAISS_HNSW_M=32
+FAISS_TRAIN_SIZE=50000
+FAISS_NPROBE=16
+FAISS_EF_SEARCH=64
+#comma separated pipeline types built in the background when doc_app starts, e.g. 'summarization,qa'
+#the WARMUP_PIPELINES environment variable takes precedence
+WARMUP_PIPELINES=''
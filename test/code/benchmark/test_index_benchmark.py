@@ -0,0 +1,45 @@
+import sys
+
+import pytest
+
+main_repo_path = '/usr/src/app'
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from benchmark.corpus import write_html_corpus, write_docx_corpus
+from benchmark.index_benchmark import run_index_benchmark, format_report, STAGES
+from extractor.file_extractor import FileExtractor
+
+
+def test_docx_corpus(tmp_path):
+    files, paragraphs = write_docx_corpus(tmp_path, n_files=2, paragraphs_per_file=3, seed=1)
+    assert len(files) == 2
+
+    #the docx corpus has the text of the html corpus of the same seed
+    _, html_paragraphs = write_html_corpus(tmp_path / 'html', n_files=2, paragraphs_per_file=3, seed=1)
+    assert paragraphs == html_paragraphs
+    file_content, file_type = FileExtractor().parse_file(files[0])
+    assert file_type == 'docx'
+    assert file_content['text'][1:] == paragraphs[:3]
+
+
+@pytest.mark.parametrize('file_type', ['html', 'docx'])
+def test_run_index_benchmark(file_type):
+    report = run_index_benchmark(file_type=file_type, n_files=3, paragraphs_per_file=10)
+
+    assert report['config']['documents'] > 0
+    stages = report['stages']
+    assert list(stages) == list(STAGES)
+    assert stages['parse']['items'] == 3
+    assert stages['paragraphs_to_fragments']['items'] == 30
+    assert stages['write_documents']['items'] == report['config']['documents']
+    assert 'write_documents' in format_report(report)
+
+
+def test_index_benchmark_profile(tmp_path):
+    report = run_index_benchmark(n_files=2, paragraphs_per_file=5, embedder='none',
+                                 profile='cprofile', profile_dir=str(tmp_path))
+
+    assert 'embedding' not in report['stages']
+    assert len(report['profiles']) == len(report['stages'])
+    assert report['stages']['parse']['top_functions']
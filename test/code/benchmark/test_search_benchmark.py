@@ -0,0 +1,48 @@
+import sys
+
+import pytest
+
+main_repo_path = '/usr/src/app'
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from benchmark.corpus import SyntheticText, write_html_corpus, synthetic_queries
+from benchmark.search_benchmark import run_search_benchmark, format_report
+
+
+def test_synthetic_corpus(tmp_path):
+    files, paragraphs = write_html_corpus(tmp_path, n_files=3, paragraphs_per_file=4, seed=1)
+    assert len(files) == 3
+    assert len(paragraphs) == 12
+    assert files[0].read_text().count('<p>') == 4
+
+    #the same seed gives the same corpus and queries
+    _, same_paragraphs = write_html_corpus(tmp_path / 'again', n_files=3, paragraphs_per_file=4, seed=1)
+    assert paragraphs == same_paragraphs
+    assert synthetic_queries(paragraphs, 5) == synthetic_queries(paragraphs, 5)
+
+    query = SyntheticText(0).query(paragraphs[0])
+    assert set(query.split()) <= {w.strip('.').lower() for w in paragraphs[0].split()}
+
+
+@pytest.mark.parametrize('pipeline,retriever', [('summarization', 'Embedding'),
+                                                ('summarization', 'BM25'),
+                                                ('qa', 'TfIdf')])
+def test_run_search_benchmark(pipeline, retriever):
+    report = run_search_benchmark(pipeline=pipeline, retriever=retriever,
+                                  n_files=3, paragraphs_per_file=10, n_queries=4, n_warmup=1)
+
+    assert report['config']['documents'] > 0
+    latency = report['latency']
+    assert latency['total']['count'] == 4
+    for node in ('Retriever', 'Ranker', 'Enricher'):
+        assert latency[node]['count'] == 4
+    if pipeline == 'summarization':
+        assert latency['Merger']['count'] == 4
+        assert latency['Summarizer']['count'] == 4
+    assert 'p99 ms' in format_report(report)
+
+
+def test_unsupported_retriever():
+    with pytest.raises(ValueError):
+        run_search_benchmark(retriever='Embedding', docstore='sqlite')
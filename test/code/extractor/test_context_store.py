@@ -0,0 +1,54 @@
+import os
+import sys
+import json
+
+import pytest
+
+main_repo_path = '/usr/src/app'
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from extractor import ContextStore, convert_json_context
+
+@pytest.fixture
+def context_data():
+    context = {'aaaa': 'some text', 'bbbb': 'différent text', 'cccc': ''}
+    fragment_to_context = {0: 'aaaa', 1: 'aaaa', 2: 'bbbb', 4: 'cccc'}
+    return fragment_to_context, context
+
+
+def test_write_and_read(tmp_path, context_data):
+    fragment_to_context, context = context_data
+    path = tmp_path / 'context.bin'
+    ContextStore.write(path, fragment_to_context, context)
+
+    with ContextStore(path) as store:
+        for uuid, context_id in fragment_to_context.items():
+            assert store.get_context(uuid) == context[context_id]
+            assert store.contexts[store.fragment_to_context[uuid]] == context[context_id]
+        assert store.get_context(3) is None
+        assert store.get_context(100) is None
+        assert 3 not in store.fragment_to_context
+        assert sorted(store.fragment_to_context) == [0, 1, 2, 4]
+        assert len(store.contexts) == 3
+
+
+def test_convert_json_context(tmp_path, context_data):
+    fragment_to_context, context = context_data
+    context_loc = tmp_path / 'context.json'
+    fragment_to_context_loc = tmp_path / 'fragment_context_connector.json'
+    with open(context_loc, 'w') as fp:
+        json.dump(context, fp)
+    with open(fragment_to_context_loc, 'w') as fp:
+        json.dump(fragment_to_context, fp)
+
+    convert_json_context(context_loc, fragment_to_context_loc, tmp_path / 'context.bin')
+    with ContextStore(tmp_path / 'context.bin') as store:
+        assert store.get_context(2) == 'différent text'
+
+
+def test_not_a_context_store(tmp_path):
+    path = tmp_path / 'context.bin'
+    path.write_bytes(b'x' * 64)
+    with pytest.raises(ValueError):
+        ContextStore(path)
@@ -9,7 +9,7 @@ main_repo_path = '/usr/src/app'
 if main_repo_path not in sys.path:
     sys.path.append(main_repo_path)
 
-from extractor import DOCExtractorDefault, Fragment
+from extractor import DOCExtractorDefault, Fragment, SentenceSplitter
 
 data_loc = '/usr/src/test/data'
 
@@ -41,6 +41,19 @@ def test_parse_file_sentence(empty_extractor):
     assert fragments[-1].text == '\nIn attaining these goals, and in its overall operations, the process\nshall ensure the efficient use of public resources.'
 
 
+def test_paragraphs_to_fragments_splitter(empty_extractor):
+    file_content = {'text': ['The offeror shall submit cost data, e.g. labor rates, with the proposal. ',
+                             'See 5 U.S.C. 552 for the rules on disclosure of the data submitted.']}
+    fragments = empty_extractor.paragraphs_to_fragments(file_content, min_char_length=30)
+    assert [f.text for f in fragments] == ['The offeror shall submit cost data, e.',
+                                           'g. labor rates, with the proposal.',
+                                           ' See 5 U.S.C. 552 for the rules on disclosure of the data submitted.']
+
+    extractor = DOCExtractorDefault(dir=None, sentence_splitter=SentenceSplitter())
+    fragments = extractor.paragraphs_to_fragments(file_content, min_char_length=30)
+    assert [f.text for f in fragments] == ['The offeror shall submit cost data, e.g. labor rates, with the proposal.',
+                                           ' See 5 U.S.C. 552 for the rules on disclosure of the data submitted.']
+
 @pytest.mark.parametrize("context_len, expected_context", [
     (2, ['First Sentence.Second Sentence.', 'Third Sentence.Fourth Sentence.']),
     (3, ['First Sentence.Second Sentence.Third Sentence.Fourth Sentence.'])
@@ -164,6 +177,47 @@ def test_fragment_to_context_connector(sample_extractor):
     assert context2 == context_expected[2]
 
 
+def test_load_parallel(sample_extractor):
+    parallel_extractor = DOCExtractorDefault(
+        name='test_doc_parallel',
+        dir=data_loc,
+        context_loc=f'{data_loc}/context/context_parallel.json',
+        fragment_to_context_loc=f'{data_loc}/context/fragment_context_connector_parallel.json',
+        n_workers=2,
+        )
+    sequential_fragments = sample_extractor.get_fragments()
+    parallel_fragments = parallel_extractor.get_fragments()
+
+    assert len(parallel_fragments) == len(sequential_fragments)
+    assert [f.uuid for f in parallel_fragments] == [f.uuid for f in sequential_fragments]
+    assert [f.text for f in parallel_fragments] == [f.text for f in sequential_fragments]
+    assert [f.metadata for f in parallel_fragments] == [f.metadata for f in sequential_fragments]
+    assert parallel_extractor.uuid == sample_extractor.uuid
+
+    os.remove(f'{data_loc}/context/context_parallel.json')
+    os.remove(f'{data_loc}/context/fragment_context_connector_parallel.json')
+
+
+def test_iter_fragments(sample_extractor, tmp_path):
+    streaming_extractor = DOCExtractorDefault(
+        name='test_doc_streaming',
+        dir=None,
+        context_loc=str(tmp_path / 'context.json'),
+        fragment_to_context_loc=str(tmp_path / 'fragment_context_connector.json'),
+        context_store_loc=None,
+        n_workers=2,
+        )
+    file_fragments = list(streaming_extractor.iter_fragments(data_loc))
+
+    #fragments are yielded per file, in file order, without being kept by the extractor
+    assert [file for file, _ in file_fragments] == streaming_extractor.list_files(data_loc)
+    assert streaming_extractor.get_fragments() == []
+    streamed = [f for _, fragments in file_fragments for f in fragments]
+    assert [f.text for f in streamed] == [f.text for f in sample_extractor.get_fragments()]
+    assert [f.uuid for f in streamed] == [f.uuid for f in sample_extractor.get_fragments()]
+    assert (tmp_path / 'context.json').exists()
+
+
 # Remove all files generated
 # datasets required for testing.
 def test_delete_generated_files():
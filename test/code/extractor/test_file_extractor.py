@@ -1,4 +1,5 @@
 import sys
+from pathlib import Path
 
 import pytest
 
@@ -7,6 +8,7 @@ if main_repo_path not in sys.path:
     sys.path.append(main_repo_path)
 
 from extractor import file_extractor
+from extractor.file_extractor import FileExtractor, PDF_BACKENDS
 
 data_loc = '/usr/src/test/data'
 
@@ -47,4 +49,86 @@ def test_docx_get_paragraphs(file_extractor_obj):
 
     r, t = file_extractor_obj.parse_file(f'{data_loc}/demo.docx')
     assert r == expected_result
-    assert t == 'docx'
\ No newline at end of file
+    assert t == 'docx'
+
+def write_pdf(path: Path, pages) -> Path:
+    """write a minimal pdf with a page per list of text lines, without a pdf writing dependency
+
+    an empty line leaves a blank line, the gap between paragraphs
+    """
+    n_pages = len(pages)
+    font = 3 + 2 * n_pages
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>',
+               ('<< /Type /Pages /Kids [%s] /Count %d >>'
+                % (' '.join(f'{3 + 2 * i} 0 R' for i in range(n_pages)), n_pages)).encode()]
+    for i, lines in enumerate(pages):
+        objects.append((f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R '
+                        f'/Resources << /Font << /F1 {font} 0 R >> >> >>').encode())
+        ops = ['BT', '/F1 12 Tf', '14 TL', '72 720 Td']
+        ops += [f'({line}) Tj T*' for line in lines]
+        ops.append('ET')
+        stream = '\n'.join(ops).encode()
+        objects.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+    objects.append(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>')
+
+    pdf = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b'%d 0 obj\n' % number + obj + b'\nendobj\n'
+    xref = len(pdf)
+    pdf += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    pdf += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    pdf += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    path.write_bytes(bytes(pdf))
+    return path
+
+
+def test_pdf_local_get_paragraphs(file_extractor_obj, tmp_path):
+    pdf = write_pdf(tmp_path / 'sample.pdf', [['The contractor shall deliver the supplies.'],
+                                              ['Payment is made on acceptance.']])
+    r, t = file_extractor_obj.parse_file(pdf)
+    assert t == 'pdf'
+    assert [p.strip() for p in r['text']] == ['The contractor shall deliver the supplies.',
+                                              'Payment is made on acceptance.']
+
+
+def test_pdf_local_paragraphs_on_page(file_extractor_obj, tmp_path):
+    pdf = write_pdf(tmp_path / 'sample.pdf', [['The contractor shall deliver the supplies',
+                                               'to the place named in the order.',
+                                               '',
+                                               'Payment is made on acceptance.',
+                                               '',
+                                               'Disputes are resolved by the contracting',
+                                               'officer.'],
+                                              ['Definitions.', '', 'Terms used in this part.']])
+    r, _ = file_extractor_obj.parse_file(pdf)
+    assert r['text'] == ['The contractor shall deliver the supplies to the place named in the order.',
+                         'Payment is made on acceptance.',
+                         'Disputes are resolved by the contracting officer.',
+                         'Definitions.',
+                         'Terms used in this part.']
+
+
+def test_pdf_local_encrypted(file_extractor_obj, tmp_path):
+    from pypdf import PdfReader, PdfWriter
+
+    pdf = write_pdf(tmp_path / 'sample.pdf', [['Payment is made on acceptance.']])
+    for name, user_password in [('open.pdf', ''), ('locked.pdf', 'secret')]:
+        writer = PdfWriter(clone_from=PdfReader(pdf))
+        writer.encrypt(user_password, owner_password='owner', algorithm='RC4-128')
+        with open(tmp_path / name, 'wb') as fp:
+            writer.write(fp)
+    r, _ = file_extractor_obj.parse_file(tmp_path / 'open.pdf')
+    assert r['text'] == ['Payment is made on acceptance.']
+    with pytest.raises(ValueError, match='locked.pdf'):
+        file_extractor_obj.parse_file(tmp_path / 'locked.pdf')
+
+
+def test_pdf_backend():
+    assert FileExtractor().pdf_parser is PDF_BACKENDS['local']
+    assert FileExtractor(pdf_backend='tika').pdf_parser is PDF_BACKENDS['tika']
+    custom = lambda file_path: {'text': []}
+    assert FileExtractor(pdf_parser=custom, pdf_backend='tika').pdf_parser is custom
+    with pytest.raises(ValueError):
+        FileExtractor(pdf_backend='pdfminer')
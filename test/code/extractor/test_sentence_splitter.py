@@ -0,0 +1,68 @@
+import sys
+import random
+
+import pytest
+
+main_repo_path = '/usr/src/app'
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from extractor.sentence_splitter import SentenceSplitter, period_splitter, join_sentences, get_sentence_splitter
+
+
+def concatenated_fragments(paragraphs, min_char_length=60):
+    """fragments as paragraphs_to_fragments made them by concatenating strings"""
+    fragments = []
+    curr_sentence = ''
+    for sentence in ''.join(paragraphs).split('.'):
+        curr_sentence += sentence + '.'
+        if len(curr_sentence) >= min_char_length and ' ' in curr_sentence:
+            fragments.append(curr_sentence)
+            curr_sentence = ''
+    return fragments
+
+
+def test_period_splitter_matches_str_split():
+    rng = random.Random(0)
+    for _ in range(2000):
+        paragraphs = [''.join(rng.choice('ab .\n') for _ in range(rng.randint(0, 12)))
+                      for _ in range(rng.randint(0, 5))]
+        min_char_length = rng.randint(1, 8)
+        assert list(period_splitter.split(paragraphs)) == [s + '.' for s in ''.join(paragraphs).split('.')]
+        assert list(join_sentences(period_splitter.split(paragraphs), min_char_length)) == \
+            concatenated_fragments(paragraphs, min_char_length)
+
+
+def test_plain_prose_fragments_unchanged():
+    paragraphs = ['The contractor shall deliver the supplies. Payment is made on acceptance.',
+                  'Options may be exercised only after a determination of need. ',
+                  'The contracting officer shall notify the contractor in writing.']
+    assert list(join_sentences(SentenceSplitter().split(paragraphs))) == concatenated_fragments(paragraphs)
+
+
+@pytest.mark.parametrize('text,expected', [
+    ('Dr. Smith arrived. He left.', ['Dr. Smith arrived.', ' He left.', '.']),
+    ('It costs 3.5 dollars, e.g. in 2023. Fine.', ['It costs 3.5 dollars, e.g. in 2023.', ' Fine.', '.']),
+    ('See 5 U.S.C. 552 for details. Done.', ['See 5 U.S.C. 552 for details.', ' Done.', '.']),
+    ('Written by J. K. Rowling. So do I. Next', ['Written by J. K. Rowling.', ' So do I.', ' Next.']),
+    ('Items (etc.) follow. End', ['Items (etc.) follow.', ' End.']),
+])
+def test_abbreviation_aware_split(text, expected):
+    assert list(SentenceSplitter().split([text])) == expected
+
+
+def test_split_across_paragraphs():
+    splitter = SentenceSplitter()
+    #a word and its period can end one paragraph, the decision waits for the next one
+    assert list(splitter.split(['Approved by the U.', 'S. government.', 'Next'])) == \
+        ['Approved by the U.S. government.', 'Next.']
+    assert list(splitter.split(['Version 2.', '5 is out.'])) == ['Version 2.5 is out.', '.']
+    assert list(splitter.split(['One ends.', 'Two ends.'])) == ['One ends.', 'Two ends.', '.']
+    assert list(splitter.split(['Ends with etc.'])) == ['Ends with etc.', '.']
+
+
+def test_get_sentence_splitter():
+    assert get_sentence_splitter('period') is period_splitter
+    assert get_sentence_splitter('aware').abbreviations
+    with pytest.raises(ValueError):
+        get_sentence_splitter('nltk')
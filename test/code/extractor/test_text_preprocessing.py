@@ -1,5 +1,7 @@
 import sys
 
+import pytest
+
 main_repo_path = '/usr/src/app'
 if main_repo_path not in sys.path:
     sys.path.append(main_repo_path)
@@ -94,4 +96,36 @@ def test_cleaning_pipeline():
     p1 = paragraphs_cleaned[1]
     p_expected = ['test 1',' test2']
     assert p0 == p_expected[0]
-    assert p1 == p_expected[1]
\ No newline at end of file
+    assert p1 == p_expected[1]
+
+compiled_inputs = [
+    'The  quick\nbrown fox\n\njumps over 12 lazy dogs.',
+    ' ',
+    '',
+    '\n\n',
+    'Ünïcödé ﬁ ligature and 3rd place, 42 items; you and me!',
+    'Numbers 1 22 333 a1 1a end',
+    'Stopword: you the a an',
+    '12 34',
+]
+
+@pytest.mark.parametrize('functions', [
+    ['clean_whitespace'],
+    ['remove_blanklines'],
+    ['unicode_normalize', 'clean_whitespace', 'lower_case', 'remove_blanklines'],
+    ['unicode_normalize', 'clean_whitespace', 'remove_blanklines'],
+    ['remove_stopwords', 'remove_numbers', 'remove_blanklines'],
+    ['lower_case', 'remove_numbers', 'remove_punctuation', 'remove_stopwords', 'remove_blanklines'],
+    ['remove_blanklines', 'remove_numbers', 'remove_stopwords', 'clean_whitespace', 'remove_blanklines'],
+])
+def test_compiled_pipeline_matches(functions):
+    expected = preprocessing_pipeline(compiled_inputs, functions)
+    assert preprocessing_pipeline(compiled_inputs, functions, compiled=True) == expected
+
+
+def test_compiled_pipeline_parallel():
+    functions = ['unicode_normalize', 'clean_whitespace', 'remove_numbers', 'remove_blanklines']
+    text = compiled_inputs * 10
+    expected = preprocessing_pipeline(text, functions)
+    parallel = preprocessing_pipeline(text, functions, compiled=True, n_workers=2, chunk_size=7)
+    assert parallel == expected
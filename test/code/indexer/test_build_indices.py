@@ -0,0 +1,168 @@
+import os
+import sys
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+from haystack.schema import Document
+
+main_repo_path = '/usr/src/app'
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from indexer import IndexJob, IndexManifest
+from indexer.build_indices import build_index, create_document_store, chunk_by_file, delete_stale_documents
+from extractor import Fragment
+from util.vars import CONTEXT, FRAGMENT_TO_CONTEXT, MANIFEST, NEXT_DOCUMENT
+
+test_index = 'test_index_incremental'
+retriever = 'TfIdf'
+
+def write_html(path: Path, topic: str, n_sentences: int = 4) -> None:
+    sentences = [f'This is sentence number {i} of the section about {topic} in the test corpus.' 
+                 for i in range(n_sentences)]
+    path.write_text('<html><body>' + ''.join(f'<p>{s}</p>' for s in sentences) + '</body></html>')
+
+def run_build(data_path: Path, ds_path: Path, incremental: bool = True, chunk_size: int = 1000,
+              **kwargs) -> IndexJob:
+    job = IndexJob(job_id=None, doc_name=test_index)
+    build_index(doc_name=test_index,
+                data_path=str(data_path),
+                ds_path=str(ds_path),
+                retriever=retriever,
+                docstore_type='sql',
+                incremental=incremental,
+                chunk_size=chunk_size,
+                job=job,
+                **kwargs)
+    return job
+
+def documents_by_file(ds_path: Path):
+    document_store = create_document_store(test_index, ds_path, retriever, 'sql')
+    by_file = {}
+    for doc in document_store.get_all_documents():
+        by_file.setdefault(Path(doc.meta['file']).name, []).append(doc)
+    return by_file
+
+@pytest.fixture
+def corpus(tmp_path):
+    data_path = tmp_path / 'data'
+    data_path.mkdir()
+    for topic in ['apples', 'bananas', 'cherries']:
+        write_html(data_path / f'{topic}.html', topic)
+    yield data_path, tmp_path / 'docstore'
+    for path in [CONTEXT, FRAGMENT_TO_CONTEXT, MANIFEST, NEXT_DOCUMENT]:
+        path = Path(path.format(document=test_index))
+        if path.exists():
+            os.remove(path)
+
+
+def test_incremental_build(corpus):
+    data_path, ds_path = corpus
+    #no manifest yet, so the first incremental build indexes every file
+    job = run_build(data_path, ds_path)
+    assert job.files_total == 3
+    before = documents_by_file(ds_path)
+    next_uuid = IndexManifest.load(MANIFEST.format(document=test_index)).next_uuid
+    assert set(before) == {'apples.html', 'bananas.html', 'cherries.html'}
+
+    write_html(data_path / 'bananas.html', 'plantains', n_sentences=5)
+    os.remove(data_path / 'cherries.html')
+    job = run_build(data_path, ds_path)
+    assert job.files_total == 1
+
+    after = documents_by_file(ds_path)
+    assert set(after) == {'apples.html', 'bananas.html'}
+    assert {d.id for d in after['apples.html']} == {d.id for d in before['apples.html']}
+    assert all('plantains' in d.content for d in after['bananas.html'])
+    #uuids of re-indexed files continue from the previous build
+    assert all(d.meta['uuid'] >= next_uuid for d in after['bananas.html'])
+
+    #context of changed and deleted files is pruned, new fragments are added
+    with open(FRAGMENT_TO_CONTEXT.format(document=test_index)) as fp:
+        fragment_to_context = {int(k):v for k,v in json.load(fp).items()}
+    with open(CONTEXT.format(document=test_index)) as fp:
+        context = json.load(fp)
+    indexed_uuids = {d.meta['uuid'] for docs in after.values() for d in docs}
+    assert set(fragment_to_context) == indexed_uuids
+    assert set(context) == set(fragment_to_context.values())
+
+    #links never point across files or at removed fragments
+    for docs in after.values():
+        uuids = {d.meta['uuid'] for d in docs}
+        assert all(d.meta['next'] is None or d.meta['next'] in uuids for d in docs)
+        assert all(d.meta['prev'] is None or d.meta['prev'] in uuids for d in docs)
+
+
+def test_incremental_build_config_mismatch(corpus):
+    data_path, ds_path = corpus
+    run_build(data_path, ds_path)
+    manifest = IndexManifest.load(MANIFEST.format(document=test_index))
+    manifest.config = {'docstore_type': 'faiss', 'retriever': 'Embedding'}
+    manifest.save()
+
+    job = run_build(data_path, ds_path)
+    assert job.files_total == 3
+    manifest = IndexManifest.load(MANIFEST.format(document=test_index))
+    assert manifest.config == {'docstore_type': 'sql', 'retriever': retriever}
+
+
+def test_sentence_splitter_build(corpus):
+    data_path, ds_path = corpus
+    run_build(data_path, ds_path)
+    #changing the splitter changes every fragment, so all files are indexed again
+    job = run_build(data_path, ds_path, sentence_splitter='aware')
+    assert job.files_total == 3
+    manifest = IndexManifest.load(MANIFEST.format(document=test_index))
+    assert manifest.config['sentence_splitter'] == 'aware'
+
+    with pytest.raises(ValueError):
+        run_build(data_path, ds_path, sentence_splitter='nltk')
+
+
+@pytest.mark.parametrize('faiss_index_type', ['Flat', 'HNSW'])
+def test_delete_stale_documents_faiss(tmp_path, faiss_index_type):
+    document_store = create_document_store(test_index, tmp_path, 'Embedding', 'faiss',
+                                           faiss_index_type=faiss_index_type)
+    embeddings = np.eye(768, dtype='float32')[:10]
+    document_store.write_documents([Document(content=f'document {i}', id=str(i), embedding=embeddings[i])
+                                    for i in range(10)])
+    delete_stale_documents(document_store, ['2', '8'], 'faiss')
+
+    assert document_store.get_document_count() == 8
+    assert document_store.get_embedding_count() == 8
+    #documents keep the vector of their own embedding after vectors are moved into freed ids
+    for doc in document_store.get_all_documents(return_embedding=True):
+        np.testing.assert_array_equal(doc.embedding, embeddings[int(doc.id)])
+    assert document_store.query_by_embedding(embeddings[9], top_k=1)[0].id == '9'
+
+
+def test_chunk_by_file():
+    file_fragments = [(Path(f'{i}.html'), [Fragment(text=f'{i}-{j}', uuid=j) for j in range(i)]) 
+                      for i in range(5)]
+    chunks = list(chunk_by_file(file_fragments, chunk_size=3))
+    #files are never split and every file, even without fragments, is in a chunk
+    assert [[f.name for f in files] for files, _ in chunks] == [['0.html', '1.html', '2.html'], 
+                                                                 ['3.html'], ['4.html']]
+    assert [len(fragments) for _, fragments in chunks] == [3, 3, 4]
+
+
+def test_chunked_build(corpus):
+    data_path, ds_path = corpus
+    run_build(data_path, ds_path, incremental=False)
+    full = documents_by_file(ds_path)
+    with open(NEXT_DOCUMENT.format(document=test_index)) as fp:
+        full_next_document_map = json.load(fp)
+
+    job = run_build(data_path, ds_path, incremental=False, chunk_size=1)
+    chunked = documents_by_file(ds_path)
+    with open(NEXT_DOCUMENT.format(document=test_index)) as fp:
+        chunked_next_document_map = json.load(fp)
+
+    assert job.documents_written == sum(len(docs) for docs in chunked.values())
+    assert {f: sorted(d.content for d in docs) for f, docs in chunked.items()} == \
+        {f: sorted(d.content for d in docs) for f, docs in full.items()}
+    assert chunked_next_document_map.keys() == full_next_document_map.keys()
+    manifest = IndexManifest.load(MANIFEST.format(document=test_index))
+    assert len(manifest.files) == 3
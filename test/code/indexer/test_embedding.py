@@ -0,0 +1,53 @@
+import sys
+
+import pytest
+
+main_repo_path = '/usr/src/app'
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from haystack.schema import Document
+
+from indexer import IndexJob
+from indexer.embedding import DocumentEmbedder
+
+
+class LengthRetriever:
+    """stands in for the embedding model, records the batches it encodes"""
+    def __init__(self):
+        self.batches = []
+
+    def embed_documents(self, documents):
+        self.batches.append([doc.content for doc in documents])
+        return [[float(len(doc.content))] for doc in documents]
+
+
+@pytest.fixture
+def embedder():
+    embedder = DocumentEmbedder.__new__(DocumentEmbedder)
+    embedder.batch_size = 2
+    embedder.precision = 'fp32'
+    embedder.device = 'cpu'
+    embedder.sort_by_length = True
+    embedder.retriever = LengthRetriever()
+    embedder.documents_embedded = 0
+    embedder.seconds = 0.0
+    return embedder
+
+
+def test_embed_sorted_batches(embedder):
+    documents = [Document(content='x' * n) for n in [5, 1, 4, 2, 3]]
+    job = IndexJob(job_id=None, doc_name='doc')
+    embedder.embed(documents, job=job)
+
+    #documents of similar length are encoded together, embeddings follow their document
+    assert embedder.retriever.batches == [['x', 'xx'], ['xxx', 'xxxx'], ['xxxxx']]
+    assert [doc.embedding for doc in documents] == [[5.0], [1.0], [4.0], [2.0], [3.0]]
+    assert job.documents_embedded == 5
+    assert embedder.documents_embedded == 5
+    assert job.to_dict()['documents_per_second'] >= 0
+
+
+def test_invalid_precision():
+    with pytest.raises(ValueError):
+        DocumentEmbedder(precision='int4')
@@ -0,0 +1,66 @@
+import sys
+
+import numpy as np
+import pytest
+
+main_repo_path = '/usr/src/app'
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from indexer.faiss_index import faiss_index_factory, create_faiss_index, set_search_params, \
+    recall_latency_report, requires_training, remove_vectors
+
+
+@pytest.fixture
+def embeddings():
+    return np.random.default_rng(0).normal(size=(4000, 32)).astype('float32')
+
+
+def test_faiss_index_factory():
+    assert faiss_index_factory('Flat') == 'Flat'
+    assert faiss_index_factory('HNSW', hnsw_m=16) == 'HNSW16,Flat'
+    assert faiss_index_factory('IVF', nlist=100) == 'IVF100,Flat'
+    #nlist follows the number of training vectors, at least 39 vectors per centroid
+    assert faiss_index_factory('IVFPQ', n_vectors=3900, pq_m=8) == 'IVF100,PQ8'
+    assert requires_training('IVFPQ') and not requires_training('HNSW')
+    with pytest.raises(ValueError):
+        faiss_index_factory('LSH')
+
+
+def test_search_params(embeddings):
+    ivf = create_faiss_index(embeddings, 'IVF')
+    assert ivf.is_trained
+    set_search_params(ivf, nprobe=8, ef_search=None)
+    assert ivf.nprobe == 8
+
+    hnsw = create_faiss_index(embeddings, 'HNSW')
+    set_search_params(hnsw, nprobe=8, ef_search=48)
+    assert hnsw.hnsw.efSearch == 48
+
+
+def test_recall_latency_report(embeddings):
+    queries = embeddings[:20] + 0.1
+    report = recall_latency_report(embeddings, queries, 'IVF', top_k=5, search_values=(1, 1000))
+    assert [row['value'] for row in report] == [None, 1, 1000]
+    assert report[0]['recall'] == 1.0
+    #searching every centroid is exact
+    assert report[-1]['recall'] == 1.0
+    assert report[1]['recall'] <= report[-1]['recall']
+
+
+@pytest.mark.parametrize('index_type', ['Flat', 'IVF', 'HNSW'])
+def test_remove_vectors(embeddings, index_type):
+    vectors = embeddings[:1000]
+    index = create_faiss_index(embeddings, index_type)
+    index.add(vectors)
+    new_index, moved = remove_vectors(index, [3, 500, 998, 999, 2000], batch_size=64)
+    assert new_index.ntotal == 996
+    #the highest ids kept fill the ids freed below ntotal, other vectors keep their id
+    assert moved == {996: 3, 997: 500}
+    set_search_params(new_index, nprobe=1000, ef_search=1000)
+    kept = [0, 4, 499, 501, 995, 996, 997]
+    _, ids = new_index.search(vectors[kept], 1)
+    assert ids[:, 0].tolist() == [moved.get(i, i) for i in kept]
+    _, ids = new_index.search(vectors[[3, 500, 998, 999]], 1)
+    assert not set(ids[:, 0].tolist()) & {998, 999}
+    assert remove_vectors(new_index, []) == (new_index, {})
@@ -57,6 +57,24 @@ def test_enrich_metadata(document_store):
         assert fragments[index].metadata['next'] == expected[index]['next']
 
 
+def test_enrich_metadata_per_file(document_store):
+    indexer = DOCIndexer(document_store)
+    fragments = [
+        Fragment(text='First Sentence.', uuid=5, metadata = {'document':'a.txt'}),
+        Fragment(text='Second Sentence.', uuid=6, metadata = {'document':'a.txt'}),
+        Fragment(text='Third Sentence.', uuid=9, metadata = {'document':'b.txt'}),
+    ] 
+    fragments = indexer.enrich_metadata(fragments = fragments)
+    expected = [
+                {'prev':None,'next':6},
+                {'prev':5,'next':None},
+                {'prev':None,'next':None},
+                ]
+    for fragment, links in zip(fragments, expected):
+        assert fragment.metadata['prev'] == links['prev']
+        assert fragment.metadata['next'] == links['next']
+
+
 def test_paragraphs_to_documents(document_store):
     indexer = DOCIndexer(document_store)
     fragments = [
@@ -0,0 +1,87 @@
+import sys
+import time
+import threading
+
+import pytest
+
+main_repo_path = '/usr/src/app'
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from indexer.jobs import JobManager, JobConflictError
+
+
+def wait_for(job, timeout=5):
+    t_end = time.time() + timeout
+    while job.active and time.time() < t_end:
+        time.sleep(0.01)
+
+
+def test_job_succeeds():
+    manager = JobManager(max_workers=1)
+    done = []
+
+    def work(job, n_files):
+        job.set_phase('extracting')
+        job.files_total = n_files
+        for i in range(n_files):
+            job.file_parsed(f'file_{i}', [1, 2])
+
+    job = manager.submit('doc', work, on_done=done.append, n_files=3)
+    wait_for(job)
+    result = job.to_dict()
+    assert result['status'] == 'succeeded'
+    assert result['files_parsed'] == 3
+    assert result['fragments'] == 6
+    assert result['params'] == {'n_files': 3}
+    assert done == [job]
+    manager.shutdown()
+
+
+def test_job_failure_recorded():
+    manager = JobManager(max_workers=1)
+
+    def work(job):
+        raise ValueError('no data')
+
+    job = manager.submit('doc', work)
+    wait_for(job)
+    assert job.status == 'failed'
+    assert job.error == 'no data'
+    manager.shutdown()
+
+
+def test_cancel_and_conflict():
+    manager = JobManager(max_workers=2)
+    started = threading.Event()
+
+    def work(job):
+        started.set()
+        while True:
+            job.set_phase('extracting')
+            time.sleep(0.01)
+
+    job = manager.submit('doc', work)
+    started.wait(5)
+    with pytest.raises(JobConflictError):
+        manager.submit('doc', work)
+
+    manager.cancel(job.id)
+    wait_for(job)
+    assert job.status == 'cancelled'
+    assert manager.get(job.id) is job
+    manager.shutdown()
+
+
+def test_finished_jobs_pruned():
+    manager = JobManager(max_workers=1, max_finished=2)
+    jobs = []
+    for i in range(4):
+        job = manager.submit(f'doc_{i}', lambda job: None)
+        wait_for(job)
+        jobs.append(job)
+    #pruning happens on submit, the latest job may still be counted as active
+    assert len(manager.jobs) <= 3
+    assert manager.get(jobs[0].id) is None
+    assert manager.get(jobs[-1].id) is jobs[-1]
+    manager.shutdown()
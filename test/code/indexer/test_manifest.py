@@ -0,0 +1,66 @@
+import os
+import sys
+
+import pytest
+
+main_repo_path = '/usr/src/app'
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from indexer import IndexManifest
+
+
+@pytest.fixture
+def document_files(tmp_path):
+    files = []
+    for name, text in [('a.html', '<p>first file.</p>'), ('b.html', '<p>second file.</p>')]:
+        file = tmp_path / name
+        file.write_text(text)
+        files.append(file)
+    return files
+
+
+def test_diff_new_files(tmp_path, document_files):
+    manifest = IndexManifest(tmp_path / 'manifest.json')
+    changed, deleted = manifest.diff(document_files)
+    assert changed == document_files
+    assert deleted == []
+
+
+def test_diff_changed_and_deleted(tmp_path, document_files):
+    manifest = IndexManifest(tmp_path / 'manifest.json')
+    manifest.record_file(document_files[0], (0, 3), ['id0', 'id1', 'id2'])
+    manifest.record_file(document_files[1], (3, 5), ['id3', 'id4'])
+    manifest.files['/removed/c.html'] = {'hash': '', 'mtime': 0, 'uuid_range': [5, 6], 'document_ids': ['id5']}
+
+    document_files[1].write_text('<p>second file, edited.</p>')
+    os.utime(document_files[1], (0, 0))
+    changed, deleted = manifest.diff(document_files)
+    assert changed == [document_files[1]]
+    assert deleted == ['/removed/c.html']
+
+    stale = manifest.stale_records(changed, deleted)
+    assert [i for r in stale for i in r['document_ids']] == ['id3', 'id4', 'id5']
+
+
+def test_diff_touched_file_unchanged(tmp_path, document_files):
+    manifest = IndexManifest(tmp_path / 'manifest.json')
+    manifest.record_file(document_files[0], (0, 1), ['id0'])
+    os.utime(document_files[0], (0, 0))
+    assert manifest.is_unchanged(document_files[0])
+
+
+def test_save_load(tmp_path, document_files):
+    manifest = IndexManifest(tmp_path / 'manifest.json', config={'docstore_type': 'faiss'})
+    manifest.record_file(document_files[0], (0, 2), ['id0', 'id1'])
+    manifest.next_uuid = 2
+    manifest.save()
+
+    loaded = IndexManifest.load(tmp_path / 'manifest.json')
+    assert loaded.files == manifest.files
+    assert loaded.next_uuid == 2
+    assert loaded.config == {'docstore_type': 'faiss'}
+
+    empty = IndexManifest.load(tmp_path / 'missing.json')
+    assert empty.files == {}
+    assert empty.next_uuid == 0
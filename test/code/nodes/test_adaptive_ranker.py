@@ -0,0 +1,78 @@
+import sys
+import time
+
+import pytest
+from haystack.schema import Document
+
+main_repo_path = '/usr/src/app'
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from nodes import AdaptiveRanker
+
+
+class ScoreRanker:
+    """stand-in cross-encoder scoring documents from a fixed table"""
+    def __init__(self, scores, delay=0.0):
+        self.scores = scores
+        self.delay = delay
+        self.calls = []
+
+    def predict(self, query, documents, top_k=None):
+        self.calls.append([doc.id for doc in documents])
+        time.sleep(self.delay * len(documents))
+        for doc in documents:
+            doc.score = self.scores[doc.id]
+        return sorted(documents, key=lambda doc: doc.score, reverse=True)[:top_k]
+
+
+@pytest.fixture
+def documents():
+    return [Document(content=i, id=i, score=s) for i, s in zip('abcdef', [10, 9, 8, 7, 6, 5])]
+
+
+def test_two_stage_ranking(documents):
+    first_pass = ScoreRanker(dict(zip('abcdef', [1, 2, 3, 4, 5, 6])))
+    second_pass = ScoreRanker(dict(zip('abcdef', [6, 5, 4, 3, 1, 2])))
+    ranker = AdaptiveRanker(second_pass, first_pass_ranker=first_pass, top_k=2, rerank_k=3)
+    output, _ = ranker.run(query='query', documents=documents)
+
+    #the second pass only rescores the first pass top 3
+    assert second_pass.calls == [['f', 'e', 'd']]
+    assert [doc.id for doc in output['documents']] == ['d', 'f']
+    assert output['ranker_timings']['second_pass_documents'] == 3
+    assert ranker.stats['queries'] == 1
+
+
+def test_retriever_margin_exit(documents):
+    second_pass = ScoreRanker({})
+    ranker = AdaptiveRanker(second_pass, top_k=3, retriever_margin=0.5)
+    output, _ = ranker.run(query='query', documents=documents)
+
+    assert second_pass.calls == []
+    assert [doc.id for doc in output['documents']] == ['a', 'b', 'c']
+    assert output['ranker_timings']['exit'] == 'retriever'
+
+
+def test_first_pass_margin_exit(documents):
+    first_pass = ScoreRanker(dict(zip('abcdef', [0, 0, 9, 0, 0, 1])))
+    second_pass = ScoreRanker({})
+    ranker = AdaptiveRanker(second_pass, first_pass_ranker=first_pass, top_k=2, first_pass_margin=5)
+    output, _ = ranker.run(query='query', documents=documents)
+
+    assert second_pass.calls == []
+    assert [doc.id for doc in output['documents']] == ['c', 'f']
+    assert ranker.stats['first_pass_exits'] == 1
+
+
+def test_latency_budget(documents):
+    second_pass = ScoreRanker(dict(zip('abcdef', [1, 2, 3, 4, 5, 6])), delay=0.01)
+    ranker = AdaptiveRanker(second_pass, top_k=6)
+    ranker.run(query='query', documents=documents)
+
+    #about 10 ms per document was measured, a 35 ms budget leaves room for 3 documents or fewer
+    output, _ = ranker.run(query='query', documents=documents, latency_budget_ms=35)
+    assert output['ranker_timings']['exit'] == 'budget'
+    assert 2 <= output['ranker_timings']['second_pass_documents'] <= 3
+    assert len(output['documents']) == 6
+    assert ranker.stats['budget_cuts'] == 1
@@ -0,0 +1,34 @@
+import sys
+
+import numpy as np
+from haystack.document_stores import InMemoryDocumentStore
+
+main_repo_path = '/usr/src/app'
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from nodes import CachedEmbeddingRetriever
+from nodes.cached_retriever import normalize_query
+from util.vars import EMBEDDING_MODEL, EMBEDDING_MODEL_FORMAT
+
+
+def test_normalize_query():
+    assert normalize_query('  What is  the\nFAR? ') == 'what is the far?'
+
+
+def test_embed_queries_cached():
+    retriever = CachedEmbeddingRetriever(
+        document_store=InMemoryDocumentStore(embedding_dim=768),
+        embedding_model=EMBEDDING_MODEL,
+        model_format=EMBEDDING_MODEL_FORMAT,
+        use_gpu=False,
+        cache_size=10,
+        )
+    first = retriever.embed_queries(['what is the far?'])
+    second = retriever.embed_queries(['What is the  FAR?', 'what is the far?'])
+
+    assert np.allclose(first[0], second[0])
+    assert np.allclose(second[0], second[1])
+    stats = retriever.query_cache.stats()
+    assert stats['misses'] == 1
+    assert stats['hits'] == 2
@@ -0,0 +1,52 @@
+import sys
+
+import pytest
+from haystack.schema import Document
+
+main_repo_path = '/usr/src/app'
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from nodes import HybridRetriever, reciprocal_rank_fusion
+
+
+class ListRetriever:
+    """stand-in retriever returning fixed rankings"""
+    def __init__(self, ids):
+        self.ids = ids
+        self.batch_calls = 0
+
+    def retrieve(self, query, top_k=10, filters=None):
+        return [Document(content=f'content {i}', id=i) for i in self.ids[:top_k]]
+
+    def retrieve_batch(self, queries, top_k=10, filters=None):
+        self.batch_calls += 1
+        return [self.retrieve(query, top_k=top_k) for query in queries]
+
+
+def test_reciprocal_rank_fusion():
+    sparse = [Document(content=i, id=i) for i in ['a', 'b', 'c']]
+    dense = [Document(content=i, id=i) for i in ['c', 'a', 'd']]
+    fused = reciprocal_rank_fusion([sparse, dense], k=60)
+
+    assert [doc.id for doc in fused] == ['a', 'c', 'b', 'd']
+    assert fused[0].score == pytest.approx(1 / 61 + 1 / 62)
+    assert len(reciprocal_rank_fusion([sparse, dense], top_k=2)) == 2
+
+
+def test_hybrid_retriever_run():
+    retriever = HybridRetriever(ListRetriever(['a', 'b', 'c']), ListRetriever(['b', 'd', 'a']), top_k=3)
+    output, edge = retriever.run(query='query')
+    assert edge == 'output_1'
+    assert [doc.id for doc in output['documents']] == ['b', 'a', 'd']
+
+
+def test_hybrid_retriever_run_batch():
+    sparse = ListRetriever(['a', 'b'])
+    dense = ListRetriever(['b', 'c'])
+    retriever = HybridRetriever(sparse, dense)
+    output, _ = retriever.run_batch(queries=['first', 'second'], top_k=2)
+
+    #each retriever handles the whole batch in one call
+    assert sparse.batch_calls == dense.batch_calls == 1
+    assert [[doc.id for doc in docs] for docs in output['documents']] == [['b', 'a'], ['b', 'a']]
@@ -9,13 +9,39 @@ main_repo_path = '/usr/src/app'
 if main_repo_path not in sys.path:
     sys.path.append(main_repo_path)
 
-from nodes import RetrievalEnricher
+from nodes import RetrievalEnricher, build_next_document_map
 from extractor import DOCExtractorDefault, Fragment
 from indexer import DOCIndexer
 
 test_index = 'test_index_retrieval'
 data_loc = '/usr/src/test/data'
 
+class CountingDocumentStore:
+    """in memory stand-in counting document store round-trips"""
+    def __init__(self, documents):
+        self.documents = documents
+        self.calls = 0
+
+    def get_all_documents(self, filters=None):
+        self.calls += 1
+        uuids = filters['uuid']['$in']
+        return [d for d in self.documents if d.meta['uuid'] in uuids]
+
+    def get_documents_by_id(self, ids):
+        self.calls += 1
+        return [d for d in self.documents if d.id in ids]
+
+@pytest.fixture
+def split_documents():
+    #fragment 0 is split in two, fragments 1 and 2 are single documents
+    metas = [
+        {'uuid': 0, '_split_id': 0, 'next': 1},
+        {'uuid': 0, '_split_id': 1, 'next': 1},
+        {'uuid': 1, '_split_id': 0, 'next': 2},
+        {'uuid': 2, '_split_id': 0, 'next': None},
+    ]
+    return [Document(content=f'document {i}', id=f'id{i}', meta=m) for i, m in enumerate(metas)]
+
 @pytest.fixture
 def document_store():
     container_prefix = os.environ['CONTAINER_PREFIX']
@@ -74,4 +100,67 @@ def test_run(document_store):
     retrieved_doc = result['documents'][0]
     retrieved_id = retrieved_doc.meta['id']
     expected_id = 'FAR_1_102_2__d13e46'
-    assert retrieved_id == expected_id
\ No newline at end of file
+    assert retrieved_id == expected_id
+
+def test_run_batch(document_store):
+    document_store.delete_index(index=test_index)
+    indexer = DOCIndexer(document_store)
+    fragments = [
+        Fragment(text='First Sentence.', uuid=0, metadata = {'document':'test.txt'}),
+        Fragment(text='Second Sentence.', uuid=1, metadata = {'document':'test.txt'}),
+        Fragment(text='Third Sentence.', uuid=2, metadata = {'document':'test.txt'}),
+    ] 
+    indexer.add(fragments)
+    store_docs = document_store.get_all_documents(index=test_index)
+    enricher = RetrievalEnricher(
+        document_store, 
+        mode ='next_document'
+        )
+
+    batch_result, _ = enricher.run_batch([[store_docs[0]], [store_docs[1]]])
+    single_results = [enricher.run([doc])[0]['documents'] for doc in store_docs[:2]]
+
+    assert len(batch_result['documents']) == 2
+    for batch_docs, single_docs in zip(batch_result['documents'], single_results):
+        assert [d.content for d in batch_docs] == [d.content for d in single_docs]
+
+
+def test_build_next_document_map(split_documents):
+    next_document_map = build_next_document_map(split_documents)
+    assert next_document_map == {
+        '0_0': ['id1'],
+        '0_1': ['id2'],
+        '1_0': ['id3'],
+        '2_0': [],
+    }
+
+
+def test_find_next_sections_single_query(split_documents):
+    document_store = CountingDocumentStore(split_documents)
+    enricher = RetrievalEnricher(document_store, mode='next_document')
+    next_sections = enricher.find_next_sections(split_documents)
+
+    assert document_store.calls == 1
+    assert [[d.id for d in docs] for docs in next_sections] == [['id1'], ['id2'], ['id3'], []]
+
+
+def test_find_next_sections_with_map(split_documents):
+    document_store = CountingDocumentStore(split_documents)
+    enricher = RetrievalEnricher(document_store, mode='next_document',
+                                 next_document_map=build_next_document_map(split_documents))
+    next_sections = enricher.find_next_sections([split_documents[0], split_documents[2]])
+    assert [[d.id for d in docs] for docs in next_sections] == [['id1'], ['id3']]
+    assert document_store.calls == 1
+
+    #neighbours are now cached
+    enricher.find_next_sections([split_documents[0], split_documents[2]])
+    assert document_store.calls == 1
+
+
+def test_find_next_sections_map_miss(split_documents):
+    #the last two documents were indexed after the map was built
+    document_store = CountingDocumentStore(split_documents)
+    enricher = RetrievalEnricher(document_store, mode='next_document',
+                                 next_document_map=build_next_document_map(split_documents[:2]))
+    next_sections = enricher.find_next_sections([split_documents[0], split_documents[2]])
+    assert [[d.id for d in docs] for docs in next_sections] == [['id1'], ['id3']]
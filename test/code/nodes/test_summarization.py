@@ -0,0 +1,181 @@
+import sys
+import time
+import queue
+import threading
+
+import pytest
+import transformers
+from haystack.schema import Document
+
+main_repo_path = '/usr/src/app'
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from nodes import PassageSelector, LengthAwareSummarizer
+
+
+class WordTokenizer:
+    def __call__(self, texts, verbose=False):
+        return {'input_ids': [text.split() for text in texts]}
+
+
+class FakePipeline:
+    """stand-in huggingface summarization pipeline recording its calls"""
+    def __init__(self):
+        self.tokenizer = WordTokenizer()
+        self.calls = []
+
+    def __call__(self, texts, **kwargs):
+        self.calls.append((list(texts), kwargs))
+        return [{'summary_text': f'summary of {text}'} for text in texts]
+
+
+class FakeTransformersSummarizer:
+    def __init__(self):
+        self.summarizer = FakePipeline()
+
+
+class FakeInputs(dict):
+    def to(self, device):
+        return self
+
+
+class FakeStreamer:
+    """stand-in TextIteratorStreamer, the fake model puts whole words"""
+    def __init__(self, tokenizer, **kwargs):
+        self.pieces = queue.Queue()
+
+    def put(self, piece):
+        self.pieces.put(piece)
+
+    def end(self):
+        self.pieces.put(None)
+
+    def __iter__(self):
+        while True:
+            piece = self.pieces.get()
+            if piece is None:
+                return
+            yield piece
+
+
+class FakeModel:
+    """stand-in seq2seq model generating the input words back, one at a time"""
+    device = 'cpu'
+
+    def __init__(self, fail=False, delay=0.0):
+        self.config = type('Config', (), {'prefix': 'summarize: '})()
+        self.fail = fail
+        self.calls = []
+        self.stopped = False
+        self.delay = delay
+
+    def generate(self, text, streamer, stopping_criteria, **kwargs):
+        self.calls.append((text, kwargs))
+        if self.fail:
+            raise RuntimeError('out of memory')
+        for word in text.split():
+            if any(criteria(None, None) for criteria in stopping_criteria):
+                self.stopped = True
+                break
+            streamer.put(word + ' ')
+            time.sleep(self.delay)
+        streamer.end()
+
+
+class StreamingTokenizer(WordTokenizer):
+    def __call__(self, texts, verbose=False, **kwargs):
+        if isinstance(texts, str):
+            return FakeInputs(text=texts)
+        return super().__call__(texts, verbose=verbose)
+
+
+def test_passage_selector():
+    documents = [Document(content='one two three', id='a', score=0.1),
+                 Document(content='four five six seven', id='b', score=0.9),
+                 Document(content='eight', id='c', score=0.5)]
+    output, _ = PassageSelector(max_tokens=6).run(documents)
+    selected = output['documents']
+
+    #most relevant first, the last document is cut to the remaining budget
+    assert [doc.id for doc in selected] == ['b', 'c', 'a']
+    assert [doc.content for doc in selected] == ['four five six seven', 'eight', 'one']
+    #search results keep their full content
+    assert documents[0].content == 'one two three'
+
+    output, _ = PassageSelector(max_tokens=6).run(documents, max_tokens=2)
+    assert [doc.content for doc in output['documents']] == ['four five']
+
+
+def test_length_aware_batching():
+    summarizer = LengthAwareSummarizer(FakeTransformersSummarizer(), min_length=5, max_length=50, batch_size=2)
+    documents = [[Document(content='a b c d')], [Document(content='a')], [Document(content='a b')]]
+    output, _ = summarizer.run_batch(documents, max_length=20, num_beams=1)
+
+    calls = summarizer.summarizer.summarizer.calls
+    #shortest inputs are generated together, per request settings override the defaults
+    assert [texts for texts, _ in calls] == [['a', 'a b'], ['a b c d']]
+    assert calls[0][1]['max_length'] == 20
+    assert calls[0][1]['min_length'] == 5
+    assert calls[0][1]['num_beams'] == 1
+    assert calls[0][1]['truncation'] is True
+    assert [docs[0].meta['summary'] for docs in output['documents']] == \
+        ['summary of a b c d', 'summary of a', 'summary of a b']
+
+
+def lengths(kwargs):
+    return kwargs['min_length'], kwargs['max_length']
+
+def test_generation_limits():
+    summarizer = LengthAwareSummarizer(FakeTransformersSummarizer(), min_length=100, max_length=400)
+    with pytest.raises(ValueError):
+        summarizer.run([Document(content='text')], min_length=60, max_length=50)
+
+    #a requested maximum below the default minimum lowers the minimum
+    assert lengths(summarizer.generation_kwargs(max_length=50)) == (50, 50)
+    summarizer.run([Document(content='text')], max_length=50)
+    assert summarizer.summarizer.summarizer.calls[-1][1]['min_length'] == 50
+    #a requested minimum above the default maximum raises the maximum
+    assert lengths(summarizer.generation_kwargs(min_length=500)) == (500, 500)
+    #0 is a value, not unset
+    assert lengths(summarizer.generation_kwargs(min_length=0)) == (0, 400)
+
+
+def streaming_summarizer(monkeypatch, fail=False):
+    monkeypatch.setattr(transformers, 'TextIteratorStreamer', FakeStreamer)
+    summarizer = LengthAwareSummarizer(FakeTransformersSummarizer(), min_length=5, max_length=50, num_beams=4)
+    summarizer.summarizer.summarizer.tokenizer = StreamingTokenizer()
+    summarizer.summarizer.summarizer.model = FakeModel(fail=fail)
+    return summarizer
+
+
+def test_stream(monkeypatch):
+    summarizer = streaming_summarizer(monkeypatch)
+    pieces = list(summarizer.stream('a b c', max_length=20))
+
+    assert pieces == ['summarize: ', 'a ', 'b ', 'c ']
+    text, kwargs = summarizer.summarizer.summarizer.model.calls[0]
+    #the model prefix is added and streaming always decodes greedily
+    assert text == 'summarize: a b c'
+    assert kwargs == {'min_length': 5, 'max_length': 20, 'num_beams': 1}
+
+
+def test_stream_stop(monkeypatch):
+    summarizer = streaming_summarizer(monkeypatch)
+    model = summarizer.summarizer.summarizer.model
+    model.delay = 0.001
+    stream = summarizer.stream(' '.join(['word'] * 1000))
+    assert next(stream) == 'summarize: '
+    #closing the stream early, e.g. when the client disconnects, stops generation
+    stream.close()
+    assert model.stopped
+
+    stop = threading.Event()
+    stop.set()
+    assert list(summarizer.stream('a b c', stop=stop)) == []
+
+
+def test_stream_error(monkeypatch):
+    summarizer = streaming_summarizer(monkeypatch, fail=True)
+    with pytest.raises(RuntimeError):
+        list(summarizer.stream('a b c'))
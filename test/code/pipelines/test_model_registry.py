@@ -0,0 +1,83 @@
+import gc
+import sys
+import time
+
+import pytest
+import torch
+
+main_repo_path = '/usr/src/app'
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from pipelines.model_registry import ModelRegistry, model_memory
+
+
+class StubModel:
+    def __init__(self):
+        self.document_store = None
+        self.model = torch.nn.Linear(10, 10)
+
+
+def test_get_loads_once():
+    registry = ModelRegistry(max_models=None, max_idle=None)
+    calls = []
+    def loader():
+        calls.append(1)
+        return StubModel()
+
+    first = registry.get('ranker', 'stub', loader, device='cpu')
+    second = registry.get('ranker', 'stub', loader, device='cpu')
+    assert first.model is second.model
+    assert len(calls) == 1
+
+    other_device = registry.get('ranker', 'stub', loader, device='cuda')
+    assert other_device.model is not first.model
+    assert len(registry) == 2
+
+
+def test_attributes_set_on_copy():
+    registry = ModelRegistry(max_models=None, max_idle=None)
+    first = registry.get('retriever', 'stub', StubModel, device='cpu', document_store='store_a')
+    second = registry.get('retriever', 'stub', StubModel, device='cpu', document_store='store_b')
+    assert first.document_store == 'store_a'
+    assert second.document_store == 'store_b'
+    assert first.model is second.model
+
+
+def test_memory_usage():
+    registry = ModelRegistry(max_models=None, max_idle=None)
+    registry.register('ranker', 'stub', StubModel(), device='cpu')
+    # 10x10 weights plus 10 biases in float32
+    assert model_memory(StubModel()) == 110 * 4
+    assert registry.memory_usage() == 110 * 4
+    assert registry.describe()[0]['memory_bytes'] == 110 * 4
+
+
+def test_evict_lru_skips_models_in_use():
+    registry = ModelRegistry(max_models=2, max_idle=None)
+    a = registry.get('ranker', 'a', StubModel, device='cpu')
+    b = registry.get('ranker', 'b', StubModel, device='cpu')
+    c = registry.get('ranker', 'c', StubModel, device='cpu')
+    assert len(registry) == 3
+
+    del b
+    gc.collect()
+    registry.get('ranker', 'd', StubModel, device='cpu')
+    models = {m['model'] for m in registry.describe()}
+    assert models == {'a', 'c', 'd'}
+
+
+def test_evict_idle():
+    registry = ModelRegistry(max_models=None, max_idle=None)
+    model = registry.get('ranker', 'a', StubModel, device='cpu')
+    time.sleep(0.02)
+    #in use, never idle
+    assert registry.evict_idle(0.01) == []
+    assert registry.describe()[0]['users'] == 1
+
+    del model
+    gc.collect()
+    assert registry.evict_idle(60) == []
+    time.sleep(0.02)
+    assert registry.evict_idle(0.01) == [('ranker', 'a', 'cpu')]
+    assert len(registry) == 0
@@ -0,0 +1,100 @@
+import sys
+import time
+import threading
+
+import pytest
+
+main_repo_path = '/usr/src/app'
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from pipelines import QueryBatcher
+
+
+class StubPipeline:
+    """records calls, run_batch is slow enough for queries to pile up"""
+    def __init__(self):
+        self.batches = []
+        self.single = []
+
+    def run(self, query, params=None):
+        self.single.append(query)
+        return 'stub', query.upper()
+
+    def run_batch(self, queries, params=None):
+        if 'fail' in queries:
+            raise ValueError('bad query')
+        time.sleep(0.05)
+        self.batches.append(list(queries))
+        return 'stub', [q.upper() for q in queries]
+
+
+def run_concurrently(batcher, queries, params=None):
+    results = {}
+    def worker(query):
+        try:
+            results[query] = batcher.run(query, params=params)
+        except Exception as e:
+            results[query] = e
+    threads = [threading.Thread(target=worker, args=(q,)) for q in queries]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_queries_are_batched():
+    pipeline = StubPipeline()
+    batcher = QueryBatcher(pipeline, max_batch_size=4, max_wait_ms=200)
+    queries = ['a', 'b', 'c', 'd']
+    results = run_concurrently(batcher, queries)
+    batcher.close()
+
+    assert results == {q: ('stub', q.upper()) for q in queries}
+    assert sorted(pipeline.batches[0]) == queries
+
+
+def test_batches_grouped_by_params():
+    pipeline = StubPipeline()
+    batcher = QueryBatcher(pipeline, max_batch_size=4, max_wait_ms=200)
+    params = {'Retriever': {'top_k': 10}}
+    results = run_concurrently(batcher, ['a', 'b'], params=params)
+    results.update(run_concurrently(batcher, ['c'], params={'Retriever': {'top_k': 5}}))
+    batcher.close()
+
+    assert results['c'] == ('stub', 'C')
+    assert all(len(b) <= 2 for b in pipeline.batches)
+
+
+def test_batching_disabled():
+    pipeline = StubPipeline()
+    batcher = QueryBatcher(pipeline, max_batch_size=1)
+    assert batcher.run('a') == ('stub', 'A')
+    assert pipeline.single == ['a']
+    assert pipeline.batches == []
+
+
+def test_batch_exception_propagates():
+    pipeline = StubPipeline()
+    batcher = QueryBatcher(pipeline, max_batch_size=4, max_wait_ms=200)
+    results = run_concurrently(batcher, ['fail', 'other'])
+    batcher.close()
+    assert isinstance(results['fail'], ValueError)
+
+
+def test_run_after_close():
+    pipeline = StubPipeline()
+    batcher = QueryBatcher(pipeline, max_batch_size=4, max_wait_ms=200)
+    batcher.close()
+    assert batcher.run('a') == ('stub', 'A')
+    assert pipeline.single == ['a']
+
+
+def test_short_batch_result_fails_every_query():
+    pipeline = StubPipeline()
+    pipeline.run_batch = lambda queries, params=None: ('stub', [q.upper() for q in queries[:-1]])
+    batcher = QueryBatcher(pipeline, max_batch_size=4, max_wait_ms=200)
+    results = run_concurrently(batcher, ['a', 'b'])
+    batcher.close()
+    assert all(isinstance(r, RuntimeError) for r in results.values())
@@ -113,4 +113,14 @@ def test_prepare_response(summarizer):
     assert expected_prepared_docs[0]['score'] == prepared_responses['relevant_docs'][0]['score']
     assert expected_prepared_docs[1]['score'] == prepared_responses['relevant_docs'][1]['score']
     assert expected_prepared_docs[0]['content'] == prepared_responses['relevant_docs'][0]['content']
-    assert expected_prepared_docs[1]['content'] == prepared_responses['relevant_docs'][1]['content']
\ No newline at end of file
+    assert expected_prepared_docs[1]['content'] == prepared_responses['relevant_docs'][1]['content']
+
+def test_stream_summary(summarizer):
+    query = 'what is the far?'
+    documents = summarizer.retrieve(query)
+    assert len(documents) == 5
+    assert all('extended_content' in doc.meta for doc in documents)
+
+    pieces = list(summarizer.stream_summary(query, documents))
+    assert len(pieces) > 1
+    assert ''.join(pieces).strip() != ''
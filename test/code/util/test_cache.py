@@ -0,0 +1,89 @@
+import sys
+
+main_repo_path = '/usr/src/app'
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from util.cache import TTLCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    assert 'b' not in cache
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_ttl_expiry():
+    timer = FakeTimer()
+    cache = TTLCache(maxsize=10, ttl=5, timer=timer)
+    cache.set('a', 1)
+    timer.now = 4.9
+    assert cache.get('a') == 1
+    timer.now = 5.0
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_hit_miss_counters():
+    cache = TTLCache(maxsize=10)
+    cache.set('a', 1)
+    cache.get('a')
+    cache.get('a')
+    cache.get('b')
+    stats = cache.stats()
+    assert stats['hits'] == 2
+    assert stats['misses'] == 1
+    assert stats['hit_ratio'] == 2 / 3
+    assert stats['size'] == 1
+
+
+def test_invalidate():
+    cache = TTLCache(maxsize=10)
+    cache.set(('doc_a', 1), 1)
+    cache.set(('doc_a', 2), 2)
+    cache.set(('doc_b', 1), 3)
+    removed = cache.invalidate(lambda key: key[0] == 'doc_a')
+    assert removed == 2
+    assert len(cache) == 1
+    assert cache.get(('doc_b', 1)) == 3
+
+
+def test_on_evict():
+    evicted = []
+    cache = TTLCache(maxsize=2, on_evict=lambda key, value: evicted.append((key, value)))
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert evicted == [('b', 2)]
+    cache.invalidate(lambda key: key == 'a')
+    assert evicted == [('b', 2), ('a', 1)]
+    cache.clear()
+    assert evicted == [('b', 2), ('a', 1), ('c', 3)]
+
+
+def test_items():
+    cache = TTLCache(maxsize=3)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+
+    #least recently used first, reading items changes neither recency nor counters
+    assert cache.items() == [('b', 2), ('a', 1)]
+    assert cache.items() == [('b', 2), ('a', 1)]
+    assert cache.stats()['hits'] == 1
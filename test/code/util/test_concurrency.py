@@ -0,0 +1,78 @@
+import sys
+import time
+import asyncio
+import threading
+
+import pytest
+
+main_repo_path = '/usr/src/app'
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from util.concurrency import BoundedExecutor, QueueFullError
+
+
+def test_run_returns_result():
+    executor = BoundedExecutor(max_workers=2, max_queue=2)
+    result = asyncio.run(executor.run(lambda a, b: a + b, 1, b=2))
+    assert result == 3
+    assert executor.stats()['pending'] == 0
+    executor.shutdown()
+
+
+def test_runs_concurrently():
+    executor = BoundedExecutor(max_workers=4, max_queue=0)
+
+    async def main():
+        t_start = time.monotonic()
+        await asyncio.gather(*[executor.run(time.sleep, 0.2) for _ in range(4)])
+        return time.monotonic() - t_start
+
+    elapsed = asyncio.run(main())
+    assert elapsed < 0.6
+    executor.shutdown()
+
+
+def test_queue_full():
+    executor = BoundedExecutor(max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def main():
+        running = asyncio.ensure_future(executor.run(release.wait))
+        queued = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        assert executor.stats()['running'] == 1
+        assert executor.stats()['queued'] == 1
+        with pytest.raises(QueueFullError):
+            await executor.run(release.wait)
+        release.set()
+        await asyncio.gather(running, queued)
+
+    asyncio.run(main())
+    assert executor.stats()['pending'] == 0
+    executor.shutdown()
+
+
+def test_cancelled_call_holds_slot_until_done():
+    executor = BoundedExecutor(max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def main():
+        running = asyncio.ensure_future(executor.run(release.wait))
+        queued = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        #the client of the running call goes away, its worker thread keeps running
+        running.cancel()
+        #the queued call has not started, cancelling it frees its slot
+        queued.cancel()
+        await asyncio.sleep(0.05)
+        assert executor.stats()['pending'] == 1
+        executor.submit(release.wait)
+        with pytest.raises(QueueFullError):
+            executor.submit(release.wait)
+        release.set()
+        await asyncio.sleep(0.05)
+
+    asyncio.run(main())
+    assert executor.stats()['pending'] == 0
+    executor.shutdown()
@@ -0,0 +1,31 @@
+import sys
+import json
+import subprocess
+
+main_repo_path = '/usr/src/app'
+
+#modules that must not be loaded until a pipeline, index or document listing needs them
+heavy_modules = ('haystack', 'torch', 'transformers', 'nltk', 'elasticsearch')
+
+
+def imported_modules(statement: str) -> list:
+    """top level modules loaded by statement, run in a fresh interpreter"""
+    code = (f'import sys; sys.path.append({main_repo_path!r}); {statement}; '
+            'import json; print(json.dumps(sorted({m.split(".")[0] for m in sys.modules})))')
+    output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True,
+                            cwd=main_repo_path)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def test_packages_import_lazily():
+    modules = imported_modules('import extractor, indexer, nodes, pipelines, util')
+    assert not set(heavy_modules) & set(modules)
+
+
+def test_exports_import_on_use():
+    modules = imported_modules('from extractor import ContextStore; from util import TTLCache; '
+                               'import extractor.text_preprocessing')
+    assert not set(heavy_modules) & set(modules)
+
+    modules = imported_modules('from nodes import PassageSelector')
+    assert 'haystack' in modules
@@ -0,0 +1,79 @@
+import sys
+
+import pytest
+
+main_repo_path = '/usr/src/app'
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from util.metrics import MetricsRegistry, Counter, Gauge
+
+
+def test_counter_and_gauge_render():
+    registry = MetricsRegistry()
+    requests = registry.counter('docapp_requests_total', 'requests', ['route'])
+    in_progress = registry.gauge('docapp_in_progress', 'in progress')
+    requests.inc(route='/search/{pipeline}')
+    requests.inc(2, route='/search/{pipeline}')
+    with in_progress.track_inprogress():
+        assert 'docapp_in_progress 1.0' in registry.render()
+
+    lines = registry.render().splitlines()
+    assert '# HELP docapp_requests_total requests' in lines
+    assert '# TYPE docapp_requests_total counter' in lines
+    assert 'docapp_requests_total{route="/search/{pipeline}"} 3.0' in lines
+    assert 'docapp_in_progress 0.0' in lines
+
+    with pytest.raises(ValueError):
+        requests.inc(-1, route='/')
+
+
+def test_label_validation():
+    registry = MetricsRegistry()
+    counter = registry.counter('docapp_results_total', 'results', ['pipeline', 'source'])
+    with pytest.raises(ValueError):
+        counter.inc(pipeline='qa')
+    with pytest.raises(ValueError):
+        registry.gauge('docapp_results_total', 'same name')
+
+    #label values are escaped
+    counter.inc(pipeline='a"b\\c', source='cache')
+    assert 'docapp_results_total{pipeline="a\\"b\\\\c",source="cache"} 1.0' in registry.render()
+
+
+def test_histogram_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram('docapp_node_seconds', 'node time', ['node'], buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(seconds, node='Ranker')
+    with histogram.time(node='Retriever'):
+        pass
+
+    lines = registry.render().splitlines()
+    assert '# TYPE docapp_node_seconds histogram' in lines
+    #buckets are cumulative and end with +Inf
+    assert 'docapp_node_seconds_bucket{node="Ranker",le="0.1"} 1.0' in lines
+    assert 'docapp_node_seconds_bucket{node="Ranker",le="1.0"} 3.0' in lines
+    assert 'docapp_node_seconds_bucket{node="Ranker",le="+Inf"} 4.0' in lines
+    assert 'docapp_node_seconds_sum{node="Ranker"} 4.25' in lines
+    assert 'docapp_node_seconds_count{node="Ranker"} 4.0' in lines
+    assert 'docapp_node_seconds_count{node="Retriever"} 1.0' in lines
+
+
+def test_collectors():
+    registry = MetricsRegistry()
+    hits = {'results': 0}
+
+    def collect():
+        counter = Counter('docapp_cache_hits_total', 'cache hits', ['cache'])
+        for cache, value in hits.items():
+            counter.set(value, cache=cache)
+        return [counter, Gauge('docapp_pipelines', 'pipelines')]
+
+    registry.add_collector(collect)
+    assert 'docapp_cache_hits_total{cache="results"} 0.0' in registry.render()
+    hits['results'] = 5
+    rendered = registry.render()
+    assert 'docapp_cache_hits_total{cache="results"} 5.0' in rendered
+    assert '# TYPE docapp_pipelines gauge' in rendered
+    assert rendered.endswith('\n')
@@ -0,0 +1,104 @@
+import sys
+import inspect
+from pathlib import Path
+
+import pytest
+
+main_repo_path = '/usr/src/app'
+if main_repo_path not in sys.path:
+    sys.path.append(main_repo_path)
+
+from util.timing import percentile, LatencyRecorder, StageProfiler, instrument_pipeline
+
+
+class FakeNode:
+    def run(self, query: str, top_k: int = None):
+        return {'top_k': top_k}, 'output_1'
+
+    def run_batch(self, queries, top_k: int = None):
+        raise RuntimeError('failed')
+
+
+class FakePipeline:
+    """stand-in haystack Pipeline with a root node and one component"""
+    root_node = 'Query'
+
+    def __init__(self):
+        self.graph = type('Graph', (), {'nodes': ['Query', 'Retriever']})()
+        self.nodes = {'Query': object(), 'Retriever': FakeNode()}
+
+    def get_node(self, name):
+        return self.nodes.get(name)
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == pytest.approx(50.5)
+    assert percentile(values, 99) == pytest.approx(99.01)
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([5, 1, 3], 0) == 1
+
+
+def test_recorder_summary():
+    recorder = LatencyRecorder()
+    for ms in (10, 20, 30, 40):
+        recorder.record('Ranker', ms / 1000)
+    with recorder.time('total'):
+        pass
+
+    summary = recorder.summary()
+    assert summary['Ranker']['count'] == 4
+    assert summary['Ranker']['mean_ms'] == pytest.approx(25)
+    assert summary['Ranker']['p50_ms'] == pytest.approx(25)
+    assert summary['Ranker']['per_second'] == pytest.approx(40)
+    assert summary['total']['count'] == 1
+
+    recorder.reset()
+    assert recorder.summary() == {}
+
+
+def test_instrument_pipeline():
+    pipeline = FakePipeline()
+    recorder = LatencyRecorder()
+    instrument_pipeline(pipeline, recorder.record)
+    node = pipeline.get_node('Retriever')
+
+    #haystack selects node parameters from the run signature
+    assert list(inspect.signature(node.run).parameters) == ['query', 'top_k']
+    assert node.run(query='q', top_k=3) == ({'top_k': 3}, 'output_1')
+    with pytest.raises(RuntimeError):
+        node.run_batch(queries=['q'])
+
+    #failed calls are timed as well, the root node is not instrumented
+    assert len(recorder.samples('Retriever')) == 2
+    assert recorder.samples('Query') == []
+
+
+@pytest.mark.parametrize('profile', [None, 'cprofile', 'tracemalloc'])
+def test_stage_profiler(profile, tmp_path):
+    profiler = StageProfiler(profile=profile, profile_dir=str(tmp_path))
+    for _ in range(3):
+        with profiler.stage('parse'):
+            sorted(range(10000), key=lambda i: -i)
+        profiler.count('parse', 1, 'files')
+    with profiler.stage('write'):
+        data = [bytes(1000) for _ in range(100)]
+    profiler.count('write', len(data), 'documents')
+
+    summary = profiler.summary()
+    assert list(summary) == ['parse', 'write']
+    assert summary['parse']['calls'] == 3
+    assert summary['parse']['items'] == 3
+    assert summary['parse']['unit'] == 'files'
+    assert summary['write']['per_second'] > 0
+    files = profiler.write_profiles()
+    if profile == 'cprofile':
+        assert sorted(Path(f).name for f in files) == ['parse.prof', 'write.prof']
+        assert summary['parse']['top_functions']
+    else:
+        assert files == []
+    if profile == 'tracemalloc':
+        assert summary['write']['peak_bytes'] >= 100 * 1000
+
+    with pytest.raises(ValueError):
+        StageProfiler(profile='perf')